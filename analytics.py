@@ -0,0 +1,148 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+# Revenue counts orders whose payment went through
+PAID_STATUS = 'completed'
+
+# table -> names of the counters kept per key
+TABLES = {
+    'totals': ('orders', 'paidOrders', 'revenue'),
+    'daily': ('orders', 'paidOrders', 'revenue'),
+    'status': ('orders',),
+    'payment_status': ('orders',),
+    'products': ('units', 'revenue'),
+    'customers': ('orders', 'revenue'),
+}
+# Tables that need a top-N by revenue
+RANKED = ('products', 'customers')
+
+
+def to_paise(amount):
+    """Money is summed in integer paise so adding and subtracting never drifts"""
+    return int(round(float(amount or 0) * 100))
+
+
+def contributions(order):
+    """The ``(table, key, counters)`` rows one order state adds to the aggregates"""
+    paid = order.get('paymentStatus') == PAID_STATUS
+    revenue = to_paise(order.get('total')) if paid else 0
+    rows = [
+        ('totals', '', (1, int(paid), revenue)),
+        ('daily', str(order.get('date', ''))[:10], (1, int(paid), revenue)),
+        ('status', order.get('status') or 'unknown', (1,)),
+        ('payment_status', order.get('paymentStatus') or 'unknown', (1,)),
+    ]
+    if paid and order.get('customerId') is not None:
+        rows.append(('customers', order['customerId'], (1, revenue)))
+    if paid:
+        for line in order.get('items') or []:
+            if line.get('id') is None:
+                continue
+            units = int(line.get('quantity') or 0)
+            line_total = line.get('lineTotal')
+            if line_total is None:
+                line_total = float(line.get('price') or 0) * units
+            rows.append(('products', line.get('id'), (units, to_paise(line_total))))
+    return rows
+
+
+def _accumulate(deltas, order, sign):
+    for table, key, counters in contributions(order):
+        current = deltas.get((table, key))
+        if current is None:
+            current = deltas[(table, key)] = [0] * len(counters)
+        for i, value in enumerate(counters):
+            current[i] += sign * value
+
+
+def changes(before=None, after=None):
+    """Net counter deltas for an order going from ``before`` to ``after`` (either may be None).
+
+    Returns ``{(table, key): [deltas]}`` with all-zero entries dropped, so a
+    write that doesn't touch status, payment or totals changes nothing.
+    """
+    deltas = {}
+    if before is not None:
+        _accumulate(deltas, before, -1)
+    if after is not None:
+        _accumulate(deltas, after, 1)
+    return {k: v for k, v in deltas.items() if any(v)}
+
+
+def additions(orders):
+    """Combined deltas for inserting many orders (bulk imports, rebuilds)"""
+    deltas = {}
+    for order in orders:
+        _accumulate(deltas, order, 1)
+    return deltas
+
+
+def day_range(days, today=None):
+    """ISO dates of the last ``days`` days, oldest first"""
+    today = today or date.today()
+    return [(today - timedelta(days=offset)).isoformat() for offset in range(days - 1, -1, -1)]
+
+
+class SalesAggregates:
+    """Running sales totals maintained as orders are written.
+
+    Counters live in small dicts keyed by day, status, product and
+    customer; each order write applies only its own delta. Products and
+    customers also sit in revenue-sorted lists kept with ``bisect``, so the
+    top N is read off the end instead of scanning. Reads therefore cost the
+    same with a hundred orders or ten million. Not thread-safe on its own;
+    the repository applies changes under its lock.
+    """
+
+    def __init__(self):
+        self._tables = {table: {} for table in TABLES}
+        self._ranked = {table: [] for table in RANKED}
+
+    def apply(self, before=None, after=None):
+        self.apply_changes(changes(before, after))
+
+    def apply_changes(self, deltas):
+        for (table, key), delta in deltas.items():
+            counters = self._tables[table].get(key)
+            ranked = self._ranked.get(table)
+            if counters is None:
+                counters = self._tables[table][key] = [0] * len(delta)
+            elif ranked is not None:
+                del ranked[bisect_left(ranked, (counters[-1], key))]
+            for i, value in enumerate(delta):
+                counters[i] += value
+            if not any(counters):
+                del self._tables[table][key]
+            elif ranked is not None:
+                insort(ranked, (counters[-1], key))
+
+    def counters(self, table, key):
+        return self._tables[table].get(key) or [0] * len(TABLES[table])
+
+    def by_key(self, table):
+        """``{key: counters}`` for the small tables (statuses)"""
+        return {key: list(counters) for key, counters in self._tables[table].items()}
+
+    def top(self, table, limit):
+        """``[(key, counters), ...]`` with the highest revenue first"""
+        ranked = self._ranked[table]
+        return [(key, list(self._tables[table][key])) for _, key in ranked[:-limit - 1:-1]]
+
+
+def summarize(aggregates, days=30, top=10, today=None):
+    """Dashboard numbers from anything with ``counters``/``by_key``/``top`` (see SalesAggregates)"""
+    orders, paid_orders, revenue = aggregates.counters('totals', '')
+    daily = []
+    for day in day_range(days, today):
+        day_orders, day_paid, day_revenue = aggregates.counters('daily', day)
+        daily.append({'date': day, 'orders': day_orders, 'paidOrders': day_paid, 'revenue': day_revenue / 100})
+    return {
+        'totals': {'orders': orders, 'paidOrders': paid_orders, 'revenue': revenue / 100},
+        'revenueByDay': daily,
+        'ordersByStatus': {key: counters[0] for key, counters in aggregates.by_key('status').items()},
+        'ordersByPaymentStatus': {key: counters[0] for key, counters in aggregates.by_key('payment_status').items()},
+        'topProducts': [{'id': key, 'units': units, 'revenue': paise / 100}
+                        for key, (units, paise) in aggregates.top('products', top)],
+        'topCustomers': [{'customerId': key, 'orders': count, 'revenue': paise / 100}
+                         for key, (count, paise) in aggregates.top('customers', top)],
+    }
@@ -1,15 +1,46 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, abort, g, render_template, request, jsonify, send_file, session
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.exceptions import BadRequest
 from functools import wraps
+import base64
+import csv
+import io
 import json
+import math
 import re
+import secrets
+import threading
+import time
 from datetime import datetime, timedelta
+from itertools import islice
 from dotenv import load_dotenv
 import os
-import razorpay
-from html import escape
+from html import escape, unescape
+from markupsafe import Markup
+
+from catalog import CatalogStore
+from response_cache import ResponseCache
+from fragment_cache import FragmentCache
+from assets import IMMUTABLE, AssetManifest
+from serialization import create_serializer
+from compression import ResponseCompressor
+from concurrency import ConcurrencyLimiter, Overloaded, parse_limits
+from search import SearchIndex
+from storage import create_repository
+from cart_store import create_cart_store
+from pricing import MAX_QUANTITY, PricingEngine, item_error
+from inventory import InsufficientStock, create_inventory
+from order_ids import OrderIdGenerator
+from product_import import RowError, batched, detect_format, read_rows
+from payments import (GatewayUnavailable, PaymentError, RazorpayGateway,
+                      SignatureVerificationError, RAZORPAY_API_URL, verify_webhook_signature)
+from webhooks import QueueFull, WebhookProcessor
+from passwords import HasherBusy, PasswordHasher
+from rate_limit import create_rate_limiter, retry_after_header
+from metrics import Registry, SlowRequestProfiler
+from lazy import Lazy
+from snapshot import dumps as snapshot_dumps, read_snapshot, write_snapshot
 
 load_dotenv()
 
@@ -22,7 +53,10 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)
 
-CORS(app, resources={r"/api/*": {"origins": ["http://localhost:5000", "http://127.0.0.1:5000"]}})
+CORS(app, resources={r"/api/*": {
+    "origins": ["http://localhost:5000", "http://127.0.0.1:5000"],
+    "expose_headers": ["X-Next-Cursor"],
+}})
 
 # ==================== SECURITY HEADERS ====================
 @app.after_request
@@ -36,6 +70,176 @@ def set_security_headers(response):
     response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
     return response
 
+# ==================== METRICS ====================
+# Optional bearer token for /metrics; profile a sample of requests and keep
+# cProfile captures of those slower than PROFILE_SLOW_REQUEST_MS
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_SLOW_REQUEST_MS = float(os.getenv('PROFILE_SLOW_REQUEST_MS', '500'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+
+metrics = Registry()
+request_seconds = metrics.histogram(
+    'http_request_duration_seconds', 'Request latency by route', ('route', 'method'))
+requests_total = metrics.counter(
+    'http_requests_total', 'Requests by route and status', ('route', 'method', 'status'))
+request_bytes = metrics.counter(
+    'http_request_bytes_total', 'Request body bytes received', ('route',))
+response_bytes = metrics.counter(
+    'http_response_bytes_total', 'Response body bytes sent (streamed bodies not counted)', ('route',))
+requests_in_flight = metrics.gauge(
+    'http_requests_in_flight', 'Requests being handled', ('route',))
+password_hash_seconds = metrics.histogram(
+    'password_hash_duration_seconds', 'Password hashing time, including queueing', ('operation',))
+razorpay_seconds = metrics.histogram(
+    'razorpay_request_duration_seconds', 'Razorpay API calls, including retries', ('operation',))
+json_seconds = metrics.histogram(
+    'json_serialization_duration_seconds', 'Time spent serializing JSON responses')
+slow_profiler = SlowRequestProfiler(PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_SLOW_REQUEST_MS / 1000)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, with serialization time recorded.
+
+    Encodes with ``serializer`` when one is set (see RESPONSE ENCODING);
+    calls that pass encoder options, like the ``tojson`` filter, still go
+    through the stdlib encoder.
+    """
+    serializer = None
+    
+    def dumps(self, obj, **kwargs):
+        if self.serializer is not None and not kwargs:
+            return self.dumps_bytes(obj).decode('utf-8')
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            json_seconds.observe(time.perf_counter() - start)
+    
+    def dumps_bytes(self, obj):
+        if self.serializer is None:
+            return self.dumps(obj).encode('utf-8')
+        start = time.perf_counter()
+        try:
+            return self.serializer.dumps(obj)
+        finally:
+            json_seconds.observe(time.perf_counter() - start)
+    
+    def response(self, *args, **kwargs):
+        """jsonify(): compact bytes straight from the serializer (indented in debug mode)"""
+        if self.serializer is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        body = self.dumps_bytes(self._prepare_response_obj(args, kwargs))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+app.json = TimedJSONProvider(app)
+
+def request_route():
+    """The matched URL rule, so metrics have one series per route rather than per URL"""
+    return request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+
+@app.before_request
+def start_request_metrics():
+    route = request_route()
+    g.metrics_route = route
+    g.metrics_start = time.perf_counter()
+    g.metrics_profiler = slow_profiler.start() if PROFILE_SAMPLE_RATE else None
+    requests_in_flight.inc((route,))
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency, status and body sizes; runs before set_security_headers"""
+    start = g.pop('metrics_start', None)
+    if start is None:
+        return response
+    route = g.metrics_route
+    elapsed = time.perf_counter() - start
+    request_seconds.observe(elapsed, (route, request.method))
+    requests_total.inc((route, request.method, str(response.status_code)))
+    request_bytes.inc((route,), request.content_length or 0)
+    if response.is_streamed:
+        # The body is produced after teardown; the request is in flight until the server closes it
+        g.pop('metrics_route')
+        response.call_on_close(lambda: requests_in_flight.dec((route,)))
+    else:
+        response_bytes.inc((route,), response.content_length or 0)
+    profiler = g.pop('metrics_profiler', None)
+    if profiler is not None:
+        path = slow_profiler.stop(profiler, elapsed, route)
+        if path:
+            app.logger.warning(f"Slow request {request.method} {route} ({elapsed * 1000:.0f} ms) profiled to {path}")
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    """Always runs, so the in-flight gauge and profiler are released even on errors"""
+    route = g.pop('metrics_route', None)
+    if route is None:
+        return
+    requests_in_flight.dec((route,))
+    start = g.pop('metrics_start', None)
+    if start is not None:
+        # after_request never ran: the request failed with an unhandled error
+        request_seconds.observe(time.perf_counter() - start, (route, request.method))
+        requests_total.inc((route, request.method, '500'))
+    profiler = g.pop('metrics_profiler', None)
+    if profiler is not None:
+        slow_profiler.stop(profiler, 0, route)
+
+# ==================== RESPONSE ENCODING ====================
+# JSON_SERIALIZER: 'auto' (orjson when installed), 'orjson' or 'json'. Responses
+# of at least COMPRESS_MIN_BYTES are gzip/brotli compressed for clients that
+# accept it; compressed bodies of ETagged responses are cached up to COMPRESS_CACHE_BYTES
+JSON_SERIALIZER = os.getenv('JSON_SERIALIZER', 'auto')
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+COMPRESS_BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+COMPRESS_CACHE_BYTES = int(os.getenv('COMPRESS_CACHE_BYTES', str(32 * 1024 * 1024)))
+
+app.json.serializer = create_serializer(JSON_SERIALIZER, app.json.default, app.json.sort_keys)
+compressor = ResponseCompressor(COMPRESS_MIN_BYTES, COMPRESS_GZIP_LEVEL, COMPRESS_BROTLI_QUALITY, COMPRESS_CACHE_BYTES)
+
+@app.after_request
+def compress_response(response):
+    """Runs before record_request_metrics and set_security_headers, so byte metrics are what went on the wire"""
+    return compressor.apply(response, request.accept_encodings)
+
+# ==================== CONCURRENCY LIMITS ====================
+# Requests allowed in flight per group of routes ("pattern=limit,..."; fnmatch
+# patterns over URL rules). Over the limit a request waits up to
+# ROUTE_QUEUE_TIMEOUT seconds, at most ROUTE_QUEUE_LIMIT per group; the rest get 503
+ROUTE_CONCURRENCY_LIMITS = os.getenv(
+    'ROUTE_CONCURRENCY_LIMITS',
+    '/api/payment/create-order=8,/api/payment/verify=8,/api/admin/products/import=1,/api/admin/orders/export=2')
+ROUTE_QUEUE_LIMIT = int(os.getenv('ROUTE_QUEUE_LIMIT', '32'))
+ROUTE_QUEUE_TIMEOUT = float(os.getenv('ROUTE_QUEUE_TIMEOUT', '5'))
+
+route_limiter = ConcurrencyLimiter(parse_limits(ROUTE_CONCURRENCY_LIMITS), ROUTE_QUEUE_LIMIT, ROUTE_QUEUE_TIMEOUT)
+requests_shed = metrics.counter(
+    'http_requests_shed_total', 'Requests refused with 503 at a route concurrency limit', ('route',))
+
+@app.before_request
+def limit_route_concurrency():
+    """Take a slot for routes with a concurrency limit; 503 with Retry-After when none frees up"""
+    route = request_route()
+    try:
+        g.concurrency_slot = route_limiter.acquire(route)
+    except Overloaded:
+        requests_shed.inc((route,))
+        return server_busy_response()
+
+@app.after_request
+def hold_concurrency_while_streaming(response):
+    """A streamed body (e.g. an order export) keeps its slot until the server has sent it"""
+    if response.is_streamed:
+        slot = g.pop('concurrency_slot', None)
+        if slot is not None:
+            response.call_on_close(lambda: route_limiter.release(slot))
+    return response
+
+@app.teardown_request
+def release_route_concurrency(error=None):
+    route_limiter.release(g.pop('concurrency_slot', None))
+
 # ==================== SECURITY HELPERS ====================
 def sanitize_input(value):
     """Sanitize user input to prevent XSS"""
@@ -48,6 +252,15 @@ def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
 
+def validate_stock_data(stock):
+    """Validate a ``{size: count}`` stock mapping"""
+    if not isinstance(stock, dict):
+        return False, "Stock must be an object of size to count"
+    for size, count in stock.items():
+        if not isinstance(count, int) or isinstance(count, bool) or count < 0:
+            return False, f"Invalid stock count for size {size}"
+    return True, "Valid"
+
 def validate_product_data(data):
     """Validate product data"""
     required_fields = ['name', 'price', 'category', 'description']
@@ -57,24 +270,97 @@ def validate_product_data(data):
     
     try:
         price = float(data['price'])
-        if price < 0 or price > 999999:
+        # NaN passes both comparisons and would break the catalog's sorted price index
+        if not math.isfinite(price) or price < 0 or price > 999999:
             return False, "Price must be between 0 and 999999"
     except (ValueError, TypeError):
         return False, "Invalid price format"
     
     return True, "Valid"
 
+# ==================== STORAGE CONFIG ====================
+# 'memory' keeps everything in this process; 'sqlite' persists to DATABASE_PATH
+# and can be shared by several worker processes on one host.
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'memory')
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'ecommerce.db')
+# How often (seconds) a worker checks shared storage for catalog changes made by other workers
+CATALOG_REFRESH_INTERVAL = float(os.getenv('CATALOG_REFRESH_INTERVAL', '2'))
+# Optional file for prebuilt catalog/search indexes and seed-user hashes. Workers
+# load it instead of rebuilding while the product data is unchanged; after a
+# rebuild, a fresh one is written in the background
+STARTUP_SNAPSHOT = os.getenv('STARTUP_SNAPSHOT', '')
+# Rendered product cards/detail panels and listing grids kept for the storefront pages
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '10000'))
+
+# Carts live server-side; the session cookie only carries the cart id
+CART_BACKEND = os.getenv('CART_BACKEND', STORAGE_BACKEND)
+CART_TTL_SECONDS = int(os.getenv('CART_TTL_SECONDS', str(24 * 60 * 60)))
+CART_MAX_ENTRIES = int(os.getenv('CART_MAX_ENTRIES', '100000'))
+SHIPPING_FLAT_RATE = float(os.getenv('SHIPPING_FLAT_RATE', '15'))
+# Stock held for an unpaid order is released after this many seconds
+INVENTORY_BACKEND = os.getenv('INVENTORY_BACKEND', STORAGE_BACKEND)
+RESERVATION_TTL_SECONDS = int(os.getenv('RESERVATION_TTL_SECONDS', '900'))
+# Unique per process across hosts (0-1023); serve.py sets it per worker from this
+# base. Without it a single process derives one from its pid
+ORDER_ID_WORKER_ID = os.getenv('ORDER_ID_WORKER_ID')
+# Password hashing runs on its own small thread pool. The method is a werkzeug
+# method string (scrypt:32768:8:1, pbkdf2:sha256:600000...); stored hashes
+# made with other parameters are upgraded when their user logs in.
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '32'))
+# Auth attempts allowed per client IP and per email, each within a sliding window (seconds)
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+LOGIN_LIMIT_PER_IP = int(os.getenv('LOGIN_LIMIT_PER_IP', '30'))
+LOGIN_LIMIT_PER_EMAIL = int(os.getenv('LOGIN_LIMIT_PER_EMAIL', '10'))
+LOGIN_LIMIT_WINDOW = int(os.getenv('LOGIN_LIMIT_WINDOW', '300'))
+SIGNUP_LIMIT_PER_IP = int(os.getenv('SIGNUP_LIMIT_PER_IP', '10'))
+SIGNUP_LIMIT_WINDOW = int(os.getenv('SIGNUP_LIMIT_WINDOW', '3600'))
+# Bulk product imports (/api/admin/products/import)
+BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', '100000'))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv('BULK_IMPORT_MAX_ERRORS', '1000'))
+BULK_IMPORT_BATCH_SIZE = int(os.getenv('BULK_IMPORT_BATCH_SIZE', '1000'))
+BULK_IMPORT_MAX_LINE_BYTES = int(os.getenv('BULK_IMPORT_MAX_LINE_BYTES', '65536'))
+
+repository = create_repository(STORAGE_BACKEND, DATABASE_PATH)
+cart_store = create_cart_store(CART_BACKEND, DATABASE_PATH, ttl=CART_TTL_SECONDS, max_carts=CART_MAX_ENTRIES)
+inventory = create_inventory(INVENTORY_BACKEND, DATABASE_PATH, ttl=RESERVATION_TTL_SECONDS)
+order_ids = OrderIdGenerator(worker_id=int(ORDER_ID_WORKER_ID) if ORDER_ID_WORKER_ID else None)
+# New products get time-ordered ids that never repeat, even after deletes or across workers
+product_ids = OrderIdGenerator('PRD-', worker_id=int(ORDER_ID_WORKER_ID) if ORDER_ID_WORKER_ID else None)
+password_hasher = PasswordHasher(PASSWORD_HASH_METHOD, workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_QUEUE)
+login_ip_limiter = create_rate_limiter(RATE_LIMIT_BACKEND, LOGIN_LIMIT_PER_IP, LOGIN_LIMIT_WINDOW, RATE_LIMIT_MAX_KEYS)
+login_email_limiter = create_rate_limiter(RATE_LIMIT_BACKEND, LOGIN_LIMIT_PER_EMAIL, LOGIN_LIMIT_WINDOW, RATE_LIMIT_MAX_KEYS)
+signup_ip_limiter = create_rate_limiter(RATE_LIMIT_BACKEND, SIGNUP_LIMIT_PER_IP, SIGNUP_LIMIT_WINDOW, RATE_LIMIT_MAX_KEYS)
+
 # ==================== RAZORPAY CONFIG ====================
 RAZORPAY_KEY_ID = os.getenv('RAZORPAY_KEY_ID', '')
 RAZORPAY_KEY_SECRET = os.getenv('RAZORPAY_KEY_SECRET', '')
+RAZORPAY_API_URL = os.getenv('RAZORPAY_API_URL', RAZORPAY_API_URL)
+# Per-attempt read timeout (seconds) and retries for gateway calls
+RAZORPAY_TIMEOUT = float(os.getenv('RAZORPAY_TIMEOUT', '10'))
+RAZORPAY_MAX_RETRIES = int(os.getenv('RAZORPAY_MAX_RETRIES', '2'))
+# Webhooks are acknowledged at once and applied by background workers
+RAZORPAY_WEBHOOK_SECRET = os.getenv('RAZORPAY_WEBHOOK_SECRET', '')
+WEBHOOK_WORKERS = int(os.getenv('WEBHOOK_WORKERS', '4'))
+WEBHOOK_QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '10000'))
 
-if RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET:
-    razorpay_client = razorpay.Client(auth=(RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET))
-else:
-    razorpay_client = None
+PAYMENTS_CONFIGURED = bool(RAZORPAY_KEY_ID and RAZORPAY_KEY_SECRET)
+
+def create_payment_gateway():
+    return RazorpayGateway(
+        RAZORPAY_KEY_ID, RAZORPAY_KEY_SECRET,
+        base_url=RAZORPAY_API_URL,
+        read_timeout=RAZORPAY_TIMEOUT,
+        max_retries=RAZORPAY_MAX_RETRIES,
+    )
+
+# Built on the first payment call, so workers boot without loading the HTTP client
+payment_gateway = Lazy(create_payment_gateway)
 
 # ==================== MOCK DATA ====================
-products = [
+mock_products = [
     {
         "id": "1",
         "name": "Essential Cashmere Sweater",
@@ -166,6 +452,36 @@ products = [
     },
 ]
 
+MOCK_STOCK_PER_SIZE = 25
+SEED_USERS = {"user@example.com": "password123"}
+
+if not repository.has_products():
+    for product in mock_products:
+        repository.save_product(product)
+        for size in product['sizes']:
+            inventory.set_stock(product['id'], size, MOCK_STOCK_PER_SIZE if product['inStock'] else 0)
+
+# Read before loading: a write in between makes the catalog look stale, never fresh
+catalog_source = {
+    'backend': STORAGE_BACKEND,
+    'database': os.path.abspath(DATABASE_PATH) if repository.shared else None,
+    'productsVersion': repository.products_version(),
+}
+startup_snapshot = read_snapshot(STARTUP_SNAPSHOT, catalog_source) if STARTUP_SNAPSHOT else None
+if startup_snapshot:
+    snapshot_users, catalog_state, (search_state,) = startup_snapshot
+    catalog = CatalogStore.from_state(catalog_state)
+    search_index = SearchIndex.from_state(search_state)
+else:
+    snapshot_users = {}
+    catalog = CatalogStore(repository.load_products())
+    search_index = SearchIndex()
+response_cache = ResponseCache(lambda: catalog.version)
+catalog.subscribe(search_index.sync, replay=startup_snapshot is None)
+fragments = FragmentCache(PAGE_CACHE_MAX_ENTRIES)
+catalog.subscribe(fragments.sync)
+pricing = PricingEngine(catalog, shipping=SHIPPING_FLAT_RATE)
+
 collections = [
     {
         "id": "essentials",
@@ -184,11 +500,74 @@ collections = [
     },
 ]
 
-mock_users = {
-    "user@example.com": generate_password_hash("password123")
-}
+def create_seed_users():
+    """Demo accounts, created on first login rather than at import: each needs a deliberately slow hash"""
+    hashes = {}
+    for email, password in SEED_USERS.items():
+        password_hash = repository.get_password_hash(email)
+        if password_hash is None:
+            password_hash = snapshot_users.get(email) or password_hasher.hash(password)
+            if not repository.create_user(email, password_hash):
+                password_hash = repository.get_password_hash(email)  # another worker got there first
+        hashes[email] = password_hash
+    return hashes
+
+seed_users = Lazy(create_seed_users)
+if snapshot_users:
+    seed_users.get()  # no hashing needed
 
-orders = []
+def write_startup_snapshot(catalog_version):
+    """Save the indexes built at boot so the next worker can load them instead"""
+    try:
+        users = seed_users.get()
+        version, data = catalog.export_state(snapshot_dumps, search_index)
+        if version != catalog_version:
+            return  # changed since boot; a later boot will write one
+        write_snapshot(STARTUP_SNAPSHOT, catalog_source, users, data)
+        app.logger.info("Wrote startup snapshot %s", STARTUP_SNAPSHOT)
+    except Exception:
+        app.logger.exception("Could not write startup snapshot %s", STARTUP_SNAPSHOT)
+
+if STARTUP_SNAPSHOT and not startup_snapshot:
+    threading.Thread(target=write_startup_snapshot, args=(catalog.version,),
+                     name='startup-snapshot', daemon=True).start()
+
+# ==================== CATALOG SYNC ====================
+_catalog_sync = {'version': catalog_source['productsVersion'], 'checked': 0.0}
+_catalog_sync_lock = threading.Lock()
+# Deltas up to this size are applied product by product; upsert_many copies
+# every index, which only pays off for bulk changes
+CATALOG_SYNC_BULK_SIZE = 100
+
+def catalog_written(version):
+    """Record this worker's own product write so it isn't pulled back as another worker's change"""
+    with _catalog_sync_lock:
+        if _catalog_sync['version'] == version - 1:
+            _catalog_sync['version'] = version
+
+@app.before_request
+def refresh_catalog():
+    """Apply the products other workers have written to shared storage since the last check"""
+    if not repository.shared:
+        return
+    now = time.monotonic()
+    if now - _catalog_sync['checked'] < CATALOG_REFRESH_INTERVAL:
+        return
+    with _catalog_sync_lock:
+        if now - _catalog_sync['checked'] < CATALOG_REFRESH_INTERVAL:
+            return
+        _catalog_sync['checked'] = now
+        if repository.products_version() == _catalog_sync['version']:
+            return
+        version, changed, deleted = repository.product_changes_since(_catalog_sync['version'])
+        for product_id in deleted:
+            catalog.remove(product_id)
+        if len(changed) > CATALOG_SYNC_BULK_SIZE:
+            catalog.upsert_many(changed)
+        else:
+            for product in changed:
+                catalog.add(product)
+        _catalog_sync['version'] = version
 
 # ==================== AUTHENTICATION ====================
 def login_required(f):
@@ -199,6 +578,30 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def server_busy_response():
+    """503 telling the client to retry shortly (hashing backlog or a route at its concurrency limit)"""
+    response = jsonify({"error": "Server busy, please retry"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def throttle(*checks):
+    """Apply ``(limiter, key)`` checks in order; a 429 response if any is over its limit"""
+    for limiter, key in checks:
+        wait = limiter.hit(key)
+        if wait:
+            response = jsonify({"error": "Too many attempts, please try again later"})
+            response.headers['Retry-After'] = retry_after_header(wait)
+            return response, 429
+    return None
+
+def admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if session.get('user') != 'admin@example.com':
+            return jsonify({"error": "Unauthorized"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
 @app.route('/api/auth/login', methods=['POST'])
 def login():
     try:
@@ -215,12 +618,28 @@ def login():
         if not validate_email(email):
             return jsonify({"error": "Invalid email format"}), 400
         
-        if email in mock_users and check_password_hash(mock_users[email], password):
+        # Checked before any hashing, so throttled attempts cost next to nothing
+        limited = throttle((login_ip_limiter, request.remote_addr), (login_email_limiter, email))
+        if limited:
+            return limited
+        
+        seed_users.get()
+        password_hash = repository.get_password_hash(email)
+        if password_hash:
+            with password_hash_seconds.time(('verify',)):
+                matches, new_hash = password_hasher.verify(password_hash, password)
+        else:
+            matches, new_hash = False, None
+        if matches:
+            if new_hash:
+                repository.set_password_hash(email, new_hash)
             session['user'] = email
             session.permanent = True
             return jsonify({"success": True, "user": email}), 200
         
         return jsonify({"error": "Invalid credentials"}), 401
+    except HasherBusy:
+        return server_busy_response()
     except Exception as e:
         app.logger.error(f"Login error: {str(e)}")
         return jsonify({"error": "Login failed"}), 500
@@ -244,13 +663,23 @@ def signup():
         if len(password) < 6:
             return jsonify({"error": "Password must be at least 6 characters"}), 400
         
-        if email in mock_users:
+        limited = throttle((signup_ip_limiter, request.remote_addr))
+        if limited:
+            return limited
+        
+        seed_users.get()  # otherwise a demo account's email could be taken before its first login
+        if repository.get_password_hash(email) is not None:
             return jsonify({"error": "Email already registered"}), 400
         
-        mock_users[email] = generate_password_hash(password)
+        with password_hash_seconds.time(('hash',)):
+            password_hash = password_hasher.hash(password)
+        if not repository.create_user(email, password_hash):
+            return jsonify({"error": "Email already registered"}), 400
         session['user'] = email
         session.permanent = True
         return jsonify({"success": True, "user": email}), 201
+    except HasherBusy:
+        return server_busy_response()
     except Exception as e:
         app.logger.error(f"Signup error: {str(e)}")
         return jsonify({"error": "Signup failed"}), 500
@@ -266,90 +695,335 @@ def get_user():
         return jsonify({"user": session['user']}), 200
     return jsonify({"user": None}), 200
 
+# ==================== RESPONSE CACHE ====================
+def cached_json(key, build):
+    """Serve pre-serialized JSON for ``key`` with a strong ETag.
+
+    Returns None when ``build()`` produces nothing (e.g. unknown id) so the
+    caller can send its own 404. Matching ``If-None-Match`` gets a 304.
+    """
+    body, etag = response_cache.get(key, build, app.json.dumps_bytes)
+    if body is None:
+        return None
+    response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+# ==================== PRODUCT QUERIES ====================
+PRODUCT_PAGE_SIZE = 24
+PRODUCT_PAGE_MAX = 100
+
+def parse_bool(value):
+    """Parse a query string boolean ('true'/'false', '1'/'0')"""
+    value = value.strip().lower()
+    if value in ('true', '1', 'yes'):
+        return True
+    if value in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+def encode_cursor(*parts):
+    raw = json.dumps(parts, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        return json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def parse_product_query(args):
+    """Turn /api/products query parameters into CatalogStore.query kwargs"""
+    query = {
+        'category': args.get('category') or None,
+        'size': args.get('size') or None,
+        'sort': args.get('sort', 'default'),
+        'descending': args.get('order', 'asc').lower() == 'desc',
+        'flags': {},
+    }
+    if query['sort'] not in CatalogStore.SORT_FIELDS:
+        raise ValueError(f"Invalid sort field: {query['sort']}")
+    if args.get('order', 'asc').lower() not in ('asc', 'desc'):
+        raise ValueError("Order must be 'asc' or 'desc'")
+
+    for param, key in (('minPrice', 'min_price'), ('maxPrice', 'max_price')):
+        if param in args:
+            try:
+                query[key] = float(args[param])
+            except ValueError:
+                raise ValueError(f"Invalid {param}")
+            if math.isnan(query[key]):
+                raise ValueError(f"Invalid {param}")
+
+    for flag in CatalogStore.INDEXED_FLAGS:
+        if flag in args:
+            query['flags'][flag] = parse_bool(args[flag])
+
+    try:
+        query['limit'] = int(args.get('limit', PRODUCT_PAGE_SIZE))
+        query['offset'] = int(args.get('offset', 0))
+    except ValueError:
+        raise ValueError("limit and offset must be integers")
+    if not 1 <= query['limit'] <= PRODUCT_PAGE_MAX:
+        raise ValueError(f"limit must be between 1 and {PRODUCT_PAGE_MAX}")
+    if query['offset'] < 0:
+        raise ValueError("offset must not be negative")
+
+    if args.get('cursor'):
+        parts = decode_cursor(args['cursor'])
+        if (not isinstance(parts, list) or len(parts) != 4
+                or parts[:2] != [query['sort'], query['descending']]):
+            raise ValueError("Cursor does not match this query")
+        key, product_id = parts[2], parts[3]
+        key_type = str if query['sort'] in ('name', 'createdAt') else (int, float)
+        if not isinstance(key, key_type) or isinstance(key, bool) or not isinstance(product_id, str):
+            raise ValueError("Invalid cursor")
+        query['after'] = (key, product_id)
+    return query
+
 # ==================== PRODUCTS ====================
 @app.route('/api/products', methods=['GET'])
 def get_products():
-    return jsonify(products)
+    """List products; with query parameters, return one filtered and sorted page"""
+    if not request.args:
+        return cached_json('products', catalog.all)
+    
+    try:
+        query = parse_product_query(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    items, next_after = catalog.query(**query)
+    response = jsonify(items)
+    if next_after is not None:
+        response.headers['X-Next-Cursor'] = encode_cursor(query['sort'], query['descending'], *next_after)
+    return response
+
+@app.route('/api/products/search', methods=['GET'])
+def search_products():
+    """Full-text product search over name, description and category"""
+    q = request.args.get('q', '').strip()
+    if not q:
+        return jsonify({"error": "Missing search query"}), 400
+    
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not 1 <= limit <= PRODUCT_PAGE_MAX:
+        return jsonify({"error": f"limit must be between 1 and {PRODUCT_PAGE_MAX}"}), 400
+    
+    prefix = request.args.get('prefix', 'true').lower() != 'false'
+    results = search_index.search(q[:200], limit=limit, prefix=prefix)
+    return jsonify([catalog.get(pid) for pid, _ in results if pid in catalog])
 
 @app.route('/api/products/<product_id>', methods=['GET'])
 def get_product(product_id):
-    product = next((p for p in products if p['id'] == product_id), None)
+    product = catalog.get(product_id)
     if product:
         return jsonify(product)
     return jsonify({"error": "Product not found"}), 404
 
+@app.route('/api/products/<product_id>/stock', methods=['GET'])
+def get_product_stock(product_id):
+    """Units available per size (null for sizes without stock tracking)"""
+    product = catalog.get(product_id)
+    if not product:
+        return jsonify({"error": "Product not found"}), 404
+    return jsonify(inventory.stock_levels(product_id, product.get('sizes') or []))
+
 @app.route('/api/products/category/<category>', methods=['GET'])
 def get_products_by_category(category):
-    category_products = [p for p in products if p['category'] == category]
-    return jsonify(category_products)
+    return cached_json(('category', category), lambda: catalog.by_category(category))
 
 # ==================== COLLECTIONS ====================
 @app.route('/api/collections', methods=['GET'])
 def get_collections():
-    return jsonify(collections)
+    return cached_json('collections', lambda: collections)
 
 @app.route('/api/collections/<collection_id>', methods=['GET'])
 def get_collection(collection_id):
-    collection = next((c for c in collections if c['id'] == collection_id), None)
-    if collection:
-        return jsonify(collection)
+    response = cached_json(
+        ('collection', collection_id),
+        lambda: next((c for c in collections if c['id'] == collection_id), None),
+    )
+    if response is not None:
+        return response
     return jsonify({"error": "Collection not found"}), 404
 
 # ==================== CART ====================
+def current_cart_id(create=False):
+    """Cart id stored in the session; a new one is issued when ``create`` is set"""
+    cart_id = session.get('cart_id')
+    if cart_id is None and create:
+        cart_id = session['cart_id'] = secrets.token_urlsafe(16)
+    return cart_id
+
+def parse_quantity(value, default=1, minimum=1):
+    try:
+        quantity = int(value if value is not None else default)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid quantity")
+    if quantity < minimum:
+        raise ValueError(f"Quantity must be at least {minimum}")
+    if quantity > MAX_QUANTITY:
+        raise ValueError(f"Quantity must be at most {MAX_QUANTITY}")
+    return quantity
+
+def cart_view(items):
+    """Cart lines with their name, price and image from the catalog.
+
+    Carts store only product id, size and quantity, so what the client sees
+    (and later pays) always reflects the current catalog.
+    """
+    lines = []
+    for item in items:
+        product = catalog.get(item['id'])
+        lines.append({
+            'id': item['id'],
+            'name': product['name'] if product else None,
+            'price': product['price'] if product else None,
+            'size': item['size'],
+            'quantity': item['quantity'],
+            'image': (product.get('images') or [None])[0] if product else None,
+        })
+    return lines
+
 @app.route('/api/cart', methods=['GET'])
 def get_cart():
-    if 'cart' not in session:
-        session['cart'] = []
-    return jsonify(session['cart'])
+    cart_id = current_cart_id()
+    return jsonify(cart_view(cart_store.get(cart_id)) if cart_id else [])
 
 @app.route('/api/cart', methods=['POST'])
 def add_to_cart():
     data = request.get_json()
-    if 'cart' not in session:
-        session['cart'] = []
-    
-    item = {
-        'id': data.get('id'),
-        'name': data.get('name'),
-        'price': data.get('price'),
-        'size': data.get('size'),
-        'quantity': data.get('quantity', 1),
-        'image': data.get('image')
-    }
-    
-    # Check if item already in cart
-    existing = next((i for i in session['cart'] if i['id'] == item['id'] and i['size'] == item['size']), None)
-    if existing:
-        existing['quantity'] += item['quantity']
-    else:
-        session['cart'].append(item)
-    
-    session.modified = True
-    return jsonify({"success": True, "cart": session['cart']})
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "No data provided"}), 400
+    store_op, error = validate_cart_operation(dict(data, op='add'))
+    if error:
+        return jsonify({"error": error}), 400
+    cart = cart_store.apply(current_cart_id(create=True), [store_op])
+    return jsonify({"success": True, "cart": cart_view(cart)})
 
 @app.route('/api/cart/<item_id>', methods=['DELETE'])
 def remove_from_cart(item_id):
-    if 'cart' in session:
-        session['cart'] = [i for i in session['cart'] if i['id'] != item_id]
-        session.modified = True
-    return jsonify({"success": True, "cart": session.get('cart', [])})
+    """Remove an item; ``?size=`` limits removal to that size"""
+    cart_id = current_cart_id()
+    if not cart_id:
+        return jsonify({"success": True, "cart": []})
+    cart = cart_store.remove(cart_id, item_id, request.args.get('size'))
+    return jsonify({"success": True, "cart": cart_view(cart)})
 
 @app.route('/api/cart/update', methods=['PUT'])
 def update_cart():
+    """Set a line's quantity; 0 removes the line"""
     data = request.get_json()
-    if 'cart' in session:
-        item = next((i for i in session['cart'] if i['id'] == data.get('id') and i['size'] == data.get('size')), None)
-        if item:
-            item['quantity'] = data.get('quantity', 1)
-            if item['quantity'] <= 0:
-                session['cart'].remove(item)
-        session.modified = True
-    return jsonify({"success": True, "cart": session.get('cart', [])})
+    if not isinstance(data, dict) or not data:
+        return jsonify({"error": "No data provided"}), 400
+    store_op, error = validate_cart_operation(dict(data, op='update'))
+    if error:
+        return jsonify({"error": error}), 400
+    
+    cart_id = current_cart_id()
+    if not cart_id:
+        return jsonify({"success": True, "cart": []})
+    cart = cart_store.apply(cart_id, [store_op])
+    return jsonify({"success": True, "cart": cart_view(cart)})
+
+CART_BATCH_MAX_OPERATIONS = 100
+
+def validate_cart_operation(operation):
+    """Check one batch operation against the catalog.
+
+    Returns ``(store_op, None)`` for a valid operation or ``(None, error)``.
+    Added items store only product id, size and quantity (see cart_view).
+    An update to quantity 0 removes the line.
+    """
+    if not isinstance(operation, dict):
+        return None, "Operation must be an object"
+    op = operation.get('op')
+    product_id = operation.get('id')
+    size = operation.get('size')
+    if op not in ('add', 'update', 'remove'):
+        return None, "op must be 'add', 'update' or 'remove'"
+    if not isinstance(product_id, str) or not product_id:
+        return None, "Missing product id"
+    if size is not None and not isinstance(size, str):
+        return None, "Invalid size"
+    
+    if op == 'remove':
+        return ('remove', product_id, size), None
+    
+    try:
+        quantity = parse_quantity(operation.get('quantity'), minimum=0 if op == 'update' else 1)
+    except ValueError as e:
+        return None, str(e)
+    
+    if op == 'update':
+        # 0 removes the line, which needs no product (it may have been deleted since)
+        if quantity and product_id not in catalog:
+            return None, "Product not found"
+        return ('update', product_id, size, quantity), None
+    
+    error = item_error(catalog.get(product_id), size, quantity)
+    if error:
+        return None, error
+    return ('add', {'id': product_id, 'size': size, 'quantity': quantity}), None
+
+@app.route('/api/cart/batch', methods=['POST'])
+def batch_update_cart():
+    """Apply an ordered list of add/update/remove operations in one request"""
+    data = request.get_json()
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({"error": "operations must be a non-empty list"}), 400
+    if len(operations) > CART_BATCH_MAX_OPERATIONS:
+        return jsonify({"error": f"At most {CART_BATCH_MAX_OPERATIONS} operations per batch"}), 400
+    
+    valid, results = [], []
+    for index, operation in enumerate(operations):
+        store_op, error = validate_cart_operation(operation)
+        result = {"index": index, "success": error is None}
+        if error:
+            result["error"] = error
+        else:
+            valid.append(store_op)
+        results.append(result)
+    
+    cart_id = current_cart_id(create=any(op[0] == 'add' for op in valid))
+    if not cart_id:
+        cart = []
+    elif valid:
+        cart = cart_store.apply(cart_id, valid)
+    else:
+        cart = cart_store.get(cart_id)
+    return jsonify({
+        "success": all(r["success"] for r in results),
+        "results": results,
+        "cart": cart_view(cart),
+    })
+
+def quote_current_cart():
+    """Price the session's cart from the catalog (cached per cart version)"""
+    cart_id = current_cart_id()
+    if not cart_id:
+        return pricing.quote([])
+    version, items = cart_store.snapshot(cart_id)
+    return pricing.quote_cart(cart_id, version, items)
+
+@app.route('/api/cart/summary', methods=['GET'])
+def get_cart_summary():
+    """Server-side prices, subtotal, shipping and total for the current cart"""
+    return jsonify(quote_current_cart())
 
 @app.route('/api/cart/clear', methods=['POST'])
 def clear_cart():
-    session['cart'] = []
-    session.modified = True
+    cart_id = current_cart_id()
+    if cart_id:
+        cart_store.clear(cart_id)
     return jsonify({"success": True})
 
 # ==================== PAYMENT ====================
@@ -365,28 +1039,50 @@ def get_razorpay_key():
 @login_required
 def create_payment_order():
     """Create Razorpay payment order"""
-    if not razorpay_client:
+    if not PAYMENTS_CONFIGURED:
         return jsonify({"error": "Payment gateway not configured"}), 503
     
     try:
-        data = request.get_json()
-        if not data or 'amount' not in data:
-            return jsonify({"error": "Missing amount"}), 400
+        # The amount always comes from the server: the stored order's total,
+        # or the current cart priced against the catalog. Client amounts are ignored.
+        data = request.get_json(silent=True) or {}
+        order = None
+        if data.get('orderId'):
+            order = repository.get_order(data['orderId'])
+            if not order or order['customerId'] != session['user']:
+                return jsonify({"error": "Order not found"}), 404
+            amount = float(order['total'])
+        else:
+            quote = quote_current_cart()
+            if not quote['valid']:
+                return jsonify({"error": "Some cart items are unavailable", "details": quote['errors']}), 400
+            amount = quote['total']
         
-        try:
-            amount = float(data['amount'])
-            if amount < 1 or amount > 999999:
-                return jsonify({"error": "Invalid amount"}), 400
-            amount_paise = int(amount * 100)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Invalid amount format"}), 400
+        if amount < 1 or amount > 999999:
+            return jsonify({"error": "Invalid amount"}), 400
+        amount_paise = int(round(amount * 100))
         
-        razorpay_order = razorpay_client.order.create({
-            'amount': amount_paise,
-            'currency': 'INR',
-            'payment_capture': 1
-        })
+        if order is None:
+            with razorpay_seconds.time(('create_order',)):
+                razorpay_order = payment_gateway.get().create_order(amount_paise, 'INR')
+            return jsonify(razorpay_order), 201
+        if order.get('razorpayOrderId'):
+            # A retried request: reuse the gateway order already made for this order
+            return jsonify({'id': order['razorpayOrderId'], 'amount': amount_paise,
+                            'currency': 'INR', 'receipt': order['id']}), 200
+        # The order id is the idempotency key and receipt, so retries (ours or
+        # the browser's) never create a second gateway order
+        with razorpay_seconds.time(('create_order',)):
+            razorpay_order = payment_gateway.get().create_order(amount_paise, 'INR', receipt=order['id'],
+                                                          notes={'orderId': order['id']})
+        repository.update_order(order['id'], {'razorpayOrderId': razorpay_order['id']})
         return jsonify(razorpay_order), 201
+    except GatewayUnavailable as e:
+        app.logger.error(f"Razorpay unavailable: {str(e)}")
+        return jsonify({"error": "Payment gateway temporarily unavailable"}), 503
+    except PaymentError as e:
+        app.logger.error(f"Razorpay order creation error: {str(e)}")
+        return jsonify({"error": "Payment processing error"}), 502
     except Exception as e:
         app.logger.error(f"Razorpay order creation error: {str(e)}")
         return jsonify({"error": "Payment processing error"}), 500
@@ -395,7 +1091,7 @@ def create_payment_order():
 @login_required
 def verify_payment():
     """Verify Razorpay payment signature"""
-    if not razorpay_client:
+    if not PAYMENTS_CONFIGURED:
         return jsonify({"error": "Payment gateway not configured"}), 503
     
     try:
@@ -407,70 +1103,380 @@ def verify_payment():
         if not all(field in data for field in required_fields):
             return jsonify({"error": "Missing payment fields"}), 400
         
-        razorpay_client.utility.verify_payment_signature({
-            'razorpay_order_id': data['razorpay_order_id'],
-            'razorpay_payment_id': data['razorpay_payment_id'],
-            'razorpay_signature': data['razorpay_signature']
-        })
+        payment_gateway.get().verify_payment_signature(
+            data['razorpay_order_id'], data['razorpay_payment_id'], data['razorpay_signature'])
+        
+        # Mark the checkout's order as paid and turn its stock hold into a sale
+        if data.get('orderId'):
+            order = repository.get_order(data['orderId'])
+            if not order or order['customerId'] != session['user']:
+                return jsonify({"error": "Order not found"}), 404
+            # Only a payment for the gateway order made for this order (and so for its total) counts
+            if not order.get('razorpayOrderId') or order['razorpayOrderId'] != data['razorpay_order_id']:
+                return jsonify({"error": "Payment does not belong to this order"}), 400
+            order = complete_order_payment(order, data['razorpay_order_id'], data['razorpay_payment_id'])
+            return jsonify({"success": True, "order": order}), 200
         return jsonify({"success": True}), 200
-    except razorpay.errors.SignatureVerificationError:
+    except SignatureVerificationError:
         return jsonify({"error": "Invalid payment signature"}), 403
     except Exception as e:
         app.logger.error(f"Payment verification error: {str(e)}")
         return jsonify({"error": "Verification failed"}), 500
 
+def complete_order_payment(order, razorpay_order_id, razorpay_payment_id):
+    """Mark an order paid and turn its stock hold into a sale; safe to repeat"""
+    if order.get('paymentStatus') == 'completed':
+        return order
+    order = repository.update_order(order['id'], {
+        'paymentStatus': 'completed',
+        'razorpayOrderId': razorpay_order_id,
+        'razorpayPaymentId': razorpay_payment_id,
+    })
+    if order.get('reservationId') and not inventory.commit(order['reservationId']):
+        # The hold expired and its stock went back on sale: take it again if it is still there,
+        # otherwise flag the paid order so fulfilment sees it can't ship from stock
+        lines = [(line['id'], line['size'], line['quantity']) for line in order['items']]
+        try:
+            reservation_id = inventory.reserve(lines)
+        except InsufficientStock as e:
+            app.logger.error(f"Paid order {order['id']} could not be allocated stock: {e.shortages}")
+            order = repository.update_order(order['id'], {'stockStatus': 'unallocated', 'stockShortages': e.shortages})
+        else:
+            inventory.commit(reservation_id)
+            order = repository.update_order(order['id'], {'reservationId': reservation_id})
+    return order
+
+# Webhook events that change an order's payment status
+PAYMENT_EVENTS = {'payment.captured': 'completed', 'order.paid': 'completed', 'payment.failed': 'failed'}
+
+def apply_payment_event(event):
+    """Webhook worker: update the order a Razorpay payment event refers to"""
+    status = PAYMENT_EVENTS.get(event.get('event'))
+    if status is None:
+        return
+    payload = event.get('payload') or {}
+    payment = (payload.get('payment') or {}).get('entity') or {}
+    razorpay_order_id = payment.get('order_id') or ((payload.get('order') or {}).get('entity') or {}).get('id')
+    if not razorpay_order_id:
+        return
+    order = repository.get_order_by_razorpay_id(razorpay_order_id)
+    if order is None:
+        app.logger.warning(f"Webhook for unknown Razorpay order {razorpay_order_id}")
+        return
+    if status == 'completed':
+        complete_order_payment(order, razorpay_order_id, payment.get('id'))
+    elif order.get('paymentStatus') == 'pending':
+        # The customer may still retry; the stock hold expires on its own
+        repository.update_order(order['id'], {'paymentStatus': 'failed'})
+
+webhook_processor = WebhookProcessor(apply_payment_event, repository.record_event, repository.forget_event,
+                                     workers=WEBHOOK_WORKERS, max_queue=WEBHOOK_QUEUE_SIZE)
+webhook_backlog = metrics.gauge('webhook_queue_depth', 'Webhook events waiting for a worker')
+webhook_parked = metrics.gauge('webhook_parked_events', 'Failed webhook events waiting to be retried')
+
+@app.route('/api/payment/webhook', methods=['POST'])
+def razorpay_webhook():
+    """Verify a Razorpay webhook and queue it; workers apply it in the background"""
+    if not RAZORPAY_WEBHOOK_SECRET:
+        return jsonify({"error": "Webhooks not configured"}), 503
+    
+    body = request.get_data()
+    try:
+        verify_webhook_signature(body, request.headers.get('X-Razorpay-Signature'), RAZORPAY_WEBHOOK_SECRET)
+        event = json.loads(body)
+    except SignatureVerificationError:
+        return jsonify({"error": "Invalid webhook signature"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid webhook payload"}), 400
+    if not isinstance(event, dict):
+        return jsonify({"error": "Invalid webhook payload"}), 400
+    
+    try:
+        webhook_processor.submit(request.headers.get('X-Razorpay-Event-Id'), event)
+    except QueueFull:
+        # Razorpay redelivers on any non-2xx response
+        response = jsonify({"error": "Webhook backlog full"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    return jsonify({"status": "queued"}), 200
+
 # ==================== ORDERS ====================
+ORDER_PAGE_SIZE = 20
+ORDER_PAGE_MAX = 100
+
 @app.route('/api/orders', methods=['POST'])
 @login_required
 def create_order():
-    data = request.get_json()
+    """Create an order priced on the server.
+
+    Items come from the server-side cart; if it is empty (e.g. it was
+    already cleared by an earlier checkout step) the client's item ids,
+    sizes and quantities are used. Prices and totals always come from the
+    catalog, never from the request.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Invalid order data"}), 400
+    cart_id = current_cart_id()
+    version, items = cart_store.snapshot(cart_id) if cart_id else (None, [])
+    if items:
+        quote = pricing.quote_cart(cart_id, version, items)
+    else:
+        items = data.get('items') or []
+        if not isinstance(items, list) or not all(isinstance(i, dict) for i in items):
+            return jsonify({"error": "Invalid items"}), 400
+        quote = pricing.quote(items)
+    
+    if not quote['valid']:
+        return jsonify({"error": "Some items are unavailable", "details": quote['errors']}), 400
+    if not quote['lines']:
+        return jsonify({"error": "Cart is empty"}), 400
+    
+    # Hold the stock for the whole order; it becomes a sale once payment is
+    # verified, and is released automatically if payment never arrives.
+    try:
+        reservation_id = inventory.reserve(
+            [(line['id'], line['size'], line['quantity']) for line in quote['lines']])
+    except InsufficientStock as e:
+        return jsonify({"error": "Insufficient stock", "details": e.shortages}), 409
+    if not PAYMENTS_CONFIGURED:
+        inventory.commit(reservation_id)
+    
     order = {
-        'id': f"ORD-{datetime.now().strftime('%Y%m%d%H%M%S')}",
+        'id': order_ids.next_id(),
         'customerId': session['user'],
         'customerEmail': session['user'],
         'date': datetime.now().isoformat(),
         'status': 'pending',
-        'paymentStatus': data.get('paymentStatus', 'pending'),
+        # Payment status is only ever set by verified gateway callbacks
+        'paymentStatus': 'pending',
         'paymentMethod': data.get('paymentMethod', 'razorpay'),
-        'razorpayOrderId': data.get('razorpayOrderId'),
-        'razorpayPaymentId': data.get('razorpayPaymentId'),
-        'items': data.get('items', []),
-        'total': data.get('total', 0),
+        'razorpayOrderId': None,
+        'razorpayPaymentId': None,
+        'items': quote['lines'],
+        'subtotal': quote['subtotal'],
+        'shipping': quote['shipping'],
+        'total': quote['total'],
         'shippingAddress': data.get('shippingAddress', {}),
+        'reservationId': reservation_id,
     }
-    orders.append(order)
-    session['cart'] = []
-    session.modified = True
+    repository.add_order(order)
+    if cart_id:
+        cart_store.clear(cart_id)
     return jsonify(order), 201
 
 @app.route('/api/orders', methods=['GET'])
 @login_required
 def get_orders():
-    user_orders = [o for o in orders if o['customerId'] == session['user']]
-    return jsonify(user_orders)
+    """Page through the current user's orders, newest first"""
+    try:
+        limit = int(request.args.get('limit', ORDER_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not 1 <= limit <= ORDER_PAGE_MAX:
+        return jsonify({"error": f"limit must be between 1 and {ORDER_PAGE_MAX}"}), 400
+    
+    before = None
+    if request.args.get('cursor'):
+        try:
+            before = decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not (isinstance(before, list) and len(before) == 2 and all(isinstance(p, str) for p in before)):
+            return jsonify({"error": "Invalid cursor"}), 400
+        before = tuple(before)
+    
+    page = repository.orders_for_customer(
+        session['user'],
+        status=request.args.get('status') or None,
+        before=before,
+        limit=limit + 1,
+    )
+    response = jsonify(page[:limit])
+    if len(page) > limit:
+        last = page[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last['date'], last['id'])
+    return response
 
 @app.route('/api/orders/<order_id>', methods=['GET'])
 @login_required
 def get_order(order_id):
-    order = next((o for o in orders if o['id'] == order_id and o['customerId'] == session['user']), None)
-    if order:
+    order = repository.get_order(order_id)
+    if order and order['customerId'] == session['user']:
         return jsonify(order)
     return jsonify({"error": "Order not found"}), 404
 
 # ==================== ADMIN ====================
+ADMIN_ORDER_PAGE_SIZE = 50
+ADMIN_ORDER_PAGE_MAX = 500
+ORDER_EXPORT_BATCH = 500
+ORDER_EXPORT_COLUMNS = [
+    'id', 'date', 'customerEmail', 'status', 'paymentStatus', 'paymentMethod',
+    'total', 'itemCount', 'razorpayOrderId', 'razorpayPaymentId', 'stockStatus',
+]
+
+def parse_order_filters(args):
+    """Read since/until/status/paymentStatus filters for the admin order endpoints"""
+    filters = {
+        'status': args.get('status') or None,
+        'payment_status': args.get('paymentStatus') or None,
+    }
+    for param in ('since', 'until'):
+        value = args.get(param)
+        if not value:
+            filters[param] = None
+            continue
+        try:
+            datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"Invalid {param} date")
+        # A bare date for 'until' covers that whole day
+        if param == 'until' and len(value) == 10:
+            value += 'T23:59:59.999999'
+        filters[param] = value
+    return filters
+
+def export_order_row(order):
+    row = {column: order.get(column) for column in ORDER_EXPORT_COLUMNS}
+    row['itemCount'] = sum(int(i.get('quantity') or 0) for i in order.get('items', []))
+    return row
+
+def stream_orders_ndjson(orders):
+    batch = []
+    for order in orders:
+        batch.append(json.dumps(order, separators=(',', ':')))
+        if len(batch) >= ORDER_EXPORT_BATCH:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+def stream_orders_csv(orders):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=ORDER_EXPORT_COLUMNS)
+    writer.writeheader()
+    for count, order in enumerate(orders, 1):
+        writer.writerow(export_order_row(order))
+        if count % ORDER_EXPORT_BATCH == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
 @app.route('/api/admin/orders', methods=['GET'])
 @login_required
+@admin_required
 def admin_get_orders():
-    if session['user'] != 'admin@example.com':
-        return jsonify({"error": "Unauthorized"}), 403
-    return jsonify(orders)
+    """Page through all orders, newest first, with optional filters"""
+    try:
+        filters = parse_order_filters(request.args)
+        limit = int(request.args.get('limit', ADMIN_ORDER_PAGE_SIZE))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 1 <= limit <= ADMIN_ORDER_PAGE_MAX:
+        return jsonify({"error": f"limit must be between 1 and {ADMIN_ORDER_PAGE_MAX}"}), 400
+    
+    after = None
+    if request.args.get('cursor'):
+        try:
+            after = decode_cursor(request.args['cursor'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if not (isinstance(after, list) and len(after) == 2 and all(isinstance(p, str) for p in after)):
+            return jsonify({"error": "Invalid cursor"}), 400
+        after = tuple(after)
+    
+    page = list(islice(repository.iter_orders(after=after, descending=True, **filters), limit + 1))
+    response = jsonify(page[:limit])
+    if len(page) > limit:
+        last = page[limit - 1]
+        response.headers['X-Next-Cursor'] = encode_cursor(last['date'], last['id'])
+    return response
+
+@app.route('/api/admin/orders/export', methods=['GET'])
+@login_required
+@admin_required
+def admin_export_orders():
+    """Stream matching orders, oldest first, as NDJSON or CSV"""
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"error": "format must be 'ndjson' or 'csv'"}), 400
+    try:
+        filters = parse_order_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    orders_iter = repository.iter_orders(batch_size=ORDER_EXPORT_BATCH, **filters)
+    if export_format == 'csv':
+        response = Response(stream_orders_csv(orders_iter), mimetype='text/csv')
+    else:
+        response = Response(stream_orders_ndjson(orders_iter), mimetype='application/x-ndjson')
+    filename = f"orders-{datetime.now().strftime('%Y%m%d%H%M%S')}.{export_format}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+ANALYTICS_MAX_DAYS = 366
+ANALYTICS_MAX_TOP = 100
+
+@app.route('/api/admin/analytics', methods=['GET'])
+@login_required
+@admin_required
+def admin_analytics():
+    """Sales dashboard numbers from running aggregates; cost doesn't grow with order count"""
+    try:
+        days = int(request.args.get('days', 30))
+        top = int(request.args.get('top', 10))
+    except ValueError:
+        return jsonify({"error": "days and top must be integers"}), 400
+    if not 1 <= days <= ANALYTICS_MAX_DAYS:
+        return jsonify({"error": f"days must be between 1 and {ANALYTICS_MAX_DAYS}"}), 400
+    if not 1 <= top <= ANALYTICS_MAX_TOP:
+        return jsonify({"error": f"top must be between 1 and {ANALYTICS_MAX_TOP}"}), 400
+
+    summary = repository.sales_summary(days, top)
+    for entry in summary['topProducts']:
+        product = catalog.get(entry['id'])
+        entry['name'] = product['name'] if product else None
+    return jsonify(summary)
+
+def build_product(data, product_id, created_at=None):
+    """A catalog product from validated admin input"""
+    return {
+        'id': product_id,
+        'name': sanitize_input(data['name']),
+        'description': sanitize_input(data['description']),
+        'category': sanitize_input(data['category']),
+        'price': float(data['price']),
+        'inStock': bool(data.get('inStock', True)),
+        'featured': bool(data.get('featured', False)),
+        'bestseller': bool(data.get('bestseller', False)),
+        'newArrival': bool(data.get('newArrival', False)),
+        'sizes': [sanitize_input(s) for s in data.get('sizes', [])],
+        'images': [sanitize_input(i) for i in data.get('images', [])],
+        'createdAt': created_at or datetime.now().isoformat()
+    }
+
+def validate_import_row(row):
+    """validate_product_data plus the shape checks a single-product form gets for free"""
+    is_valid, error_msg = validate_product_data(row)
+    if not is_valid:
+        return is_valid, error_msg
+    for field in ('name', 'description', 'category'):
+        if not isinstance(row[field], str):
+            return False, f"{field} must be a string"
+    for field in ('sizes', 'images'):
+        if field in row and not (isinstance(row[field], list) and all(isinstance(v, str) for v in row[field])):
+            return False, f"{field} must be a list of strings"
+    if 'id' in row and not (isinstance(row['id'], (str, int)) and str(row['id']).strip()):
+        return False, "Invalid id"
+    if 'stock' in row:
+        return validate_stock_data(row['stock'])
+    return True, "Valid"
 
 @app.route('/api/admin/products', methods=['GET', 'POST'])
 @login_required
+@admin_required
 def admin_products():
-    if session.get('user') != 'admin@example.com':
-        return jsonify({"error": "Unauthorized"}), 403
-    
     if request.method == 'POST':
         try:
             data = request.get_json()
@@ -480,39 +1486,123 @@ def admin_products():
             is_valid, error_msg = validate_product_data(data)
             if not is_valid:
                 return jsonify({"error": error_msg}), 400
+            if 'stock' in data:
+                is_valid, error_msg = validate_stock_data(data['stock'])
+                if not is_valid:
+                    return jsonify({"error": error_msg}), 400
             
-            product = {
-                'id': str(len(products) + 1),
-                'name': sanitize_input(data['name']),
-                'description': sanitize_input(data['description']),
-                'category': sanitize_input(data['category']),
-                'price': float(data['price']),
-                'inStock': bool(data.get('inStock', True)),
-                'featured': bool(data.get('featured', False)),
-                'bestseller': bool(data.get('bestseller', False)),
-                'newArrival': bool(data.get('newArrival', False)),
-                'sizes': [sanitize_input(s) for s in data.get('sizes', [])],
-                'images': [sanitize_input(i) for i in data.get('images', [])],
-                'createdAt': datetime.now().isoformat()
-            }
-            products.append(product)
+            product = build_product(data, product_ids.next_id())
+            catalog.add(product)
+            catalog_written(repository.save_product(product))
+            for size, count in data.get('stock', {}).items():
+                inventory.set_stock(product['id'], sanitize_input(size), count)
             return jsonify(product), 201
         except Exception as e:
             app.logger.error(f"Product creation error: {str(e)}")
             return jsonify({"error": "Failed to create product"}), 500
     
-    return jsonify(products), 200
+    return jsonify(catalog.all()), 200
+
+@app.route('/api/admin/products/import', methods=['POST'])
+@login_required
+@admin_required
+def admin_import_products():
+    """Create or replace products in bulk from NDJSON or CSV.
+
+    The body is read a line at a time and validated in batches; all valid
+    rows are then swapped into the catalog at once and written to storage
+    in one transaction (undoing the swap if that fails), so shoppers never
+    see half an import. A row with an ``id`` replaces that product (or
+    creates it under that id); rows without one get a new id. Invalid rows
+    are skipped and reported by line number. ``?dryRun=true`` validates
+    without applying anything.
+    """
+    fmt = detect_format(request.content_type, request.args.get('format'))
+    if fmt is None:
+        return jsonify({"error": "Send NDJSON (application/x-ndjson) or CSV (text/csv)"}), 415
+    try:
+        dry_run = parse_bool(request.args.get('dryRun', 'false'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    products = {}
+    stock = {}
+    errors = []
+    rows = failed = 0
+    now = datetime.now().isoformat()
+    for batch in batched(read_rows(request.stream, fmt, BULK_IMPORT_MAX_LINE_BYTES), BULK_IMPORT_BATCH_SIZE):
+        rows += len(batch)
+        if rows > BULK_IMPORT_MAX_ROWS:
+            return jsonify({"error": f"Imports are limited to {BULK_IMPORT_MAX_ROWS} rows"}), 413
+        
+        valid = []
+        for line, row in batch:
+            if not isinstance(row, RowError):
+                is_valid, error_msg = validate_import_row(row)
+                if is_valid:
+                    valid.append(row)
+                    continue
+                row = RowError(error_msg)
+            failed += 1
+            if len(errors) < BULK_IMPORT_MAX_ERRORS:
+                errors.append({"line": line, "error": str(row)})
+        
+        new_ids = iter(product_ids.next_ids(sum(1 for row in valid if 'id' not in row)))
+        for row in valid:
+            product_id = sanitize_input(str(row['id']).strip()) if 'id' in row else next(new_ids)
+            existing = products.get(product_id) or catalog.get(product_id)
+            product = build_product(row, product_id, existing.get('createdAt') if existing else now)
+            if existing:
+                product['updatedAt'] = now
+            products[product_id] = product
+            if 'stock' in row:
+                stock[product_id] = {sanitize_input(size): count for size, count in row['stock'].items()}
+    
+    if not rows:
+        return jsonify({"error": "No rows to import"}), 400
+    updated = sum(1 for product_id in products if product_id in catalog)
+    report = {
+        "created": len(products) - updated,
+        "updated": updated,
+        "failed": failed,
+        "errors": errors,
+        "errorsTruncated": failed > len(errors),
+        "dryRun": dry_run,
+    }
+    if not products:
+        return jsonify(report), 400
+    if dry_run:
+        return jsonify(report), 200
+    
+    # The catalog is updated first (anything it rejects is never stored) and
+    # put back if storage then fails, so the two never disagree
+    previous = {product_id: catalog.get(product_id) for product_id in products}
+    try:
+        catalog.upsert_many(products.values())
+        try:
+            catalog_written(repository.save_products(products.values()))
+        except Exception:
+            catalog.upsert_many(product for product in previous.values() if product)
+            for product_id, product in previous.items():
+                if product is None:
+                    catalog.remove(product_id)
+            raise
+        for product_id, levels in stock.items():
+            for size, count in levels.items():
+                inventory.set_stock(product_id, size, count)
+    except Exception as e:
+        app.logger.error(f"Product import error: {str(e)}")
+        return jsonify({"error": "Failed to import products"}), 500
+    return jsonify(report), 200
 
 @app.route('/api/admin/products/<product_id>', methods=['GET', 'PUT', 'DELETE'])
 @login_required
+@admin_required
 def admin_product(product_id):
-    if session.get('user') != 'admin@example.com':
-        return jsonify({"error": "Unauthorized"}), 403
-    
     product_id = sanitize_input(product_id)
     
     if request.method == 'GET':
-        product = next((p for p in products if p['id'] == product_id), None)
+        product = catalog.get(product_id)
         if product:
             return jsonify(product), 200
         return jsonify({"error": "Product not found"}), 404
@@ -523,64 +1613,147 @@ def admin_product(product_id):
             if not data:
                 return jsonify({"error": "No data provided"}), 400
             
-            product = next((p for p in products if p['id'] == product_id), None)
-            if not product:
+            if product_id not in catalog:
                 return jsonify({"error": "Product not found"}), 404
             
+            # Collect changes first so the catalog indexes are updated in one step
+            changes = {}
             if 'name' in data:
-                product['name'] = sanitize_input(data['name'])
+                changes['name'] = sanitize_input(data['name'])
             if 'description' in data:
-                product['description'] = sanitize_input(data['description'])
+                changes['description'] = sanitize_input(data['description'])
             if 'category' in data:
-                product['category'] = sanitize_input(data['category'])
+                changes['category'] = sanitize_input(data['category'])
             if 'price' in data:
                 try:
                     price = float(data['price'])
-                    if price < 0 or price > 999999:
+                    if not math.isfinite(price) or price < 0 or price > 999999:
                         return jsonify({"error": "Invalid price"}), 400
-                    product['price'] = price
+                    changes['price'] = price
                 except (ValueError, TypeError):
                     return jsonify({"error": "Invalid price format"}), 400
             if 'inStock' in data:
-                product['inStock'] = bool(data['inStock'])
+                changes['inStock'] = bool(data['inStock'])
             if 'featured' in data:
-                product['featured'] = bool(data['featured'])
+                changes['featured'] = bool(data['featured'])
             if 'bestseller' in data:
-                product['bestseller'] = bool(data['bestseller'])
+                changes['bestseller'] = bool(data['bestseller'])
             if 'newArrival' in data:
-                product['newArrival'] = bool(data['newArrival'])
+                changes['newArrival'] = bool(data['newArrival'])
             if 'sizes' in data:
-                product['sizes'] = [sanitize_input(s) for s in data.get('sizes', [])]
+                changes['sizes'] = [sanitize_input(s) for s in data.get('sizes', [])]
             if 'images' in data:
-                product['images'] = [sanitize_input(i) for i in data.get('images', [])]
+                changes['images'] = [sanitize_input(i) for i in data.get('images', [])]
+            if 'stock' in data:
+                is_valid, error_msg = validate_stock_data(data['stock'])
+                if not is_valid:
+                    return jsonify({"error": error_msg}), 400
             
-            product['updatedAt'] = datetime.now().isoformat()
+            changes['updatedAt'] = datetime.now().isoformat()
+            product = catalog.update(product_id, changes)
+            if not product:
+                return jsonify({"error": "Product not found"}), 404
+            catalog_written(repository.save_product(product))
+            for size, count in data.get('stock', {}).items():
+                inventory.set_stock(product_id, sanitize_input(size), count)
             return jsonify(product), 200
         except Exception as e:
             app.logger.error(f"Product update error: {str(e)}")
             return jsonify({"error": "Failed to update product"}), 500
     
     elif request.method == 'DELETE':
-        global products
-        if not any(p['id'] == product_id for p in products):
+        if not catalog.remove(product_id):
             return jsonify({"error": "Product not found"}), 404
-        products = [p for p in products if p['id'] != product_id]
+        catalog_written(repository.delete_product(product_id))
         return jsonify({"success": True}), 200
     
     return jsonify({"error": "Method not allowed"}), 405
 
+# ==================== STATIC ASSETS ====================
+# Built by `python assets.py`; without a build the source files are served uncached
+ASSET_BUILD_DIR = os.getenv('ASSET_BUILD_DIR', os.path.join(app.root_path, 'build', 'assets'))
+
+assets = AssetManifest(ASSET_BUILD_DIR, app.root_path)
+if not len(assets):
+    app.logger.info("No asset build in %s; serving unhashed static files", ASSET_BUILD_DIR)
+
+@app.template_global()
+def asset_url(filename):
+    """Fingerprinted URL of a file in static/ (or public/ as images/...)"""
+    return assets.url(filename)
+
+@app.template_global()
+def image_url(name, width=None, webp=False):
+    """Product image URL, resized to ``width`` when built; None for WebP that wasn't built"""
+    return assets.image_url(name or 'placeholder.svg', width, webp)
+
+@app.route('/assets/<path:filename>')
+def serve_asset(filename):
+    """Hashed assets are immutable; a precompressed sibling is sent when the client accepts it"""
+    found = assets.resolve(filename, request.accept_encodings)
+    if found is None:
+        abort(404)
+    path, mimetype, encoding, immutable = found
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE if immutable else 'no-cache'
+    return response
+
 # ==================== PAGES ====================
+FEATURED_PRODUCTS = 4
+
+@app.template_filter('stored_text')
+def stored_text(value):
+    """Product text is stored HTML-escaped; decode it so autoescaping escapes it exactly once"""
+    return unescape(str(value)) if value is not None else ''
+
+@app.template_filter('price')
+def format_price(value):
+    """Prices as the storefront scripts print them: 295, not 295.0"""
+    value = float(value or 0)
+    return str(int(value)) if value.is_integer() else str(value)
+
+def render_product_fragment(template, product_id):
+    product = catalog.get(product_id)
+    return render_template(template, product=product) if product else ''
+
+def render_cards(products):
+    """Product cards for a grid; each card is cached until its product changes"""
+    return ''.join(
+        fragments.product('card', p['id'], lambda pid=p['id']: render_product_fragment('_product_card.html', pid))
+        for p in products)
+
+def render_shop_grid(category):
+    items, next_after = catalog.query(category=category, limit=PRODUCT_PAGE_SIZE)
+    next_cursor = encode_cursor('default', False, *next_after) if next_after is not None else None
+    return render_cards(items), next_cursor
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    featured_html = fragments.get(
+        'featured', lambda: render_cards(catalog.query(flags={'featured': True}, limit=FEATURED_PRODUCTS)[0]),
+        catalog.version)
+    return render_template('index.html', featured_html=Markup(featured_html))
 
 @app.route('/shop')
 def shop():
-    return render_template('shop.html')
+    """Shop page with the first page of products rendered in; listings are cached per catalog version"""
+    category = request.args.get('category') or None
+    grid_html, next_cursor = fragments.get(('shop', category), lambda: render_shop_grid(category), catalog.version)
+    return render_template('shop.html', grid_html=Markup(grid_html), next_cursor=next_cursor,
+                           category=category, page_size=PRODUCT_PAGE_SIZE)
 
 @app.route('/product/<product_id>')
 def product_detail(product_id):
-    return render_template('product.html', product_id=product_id)
+    product_id = request.args.get('id') or product_id
+    product = catalog.get(product_id)
+    if product is None:
+        return render_template('product.html', product=None, product_html=''), 404
+    product_html = fragments.product(
+        'detail', product_id, lambda: render_product_fragment('_product_detail.html', product_id))
+    return render_template('product.html', product=product, product_html=Markup(product_html))
 
 @app.route('/cart')
 def cart():
@@ -625,6 +1798,16 @@ def bad_request(error):
     return jsonify({"error": "Bad request"}), 400
 
 # ==================== HEALTH CHECK ====================
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint for this worker process"""
+    if METRICS_TOKEN and not secrets.compare_digest(
+            request.headers.get('Authorization', ''), f"Bearer {METRICS_TOKEN}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    webhook_backlog.set(value=webhook_processor.backlog())
+    webhook_parked.set(value=webhook_processor.parked())
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
@@ -632,5 +1815,20 @@ def health_check():
         "payment_configured": bool(RAZORPAY_KEY_ID)
     }), 200
 
+# ==================== LIFECYCLE ====================
+def shutdown(timeout=None):
+    """Stop background work once requests have drained (serve.py calls this on SIGTERM).
+
+    Queued webhook events are applied before their workers exit; hashing
+    threads stop and gateway and database connections are closed.
+    """
+    webhook_processor.close(timeout)
+    password_hasher.shutdown()
+    if payment_gateway.loaded:
+        payment_gateway.get().close()
+    for store in (cart_store, inventory, repository):
+        store.close()
+
 if __name__ == '__main__':
+    # Development server; run serve.py in production
     app.run(debug=True)
@@ -0,0 +1,308 @@
+"""Static asset build: fingerprinted copies, precompressed siblings and image variants.
+
+Build from the repository root (re-run after changing static/ or public/):
+
+    python assets.py [--out build/assets] [--widths 400,800]
+
+Every file in ``static/`` and ``public/`` (served as ``images/``) is copied
+to ``<name>.<hash>.<ext>`` so its URL changes whenever its content does and
+can be cached forever. Text assets also get ``.gz`` and ``.br`` siblings,
+and JPEG/PNG images get resized and WebP variants. ``manifest.json`` maps
+the logical names templates use to the built files; it is written last, so
+a running app never sees a half-finished build. Old hashed files are kept
+for pages rendered before a deploy.
+
+Brotli siblings need the ``brotli`` package and image variants need Pillow;
+without them those outputs are skipped and clients get gzip and the original
+images.
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+
+from werkzeug.utils import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# URL prefix -> source directory, relative to the repository root
+SOURCES = (('', 'static'), ('images/', 'public'))
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.html', '.map')
+RESIZABLE = ('.jpg', '.jpeg', '.png')
+THUMBNAIL_WIDTHS = (400, 800)
+MIN_COMPRESS_BYTES = 512
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+# Accept-Encoding token -> sibling suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def hashed_name(logical, data, suffix='', ext=None):
+    root, original_ext = os.path.splitext(logical)
+    return f"{root}{suffix}.{fingerprint(data)}{ext or original_ext}"
+
+
+def iter_sources(root):
+    """``(logical name, source path)`` for every file under the source directories"""
+    for prefix, directory in SOURCES:
+        base = os.path.join(root, directory)
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                yield prefix + os.path.relpath(path, base).replace(os.sep, '/'), path
+
+
+class AssetBuilder:
+    """Writes one build into ``out_dir``; content-addressed outputs that already exist are reused"""
+
+    def __init__(self, out_dir, widths=THUMBNAIL_WIDTHS):
+        self.out_dir = out_dir
+        self.widths = tuple(sorted(widths))
+        self.written = 0
+        self.bytes = {'original': 0, 'gzip': 0, 'br': 0, 'images': 0, 'thumbnails': 0, 'webp': 0}
+
+    def _exists(self, name):
+        return os.path.exists(os.path.join(self.out_dir, name))
+
+    def _write(self, name, data):
+        path = os.path.join(self.out_dir, name)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        self.written += 1
+
+    def _compress(self, name, data):
+        if len(data) < MIN_COMPRESS_BYTES:
+            return
+        # mtime=0 keeps the gzip output reproducible
+        compressed = {'.gz': lambda: gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed['.br'] = lambda: brotli.compress(data, quality=11)
+        for suffix, compress in compressed.items():
+            if not self._exists(name + suffix):
+                self._write(name + suffix, compress())
+            self.bytes['gzip' if suffix == '.gz' else 'br'] += os.path.getsize(os.path.join(self.out_dir, name + suffix))
+
+    def _encode(self, image, fmt):
+        out = io.BytesIO()
+        if fmt == 'webp':
+            image.save(out, 'WEBP', quality=WEBP_QUALITY, method=6)
+        elif fmt == 'png':
+            image.save(out, 'PNG', optimize=True)
+        else:
+            image.convert('RGB').save(out, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        return out.getvalue()
+
+    def _variants(self, logical, path, previous):
+        """``{width: {'src': file, 'webp': file}}`` plus the source width"""
+        if previous and all(self._exists(name) for sizes in previous['variants'].values() for name in sizes.values()):
+            return previous['variants'], previous['width']
+        fmt = 'png' if logical.lower().endswith('.png') else 'jpeg'
+        variants = {}
+        with Image.open(path) as source:
+            source.load()
+            width, height = source.size
+            for target in self.widths + (width,):
+                if target > width or str(target) in variants:
+                    continue
+                image = source if target == width else source.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS)
+                sizes = {}
+                for key, encoding in (('src', fmt), ('webp', 'webp')):
+                    if key == 'src' and target == width:
+                        continue
+                    data = self._encode(image, encoding)
+                    name = hashed_name(logical, data, f"-{target}w", '.webp' if key == 'webp' else None)
+                    self._write(name, data)
+                    sizes[key] = name
+                variants[str(target)] = sizes
+        return variants, width
+
+    def build(self, root):
+        manifest_path = os.path.join(self.out_dir, MANIFEST)
+        previous = load_manifest(manifest_path)
+        # Image variants are only reused when they were built at the same widths
+        previous = previous.get('assets', {}) if previous.get('widths') == list(self.widths) else {}
+        assets = {}
+        for logical, path in iter_sources(root):
+            with open(path, 'rb') as f:
+                data = f.read()
+            name = hashed_name(logical, data)
+            self._write(name, data)
+            entry = {'file': name}
+            ext = os.path.splitext(logical)[1].lower()
+            if ext in COMPRESSIBLE:
+                self.bytes['original'] += len(data)
+                self._compress(name, data)
+            if ext in RESIZABLE and Image is not None:
+                old = previous.get(logical)
+                old = old if old and old['file'] == name and 'variants' in old else None
+                entry['variants'], entry['width'] = self._variants(logical, path, old)
+                self.bytes['images'] += len(data)
+                smallest = entry['variants'].get(str(self.widths[0])) if self.widths else None
+                if smallest:
+                    self.bytes['thumbnails'] += os.path.getsize(
+                        os.path.join(self.out_dir, smallest.get('src', name)))
+                    self.bytes['webp'] += os.path.getsize(os.path.join(self.out_dir, smallest['webp']))
+            assets[logical] = entry
+        self._write_manifest(manifest_path, {'widths': list(self.widths), 'assets': assets})
+        return assets
+
+    def _write_manifest(self, path, manifest):
+        os.makedirs(self.out_dir, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, path)
+
+
+def load_manifest(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+class AssetManifest:
+    """Resolves logical asset names to URLs and request paths to files.
+
+    With a build present, ``url()`` gives hashed ``/assets/...`` URLs that are
+    served with ``Cache-Control: immutable`` and precompressed bodies. Without
+    one (a fresh checkout) the same URLs fall back to the unhashed source
+    files, served ``no-cache``, so development needs no build step.
+    """
+
+    def __init__(self, build_dir, root, url_prefix='/assets/'):
+        self.build_dir = build_dir
+        self.root = root
+        self.url_prefix = url_prefix
+        manifest = load_manifest(os.path.join(build_dir, MANIFEST))
+        self.assets = manifest.get('assets', {})
+        self.widths = tuple(manifest.get('widths', ()))
+        self._built = {}
+        for entry in self.assets.values():
+            names = [entry['file']]
+            for sizes in entry.get('variants', {}).values():
+                names.extend(sizes.values())
+            for name in names:
+                self._built[name] = self._siblings(name)
+
+    def _siblings(self, name):
+        path = os.path.join(self.build_dir, name)
+        return tuple((token, path + suffix) for token, suffix in ENCODINGS if os.path.exists(path + suffix))
+
+    def __len__(self):
+        return len(self.assets)
+
+    def url(self, logical):
+        entry = self.assets.get(logical)
+        return self.url_prefix + (entry['file'] if entry else logical)
+
+    def image_url(self, name, width=None, webp=False):
+        """URL of a product image, resized to one of the built widths.
+
+        Falls back to the full-size image when no resized copy was built; with
+        ``webp=True`` returns None instead, so templates only offer WebP when
+        it exists.
+        """
+        logical = f"images/{name}"
+        entry = self.assets.get(logical)
+        variants = entry.get('variants') if entry else None
+        if variants:
+            # The requested width, or the full-size variant for images narrower than that
+            sizes = variants.get(str(width)) or variants.get(str(entry['width'])) or {}
+            if webp:
+                return self.url_prefix + sizes['webp'] if 'webp' in sizes else None
+            if 'src' in sizes:
+                return self.url_prefix + sizes['src']
+        return None if webp else self.url(logical)
+
+    def resolve(self, filename, accept_encodings):
+        """``(path, mimetype, content encoding or None, immutable)`` for a request, or None"""
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if filename in self._built:
+            siblings = self._built[filename]
+            immutable = True
+            path = os.path.join(self.build_dir, filename)
+        elif filename in self.assets:
+            # The unhashed name of a built asset: its current content, revalidated every time
+            siblings = self._built[self.assets[filename]['file']]
+            immutable = False
+            path = os.path.join(self.build_dir, self.assets[filename]['file'])
+        else:
+            path = self._source_path(filename)
+            if path is None:
+                return None
+            return path, mimetype, None, False
+
+        best = None
+        for token, sibling in siblings:
+            quality = accept_encodings[token]
+            if quality > 0 and (best is None or quality > best[0]):
+                best = (quality, token, sibling)
+        if best is not None:
+            return best[2], mimetype, best[1], immutable
+        return path, mimetype, None, immutable
+
+    def _source_path(self, filename):
+        for prefix, directory in SOURCES:
+            if not filename.startswith(prefix):
+                continue
+            path = safe_join(os.path.join(self.root, directory), filename[len(prefix):])
+            if path is not None and os.path.isfile(path):
+                return path
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--out', default=os.getenv('ASSET_BUILD_DIR', os.path.join('build', 'assets')))
+    parser.add_argument('--widths', default=','.join(map(str, THUMBNAIL_WIDTHS)),
+                        help='comma-separated thumbnail widths in pixels')
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    widths = [int(w) for w in args.widths.split(',') if w.strip()]
+    builder = AssetBuilder(os.path.join(root, args.out), widths)
+    assets = builder.build(root)
+    sizes = builder.bytes
+    print(f"{len(assets)} assets, {builder.written} files written to {args.out}")
+    if sizes['original']:
+        ratios = ', '.join(f"{token} {sizes[token] / sizes['original']:.0%}" for token in ('gzip', 'br') if sizes[token])
+        print(f"text assets {sizes['original']:,} bytes ({ratios} of original)")
+    if sizes['images']:
+        print(f"images {sizes['images']:,} bytes; {widths[0]}px thumbnails {sizes['thumbnails']:,} bytes,"
+              f" as WebP {sizes['webp']:,} bytes")
+    if brotli is None:
+        print("brotli not installed: skipped .br siblings")
+    if Image is None:
+        print("Pillow not installed: skipped resized and WebP images")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Admin analytics latency as order volume grows: running aggregates vs a full scan.
+
+Run from the repository root:
+
+    python benchmarks/bench_analytics.py [--max-orders 1000000] [--backend memory|sqlite]
+
+For each order count the dashboard summary is read from the repository's
+running aggregates and, for comparison, recomputed by scanning every order
+(what the browser had to do after downloading them all). The aggregate
+read should stay flat while the scan grows with the order count.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import SalesAggregates, summarize  # noqa: E402
+from storage import create_repository  # noqa: E402
+
+STATUSES = ['completed'] * 6 + ['pending'] * 3 + ['failed']
+
+
+def make_orders(start, count, rng):
+    now = datetime.now()
+    orders = []
+    for i in range(start, start + count):
+        quantity = rng.randint(1, 3)
+        price = rng.randint(50, 450)
+        orders.append({
+            'id': f"ORD-{i:016X}",
+            'customerId': f"customer{rng.randrange(50_000)}@example.com",
+            'date': (now - timedelta(minutes=rng.randrange(365 * 24 * 60))).isoformat(),
+            'status': 'pending',
+            'paymentStatus': rng.choice(STATUSES),
+            'items': [{'id': str(rng.randint(1, 10_000)), 'quantity': quantity, 'lineTotal': price * quantity}],
+            'total': price * quantity,
+        })
+    return orders
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def full_scan(repository):
+    aggregates = SalesAggregates()
+    for order in repository.iter_orders():
+        aggregates.apply(None, order)
+    return summarize(aggregates)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-orders', type=int, default=1_000_000)
+    parser.add_argument('--backend', choices=['memory', 'sqlite'], default='memory')
+    parser.add_argument('--scan-limit', type=int, default=100_000, help='skip the full scan above this many orders')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        repository = create_repository(args.backend, os.path.join(tmp, 'bench.db'))
+        print(f"{'orders':>10} {'insert (us/order)':>18} {'summary (ms)':>13} {'full scan (ms)':>15}")
+        total = 0
+        size = 1_000
+        while size <= args.max_orders:
+            batch = make_orders(total, size - total, rng)
+            start = time.perf_counter()
+            for offset in range(0, len(batch), 10_000):
+                repository.add_orders(batch[offset:offset + 10_000])
+            insert_us = (time.perf_counter() - start) / len(batch) * 1e6
+            total = size
+
+            summary_ms = timed(lambda: repository.sales_summary(30, 10), 50)
+            scan = f"{timed(lambda: full_scan(repository), 1):15.1f}" if size <= args.scan_limit else f"{'-':>15}"
+            print(f"{size:10,d} {insert_us:18.1f} {summary_ms:13.3f} {scan}")
+            size *= 10
+        repository.close()
+
+
+if __name__ == '__main__':
+    main()
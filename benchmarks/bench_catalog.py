@@ -0,0 +1,55 @@
+"""Catalog lookup latency at increasing catalog sizes.
+
+Run from the repository root:
+
+    python benchmarks/bench_catalog.py [--max-size 1000000]
+
+Compares the old linear scan over a product list with CatalogStore lookups.
+Indexed lookups and page queries should stay flat as the catalog grows.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import CatalogStore
+from seed import make_products
+
+
+def per_call_us(fn, args, repeat):
+    start = time.perf_counter()
+    for a in args:
+        fn(a)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-size', type=int, default=1_000_000)
+    parser.add_argument('--lookups', type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"{'products':>10} {'scan get (us)':>14} {'index get (us)':>15} {'index update (us)':>18} {'query page (us)':>16}")
+    size = 10
+    while size <= args.max_size:
+        products = make_products(size, random.Random(0))
+        store = CatalogStore(products)
+        ids = [str(random.randint(1, size)) for _ in range(args.lookups)]
+
+        # Linear scans get expensive quickly; sample fewer lookups for big lists.
+        scan_ids = ids[:max(1, min(args.lookups, 1_000_000 // size))]
+        scan = per_call_us(lambda pid: next((p for p in products if p['id'] == pid), None),
+                           scan_ids, len(scan_ids))
+        indexed = per_call_us(store.get, ids, len(ids))
+        update = per_call_us(lambda pid: store.update(pid, {'featured': True}), ids, len(ids))
+        page = per_call_us(lambda _: store.query(category='Knitwear', sort='price', limit=24),
+                           ids[:1000], 1000)
+        print(f"{size:>10} {scan:>14.2f} {indexed:>15.3f} {update:>18.3f} {page:>16.2f}")
+        size *= 10
+
+
+if __name__ == '__main__':
+    main()
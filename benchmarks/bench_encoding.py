@@ -0,0 +1,100 @@
+"""JSON serialization and response compression for large catalog and order payloads.
+
+Run from the repository root:
+
+    python benchmarks/bench_encoding.py [--products 100000] [--orders 500]
+
+For the full /api/products catalog and a maximum-size /api/admin/orders page
+this reports:
+
+* serialization time and size for Flask's default encoder (what jsonify did
+  before), the stdlib serializer and orjson;
+* compressed size and compression time for gzip and brotli at a few levels;
+* end-to-end request time and bytes on the wire through the app for each
+  Accept-Encoding. The catalog is served from the response cache, so after
+  the first request its compressed body is cached too.
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import app as shop  # noqa: E402
+from compression import brotli  # noqa: E402
+from serialization import create_serializer, orjson  # noqa: E402
+from seed import ADMIN_EMAIL, make_orders, make_products  # noqa: E402
+
+
+def timed_ms(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--orders', type=int, default=shop.ADMIN_ORDER_PAGE_MAX, help='admin orders page size')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    products = make_products(args.products, rng)
+    shop.catalog.replace_all(products)
+    shop.repository.add_orders(make_orders(args.orders, products, 10_000, shop.order_ids, rng))
+    payloads = {
+        f'/api/products ({args.products:,} products)': ('/api/products', shop.catalog.all()),
+        f'/api/admin/orders (limit={args.orders})': (
+            f'/api/admin/orders?limit={args.orders}',
+            list(shop.repository.iter_orders(descending=True))[:args.orders]),
+    }
+
+    default = shop.app.json.default
+    serializers = [('flask default', lambda obj: shop.DefaultJSONProvider.dumps(shop.app.json, obj).encode('utf-8'))]
+    for name in ('json', 'orjson'):
+        if name == 'orjson' and orjson is None:
+            print("orjson not installed: skipping it")
+            continue
+        serializers.append((name, create_serializer(name, default).dumps))
+
+    compressors = [('gzip -1', lambda d: gzip.compress(d, 1, mtime=0)), ('gzip -6', lambda d: gzip.compress(d, 6, mtime=0))]
+    if brotli is not None:
+        compressors += [(f'br q{q}', lambda d, q=q: brotli.compress(d, quality=q)) for q in (1, 4, 6)]
+    else:
+        print("brotli not installed: skipping it")
+
+    client = shop.app.test_client()
+    with client.session_transaction() as session:
+        session['user'] = ADMIN_EMAIL
+
+    for title, (url, payload) in payloads.items():
+        print(f"\n{title}")
+        print(f"  {'serializer':14s} {'ms':>9s} {'bytes':>13s}")
+        for name, dumps in serializers:
+            ms, body = timed_ms(lambda: dumps(payload), args.repeat)
+            print(f"  {name:14s} {ms:9.1f} {len(body):13,d}")
+
+        print(f"  {'compression':14s} {'ms':>9s} {'bytes':>13s} {'ratio':>6s}")
+        for name, compress in compressors:
+            ms, compressed = timed_ms(lambda: compress(body), args.repeat)
+            print(f"  {name:14s} {ms:9.1f} {len(compressed):13,d} {len(compressed) / len(body):6.1%}")
+
+        print(f"  {'Accept-Encoding':14s} {'ms':>9s} {'wire bytes':>13s}")
+        for accept in ('identity', 'gzip', 'br'):
+            if accept == 'br' and brotli is None:
+                continue
+            client.get(url, headers={'Accept-Encoding': accept})  # warm the response caches
+            ms, response = timed_ms(lambda: client.get(url, headers={'Accept-Encoding': accept}), args.repeat)
+            assert response.status_code == 200, response.status_code
+            print(f"  {accept:14s} {ms:9.1f} {len(response.get_data()):13,d}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Login storm: login throughput and catalog latency with and without the hashing pool.
+
+Run from the repository root:
+
+    python benchmarks/bench_login.py [--threads 16] [--seconds 5] [--workers 2] [--queue 8]
+
+Many threads log in as fast as they can while one thread keeps fetching a
+product page. The run is repeated with hashing inline on the request
+threads (the old behaviour) and with the bounded PasswordHasher pool, and
+reports logins per second, logins turned away with 503, and p50/p99
+latency of the catalog requests served during the storm.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Every simulated client shares one IP and email; measure hashing, not throttling
+os.environ.setdefault('LOGIN_LIMIT_PER_IP', '1000000000')
+os.environ.setdefault('LOGIN_LIMIT_PER_EMAIL', '1000000000')
+
+import app as shop  # noqa: E402
+from passwords import PasswordHasher  # noqa: E402
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def storm(threads, seconds):
+    stop = time.monotonic() + seconds
+    statuses = [[] for _ in range(threads)]
+    catalog_latency = []
+
+    def login(t):
+        client = shop.app.test_client()
+        while time.monotonic() < stop:
+            response = client.post('/api/auth/login', json={'email': 'user@example.com', 'password': 'password123'})
+            statuses[t].append(response.status_code)
+            if response.status_code == 503:
+                time.sleep(0.1)
+
+    def browse():
+        client = shop.app.test_client()
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            client.get('/api/products/1')
+            catalog_latency.append(time.perf_counter() - start)
+            time.sleep(0.005)
+
+    pool = [threading.Thread(target=login, args=(t,)) for t in range(threads)]
+    pool.append(threading.Thread(target=browse))
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    codes = [code for thread in statuses for code in thread]
+    return codes, catalog_latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16, help='concurrent login clients')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='hashing pool size')
+    parser.add_argument('--queue', type=int, default=8, help='max queued or running hashes')
+    parser.add_argument('--method', default=shop.PASSWORD_HASH_METHOD)
+    args = parser.parse_args()
+
+    for name, hasher in (('inline hashing', PasswordHasher(args.method, workers=0)),
+                         (f"pool of {args.workers}, queue {args.queue}",
+                          PasswordHasher(args.method, workers=args.workers, max_pending=args.queue))):
+        shop.password_hasher = hasher
+        shop.repository.set_password_hash('user@example.com', hasher.hash('password123'))
+        codes, latency = storm(args.threads, args.seconds)
+        print(f"{name:24s} {codes.count(200) / args.seconds:7.1f} logins/s  {codes.count(503):5d} x 503"
+              f"  catalog p50 {percentile(latency, 0.5) * 1000:7.2f} ms  p99 {percentile(latency, 0.99) * 1000:7.2f} ms"
+              f"  ({len(latency)} requests)")
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
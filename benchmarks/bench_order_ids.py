@@ -0,0 +1,101 @@
+"""Order id generation throughput and uniqueness across threads and processes.
+
+Run from the repository root:
+
+    python benchmarks/bench_order_ids.py [--ids 1000000] [--threads 4] [--workers 4]
+
+Measures a single thread (one id per call, then ``next_ids`` batches), then
+several threads sharing one generator, then several processes with their
+own worker ids (as gunicorn workers would).
+Every id is checked for duplicates and for being strictly increasing within
+the thread or process that made it.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from order_ids import OrderIdGenerator
+
+
+def generate(generator, count, batch=1):
+    if batch > 1:
+        ids = []
+        while len(ids) < count:
+            ids.extend(generator.next_ids(min(batch, count - len(ids))))
+        return ids
+    next_id = generator.next_id
+    return [next_id() for _ in range(count)]
+
+
+def assert_increasing(ids):
+    assert all(a < b for a, b in zip(ids, ids[1:])), "ids are not strictly increasing"
+
+
+def process_worker(worker_id, count, batch, results):
+    generator = OrderIdGenerator(worker_id=worker_id)
+    start = time.perf_counter()
+    ids = generate(generator, count, batch)
+    elapsed = time.perf_counter() - start
+    assert_increasing(ids)
+    results.put((elapsed, ids))
+
+
+def report(name, count, elapsed, unique):
+    assert unique == count, f"{count - unique} duplicate ids"
+    print(f"{name:26s} {count / elapsed / 1e6:6.2f}M ids/s  {count:>9,d} ids, no duplicates")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--ids', type=int, default=1_000_000, help='ids per run')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=1000, help='ids per next_ids call')
+    args = parser.parse_args()
+
+    generator = OrderIdGenerator(worker_id=1)
+    for name, batch in (('1 thread, next_id', 1), (f"1 thread, next_ids({args.batch})", args.batch)):
+        start = time.perf_counter()
+        ids = generate(generator, args.ids, batch)
+        elapsed = time.perf_counter() - start
+        assert_increasing(ids)
+        report(name, args.ids, elapsed, len(set(ids)))
+
+    per_thread = args.ids // args.threads
+    results = [None] * args.threads
+
+    def run(t):
+        results[t] = generate(generator, per_thread, args.batch)
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(args.threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for thread_ids in results:
+        assert_increasing(thread_ids)
+    report(f"{args.threads} threads, batched", per_thread * args.threads, elapsed,
+           len(set().union(*results)))
+
+    per_worker = args.ids // args.workers
+    queue = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=process_worker, args=(w, per_worker, args.batch, queue))
+             for w in range(args.workers)]
+    for proc in procs:
+        proc.start()
+    outcomes = [queue.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    report(f"{args.workers} processes, batched", per_worker * args.workers, max(o[0] for o in outcomes),
+           len(set().union(*(o[1] for o in outcomes))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Storefront pages: server-rendered with cached fragments vs an empty page plus an API call.
+
+Run from the repository root:
+
+    python benchmarks/bench_pages.py [--products 100000] [--requests 2000] [--rtt-ms 50]
+
+The old pages were empty templates whose script then fetched the products,
+so content needed two sequential round trips. For the shop page, a product
+page and the home page this reports server time per page view and views
+per second for both approaches, and a modelled time-to-content of server
+time plus one ``--rtt-ms`` per round trip. It also times a product page
+right after an admin edit, when only that product's fragment is re-rendered.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import app as shop  # noqa: E402
+from seed import make_products  # noqa: E402
+
+
+def per_view_ms(fn, ids, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(ids[i % len(ids)])
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bare_page(template, **context):
+    """What the old page routes returned: the template with no product data in it"""
+    with shop.app.test_request_context():
+        return shop.render_template(template, **context)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--rtt-ms', type=float, default=50, help='network round trip used for time-to-content')
+    args = parser.parse_args()
+
+    shop.catalog.replace_all(make_products(args.products, random.Random(0)))
+    client = shop.app.test_client()
+    rng = random.Random(1)
+    # Popular products get most views, so their fragments stay cached
+    hot = [str(rng.randint(1, args.products)) for _ in range(500)]
+
+    pages = {
+        'shop': (
+            lambda _: client.get('/shop'),
+            lambda _: (bare_page('shop.html', grid_html='', next_cursor=None, category=None, page_size=24),
+                       client.get('/api/products?limit=24')),
+        ),
+        'product': (
+            lambda pid: client.get(f'/product/{pid}'),
+            lambda pid: (bare_page('product.html', product=None, product_html=''),
+                         client.get(f'/api/products/{pid}')),
+        ),
+        'home': (
+            lambda _: client.get('/'),
+            lambda _: (bare_page('index.html', featured_html=''),
+                       client.get('/api/products?featured=true&limit=4')),
+        ),
+    }
+
+    print(f"{args.products:,} products, {args.requests} views per page, RTT {args.rtt_ms:g} ms")
+    print(f"{'page':10s} {'approach':16s} {'server ms':>10s} {'views/s':>9s} {'time-to-content ms':>19s}")
+    for name, (server_rendered, client_rendered) in pages.items():
+        for fn in (server_rendered, client_rendered):
+            fn(hot[0])  # warm up
+        for label, fn, round_trips in (('server-rendered', server_rendered, 1), ('page + API call', client_rendered, 2)):
+            ms = per_view_ms(fn, hot, args.requests)
+            print(f"{name:10s} {label:16s} {ms:10.3f} {1000 / ms:9.0f} {ms + round_trips * args.rtt_ms:19.1f}")
+
+    # An admin edit retires only the edited product's fragments
+    admin = shop.app.test_client()
+    with admin.session_transaction() as session:
+        session['user'] = 'admin@example.com'
+    edits = []
+    for pid in hot[:200]:
+        admin.put(f'/api/admin/products/{pid}', json={'price': rng.randint(50, 450)})
+        start = time.perf_counter()
+        client.get(f'/product/{pid}')
+        edits.append((time.perf_counter() - start) * 1000)
+    cached = per_view_ms(pages['product'][0], hot[200:], args.requests)
+    print(f"product page just after its edit {sum(edits) / len(edits):.3f} ms, other products {cached:.3f} ms"
+          f" (fragment cache hits {shop.fragments.hits:,}, misses {shop.fragments.misses:,})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Payment gateway client latency, retries and idempotency against a fake Razorpay.
+
+Run from the repository root:
+
+    python benchmarks/bench_payments.py [--calls 500] [--threads 16] [--latency 0.005]
+
+1. Sequential order creation with a new connection per call (what an
+   unpooled client does) against the pooled RazorpayGateway.
+2. Concurrent order creation while 20% of calls fail with 503 after the
+   gateway created the order: every call must succeed through retries and
+   every receipt must map to exactly one gateway order.
+3. Many threads creating the same order at once share one gateway order.
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_razorpay import KEY_ID, KEY_SECRET, start
+from payments import RazorpayGateway
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def report(name, samples, connections):
+    print(f"{name:28s} mean {statistics.mean(samples) * 1000:6.2f} ms  p95 {percentile(samples, 0.95) * 1000:6.2f} ms"
+          f"  {connections:4d} connections")
+
+
+def bench_pooling(calls, latency):
+    server = start(latency=latency)
+    samples = []
+    for i in range(calls):
+        start_time = time.perf_counter()
+        requests.post(server.url + '/orders', json={'amount': 1000, 'receipt': f"unpooled-{i}"},
+                      auth=(KEY_ID, KEY_SECRET), timeout=5).raise_for_status()
+        samples.append(time.perf_counter() - start_time)
+    report('new connection per call', samples, server.connections)
+    server.shutdown()
+
+    server = start(latency=latency)
+    gateway = RazorpayGateway(KEY_ID, KEY_SECRET, base_url=server.url)
+    samples = []
+    for i in range(calls):
+        start_time = time.perf_counter()
+        gateway.create_order(1000, receipt=f"pooled-{i}")
+        samples.append(time.perf_counter() - start_time)
+    report('pooled RazorpayGateway', samples, server.connections)
+    gateway.close()
+    server.shutdown()
+
+
+def bench_retries(calls, threads, latency):
+    server = start(latency=latency, fail_rate=0.2, seed=1)
+    gateway = RazorpayGateway(KEY_ID, KEY_SECRET, base_url=server.url, max_retries=5, backoff=0.01)
+    per_thread = calls // threads
+    samples, errors = [], []
+
+    def run(t):
+        for i in range(per_thread):
+            start_time = time.perf_counter()
+            try:
+                gateway.create_order(1000, receipt=f"ORD-{t}-{i}")
+            except Exception as e:
+                errors.append(e)
+            samples.append(time.perf_counter() - start_time)
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    per_receipt = Counter(order['receipt'] for order in server.orders.values())
+    duplicates = sum(count - 1 for count in per_receipt.values())
+    report(f"{threads} threads, 20% failures", samples, server.connections)
+    print(f"{'':28s} {len(samples) - len(errors)}/{len(samples)} succeeded, "
+          f"{server.requests} gateway calls, {duplicates} duplicate gateway orders")
+    assert not errors and duplicates == 0
+    gateway.close()
+    server.shutdown()
+
+
+def bench_idempotency(threads, latency):
+    server = start(latency=max(latency, 0.05))
+    gateway = RazorpayGateway(KEY_ID, KEY_SECRET, base_url=server.url)
+    results = [None] * threads
+
+    def run(t):
+        results[t] = gateway.create_order(1000, receipt='ORD-SAME')['id']
+
+    pool = [threading.Thread(target=run, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    print(f"{threads} concurrent calls, one key -> {len(set(results))} gateway order(s), "
+          f"{len(server.orders)} created")
+    assert len(set(results)) == 1 and len(server.orders) == 1
+    gateway.close()
+    server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--latency', type=float, default=0.005, help='fake gateway delay per call, seconds')
+    args = parser.parse_args()
+
+    bench_pooling(args.calls, args.latency)
+    bench_retries(args.calls, args.threads, args.latency)
+    bench_idempotency(args.threads, args.latency)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Cart pricing latency: uncached quotes vs. per-cart-version cache hits.
+
+Run from the repository root:
+
+    python benchmarks/bench_pricing.py [--products 100000] [--lines 20]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import CatalogStore
+from pricing import PricingEngine
+from seed import make_products
+
+
+def per_call_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--lines', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20_000)
+    args = parser.parse_args()
+
+    catalog = CatalogStore(make_products(args.products, random.Random(0)))
+    pricing = PricingEngine(catalog, shipping=15)
+    items = [{'id': str(random.randint(1, args.products)), 'size': 'M', 'quantity': 2}
+             for _ in range(args.lines)]
+
+    uncached = per_call_us(lambda: pricing.quote(items), args.repeat)
+    cached = per_call_us(lambda: pricing.quote_cart('cart', 1, items), args.repeat)
+    print(f"{args.lines}-line cart, {args.products} products")
+    print(f"  quote (uncached): {uncached:8.2f} us")
+    print(f"  quote (cached):   {cached:8.2f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Throughput of /api/products with and without the response cache.
+
+Run from the repository root:
+
+    python benchmarks/bench_response_cache.py [--products 10000]
+
+Three paths are measured through the Flask test client:
+
+* ``jsonify``  - the old path, serializing the catalog on every request
+* ``cached``   - pre-serialized body from ResponseCache
+* ``304``      - revalidation with a matching If-None-Match header
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import jsonify
+
+import app as shop
+from seed import make_products
+
+
+def throughput(client, path, requests, headers=None):
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get(path, headers=headers)
+        response.close()
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    for product in make_products(args.products, random.Random(0)):
+        shop.catalog.add(product)
+
+    @shop.app.route('/bench/uncached-products')
+    def uncached_products():
+        return jsonify(shop.catalog.all())
+
+    client = shop.app.test_client()
+    etag = client.get('/api/products').headers['ETag']
+
+    print(f"catalog size: {len(shop.catalog)} products")
+    for label, path, headers in [
+        ('jsonify', '/bench/uncached-products', None),
+        ('cached', '/api/products', None),
+        ('304', '/api/products', {'If-None-Match': etag}),
+    ]:
+        rps = throughput(client, path, args.requests, headers)
+        print(f"{label:>8}: {rps:10.1f} req/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Search query latency on a synthetic catalog.
+
+Run from the repository root:
+
+    python benchmarks/bench_search.py [--products 100000]
+
+Reports index build time, per-product incremental update cost and
+p50/p99 latency for full-word and typeahead (prefix) queries.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchIndex
+from seed import GARMENTS, MATERIALS, STYLES, make_products
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def time_queries(index, queries, prefix):
+    samples = []
+    for q in queries:
+        start = time.perf_counter()
+        index.search(q, limit=20, prefix=prefix)
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=100_000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    products = make_products(args.products, rng)
+    start = time.perf_counter()
+    index = SearchIndex(products)
+    print(f"build: {time.perf_counter() - start:.2f}s for {len(index)} products")
+
+    updates = rng.sample(products, min(1000, len(products)))
+    start = time.perf_counter()
+    for product in updates:
+        index.add(dict(product, name=product['name'] + ' updated'))
+    print(f"incremental update: {(time.perf_counter() - start) / len(updates) * 1e6:.1f} us/product")
+
+    full = [f"{rng.choice(MATERIALS)} {rng.choice(GARMENTS)}" for _ in range(args.queries)]
+    typeahead = [f"{rng.choice(STYLES)} {rng.choice(MATERIALS)[:3]}" for _ in range(args.queries)]
+    p50, p99 = time_queries(index, full, prefix=False)
+    print(f"full-word queries: p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+    p50, p99 = time_queries(index, typeahead, prefix=True)
+    print(f"typeahead queries: p50 {p50:.2f} ms  p99 {p99:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Cold start: time to import the app and serve the first requests in a fresh process.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--runs 3] [--database /tmp/shop.db] [--target-ms 1500]
+
+Each run starts a new interpreter that imports the app and sends one request
+to the storefront, the product listing, search and login (the first login
+creates the seeded demo user, hashing its password). Reported times are
+medians over ``--runs``; "process" is everything from launching the
+interpreter to the app being importable.
+
+Without ``--database`` this measures the memory backend with the mock
+catalog. With it (a database filled by ``benchmarks/seed.py``) it also
+measures SQLite twice: without a startup snapshot and then booting from one
+(written by the first boot into a temporary directory). With ``--target-ms``
+the script exits with status 1 if any scenario's import plus first requests
+takes longer, so it can run in CI.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIRST_REQUESTS = [
+    ('/', 'GET', None),
+    ('/api/products?limit=24', 'GET', None),
+    ('/api/products/search?q=shirt', 'GET', None),
+    ('/api/auth/login', 'POST', {'email': 'user@example.com', 'password': 'password123'}),
+]
+
+
+def probe(started):
+    """Runs in the child process: prints the timings as JSON"""
+    imported = time.perf_counter()
+    import app as shop
+    timings = {'process': (imported - started) * 1000, 'import': (time.perf_counter() - imported) * 1000}
+    client = shop.app.test_client()
+    for path, method, body in FIRST_REQUESTS:
+        start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        timings[f'{method} {path}'] = (time.perf_counter() - start) * 1000
+        assert response.status_code == 200, (path, response.status_code)
+    if shop.STARTUP_SNAPSHOT and not shop.startup_snapshot:
+        # Wait for the snapshot this boot writes, so the next run can use it
+        while not os.path.exists(shop.STARTUP_SNAPSHOT):
+            time.sleep(0.1)
+    timings['snapshot'] = bool(shop.startup_snapshot)
+    print(json.dumps(timings))
+
+
+def run(env, runs):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--probe', repr(time.perf_counter())],
+                                cwd=ROOT, env={**os.environ, **env}, check=True, capture_output=True, text=True)
+        results.append(json.loads(output.stdout.splitlines()[-1]))
+    return results
+
+
+def report(title, results, target_ms):
+    print(f"\n{title}" + (" (from snapshot)" if results[0]['snapshot'] else ""))
+    for key in results[0]:
+        if key != 'snapshot':
+            print(f"  {key:40s} {statistics.median(r[key] for r in results):9.1f} ms")
+    median = statistics.median(sum(v for k, v in r.items() if k not in ('process', 'snapshot')) for r in results)
+    print(f"  {'import + first requests':40s} {median:9.1f} ms")
+    if target_ms and median > target_ms:
+        print(f"  over the {target_ms:.0f} ms target")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--database', help='a SQLite database filled by benchmarks/seed.py')
+    parser.add_argument('--target-ms', type=float, help='fail if import plus first requests take longer')
+    parser.add_argument('--probe', type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.probe is not None:
+        # perf_counter is system-wide on Linux/macOS, so the parent's reading marks the launch
+        probe(args.probe)
+        return 0
+
+    ok = report('memory backend, mock catalog', run({'STORAGE_BACKEND': 'memory', 'STARTUP_SNAPSHOT': ''}, args.runs),
+                args.target_ms)
+    if args.database:
+        sqlite = {'STORAGE_BACKEND': 'sqlite', 'DATABASE_PATH': os.path.abspath(args.database)}
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot = {**sqlite, 'STARTUP_SNAPSHOT': os.path.join(tmp, 'startup.snapshot')}
+            ok &= report(f'sqlite {args.database}', run({**sqlite, 'STARTUP_SNAPSHOT': ''}, args.runs), args.target_ms)
+            run(snapshot, 1)  # writes the snapshot
+            ok &= report(f'sqlite {args.database}', run(snapshot, args.runs), args.target_ms)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
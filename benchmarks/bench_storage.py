@@ -0,0 +1,106 @@
+"""Order creation and lookup throughput against the storage backends.
+
+Run from the repository root:
+
+    python benchmarks/bench_storage.py [--workers 4] [--orders 2000]
+
+Each worker process opens its own SQLiteRepository on a shared temporary
+database (as gunicorn workers would) and runs a few threads that create
+orders and then look them up by id and by customer. The memory backend is
+measured in a single process for reference.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import MemoryRepository, SQLiteRepository
+
+
+def make_order(worker, i):
+    return {
+        'id': f"ORD-{worker}-{i}-{uuid.uuid4().hex[:8]}",
+        'customerId': f"customer{i % 100}@example.com",
+        'customerEmail': f"customer{i % 100}@example.com",
+        'date': datetime.now().isoformat(),
+        'status': 'pending',
+        'paymentStatus': 'pending',
+        'items': [{'id': '1', 'size': 'M', 'quantity': 1, 'price': 295}],
+        'total': 295,
+    }
+
+
+def run_threads(repository, worker, orders, threads):
+    per_thread = orders // threads
+    created = [[] for _ in range(threads)]
+
+    def create(t):
+        for i in range(per_thread):
+            order = make_order(f"{worker}.{t}", i)
+            repository.add_order(order)
+            created[t].append(order['id'])
+
+    def lookup(t):
+        for i, order_id in enumerate(created[t]):
+            repository.get_order(order_id)
+            if i % 10 == 0:
+                repository.orders_for_customer(f"customer{i % 100}@example.com")
+
+    timings = {}
+    for name, target in (('create', create), ('lookup', lookup)):
+        pool = [threading.Thread(target=target, args=(t,)) for t in range(threads)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        timings[name] = time.perf_counter() - start
+    return timings
+
+
+def sqlite_worker(path, worker, orders, threads, results):
+    repository = SQLiteRepository(path)
+    results.put(run_threads(repository, worker, orders, threads))
+    repository.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--orders', type=int, default=2000, help='orders per worker')
+    args = parser.parse_args()
+
+    timings = run_threads(MemoryRepository(), 0, args.orders, args.threads)
+    print(f"memory  (1 process):  create {args.orders / timings['create']:9.0f} orders/s"
+          f"  lookup {args.orders / timings['lookup']:9.0f} lookups/s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        SQLiteRepository(path).close()
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=sqlite_worker,
+                                         args=(path, w, args.orders, args.threads, results))
+                 for w in range(args.workers)]
+        for proc in procs:
+            proc.start()
+        worker_timings = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    total = args.orders * args.workers
+    create = max(t['create'] for t in worker_timings)
+    lookup = max(t['lookup'] for t in worker_timings)
+    print(f"sqlite  ({args.workers} processes): create {total / create:9.0f} orders/s"
+          f"  lookup {total / lookup:9.0f} lookups/s")
+
+
+if __name__ == '__main__':
+    main()
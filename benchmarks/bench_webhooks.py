@@ -0,0 +1,102 @@
+"""Webhook burst: acknowledgement latency and drain time.
+
+Run from the repository root:
+
+    python benchmarks/bench_webhooks.py [--orders 2000] [--threads 16] [--replays 0.2]
+
+Creates orders with Razorpay order ids, then fires one signed
+``payment.captured`` webhook per order from many threads (plus a share of
+replayed deliveries) at the app. It reports the latency of the webhook
+responses and how long the background workers take to apply the events,
+and checks every order ended up paid exactly once. Set STORAGE_BACKEND and
+DATABASE_PATH to measure the SQLite backend.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SECRET = 'bench-webhook-secret'
+os.environ['RAZORPAY_WEBHOOK_SECRET'] = SECRET
+
+import app as shop  # noqa: E402
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--replays', type=float, default=0.2, help='share of events delivered twice')
+    args = parser.parse_args()
+
+    run = int(time.time())
+    deliveries = []
+    for i in range(args.orders):
+        order_id = shop.order_ids.next_id()
+        razorpay_order_id = f"order_bench{run}_{i}"
+        shop.repository.add_order({
+            'id': order_id, 'customerId': 'bench@example.com', 'customerEmail': 'bench@example.com',
+            'date': datetime.now().isoformat(), 'status': 'pending', 'paymentStatus': 'pending',
+            'razorpayOrderId': razorpay_order_id, 'items': [], 'total': 100,
+        })
+        event = {'event': 'payment.captured',
+                 'payload': {'payment': {'entity': {'id': f"pay_{i}", 'order_id': razorpay_order_id}}}}
+        body = json.dumps(event).encode()
+        headers = {
+            'Content-Type': 'application/json',
+            'X-Razorpay-Event-Id': f"evt_bench{run}_{i}",
+            'X-Razorpay-Signature': hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest(),
+        }
+        deliveries.append((body, headers))
+    deliveries += random.sample(deliveries, int(len(deliveries) * args.replays))
+    random.shuffle(deliveries)
+
+    latencies = [[] for _ in range(args.threads)]
+    statuses = [[] for _ in range(args.threads)]
+
+    def send(t):
+        client = shop.app.test_client()
+        for body, headers in deliveries[t::args.threads]:
+            start = time.perf_counter()
+            response = client.post('/api/payment/webhook', data=body, headers=headers)
+            latencies[t].append(time.perf_counter() - start)
+            statuses[t].append(response.status_code)
+
+    pool = [threading.Thread(target=send, args=(t,)) for t in range(args.threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    acked = time.perf_counter() - start
+    shop.webhook_processor.join()
+    drained = time.perf_counter() - start
+
+    samples = [s for thread in latencies for s in thread]
+    rejected = sum(status != 200 for thread in statuses for status in thread)
+    print(f"{len(samples)} webhooks from {args.threads} threads: acknowledged in {acked:.2f}s "
+          f"({len(samples) / acked:.0f}/s), applied in {drained:.2f}s")
+    print(f"ack latency p50 {percentile(samples, 0.5) * 1000:.2f} ms  p95 {percentile(samples, 0.95) * 1000:.2f} ms"
+          f"  p99 {percentile(samples, 0.99) * 1000:.2f} ms  rejected {rejected}")
+    print(f"worker stats: {shop.webhook_processor.stats}")
+
+    unpaid = [o for o in shop.repository.iter_orders() if o['customerId'] == 'bench@example.com'
+              and o['razorpayOrderId'].startswith(f"order_bench{run}_") and o['paymentStatus'] != 'completed']
+    assert not rejected and not unpaid, f"{rejected} rejected, {len(unpaid)} orders left unpaid"
+
+
+if __name__ == '__main__':
+    main()
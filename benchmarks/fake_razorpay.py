@@ -0,0 +1,159 @@
+"""Local stand-in for the Razorpay orders API, for load tests and benchmarks.
+
+Run from the repository root:
+
+    python benchmarks/fake_razorpay.py [--port 9000] [--latency 0.05] [--fail-rate 0.1]
+
+then point the app at it:
+
+    RAZORPAY_API_URL=http://127.0.0.1:9000/v1 RAZORPAY_KEY_ID=rzp_test_fake RAZORPAY_KEY_SECRET=fake_secret python app.py
+
+It implements ``POST /v1/orders``, ``GET /v1/orders?receipt=`` and
+``GET /v1/orders/<id>`` with HTTP basic auth, an optional delay per call and
+a share of calls that fail with 503 after the order was created, to
+exercise retries and idempotency. It keeps connections alive like the real
+gateway. Other scripts can run it in-process with ``start()``.
+"""
+import argparse
+import base64
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+KEY_ID = 'rzp_test_fake'
+KEY_SECRET = 'fake_secret'
+
+
+class FakeRazorpay(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, fail_rate=0.0, key_id=KEY_ID, key_secret=KEY_SECRET, seed=None):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.auth = 'Basic ' + base64.b64encode(f"{key_id}:{key_secret}".encode()).decode()
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.orders = {}
+        self.requests = 0
+        self.connections = 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; without this keep-alive calls stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def begin(self):
+        """Common request handling; returns False if a response was already sent"""
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        if server.latency:
+            time.sleep(server.latency)
+        if self.headers.get('Authorization') != server.auth:
+            self.send_json(401, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Authentication failed'}})
+            return False
+        return True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if not self.begin():
+            return
+        if urlsplit(self.path).path != '/v1/orders':
+            return self.send_json(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'Not found'}})
+        try:
+            payload = json.loads(body or b'{}')
+            amount = int(payload['amount'])
+        except (ValueError, KeyError, TypeError):
+            return self.send_json(400, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'amount is required'}})
+        order = {
+            'id': 'order_' + uuid.uuid4().hex[:14],
+            'entity': 'order',
+            'amount': amount,
+            'amount_paid': 0,
+            'amount_due': amount,
+            'currency': payload.get('currency', 'INR'),
+            'receipt': payload.get('receipt'),
+            'notes': payload.get('notes') or [],
+            'status': 'created',
+            'attempts': 0,
+            'created_at': int(time.time()),
+        }
+        server = self.server
+        with server.lock:
+            server.orders[order['id']] = order
+            failed = server.random.random() < server.fail_rate
+        if failed:
+            # The order exists but the caller never learns its id
+            return self.send_json(503, {'error': {'code': 'SERVER_ERROR', 'description': 'Service unavailable'}})
+        self.send_json(200, order)
+
+    def do_GET(self):
+        if not self.begin():
+            return
+        url = urlsplit(self.path)
+        server = self.server
+        if url.path == '/v1/orders':
+            receipt = parse_qs(url.query).get('receipt', [None])[0]
+            with server.lock:
+                items = [o for o in server.orders.values() if receipt is None or o['receipt'] == receipt]
+            items.sort(key=lambda o: o['created_at'], reverse=True)
+            return self.send_json(200, {'entity': 'collection', 'count': len(items), 'items': items})
+        if url.path.startswith('/v1/orders/'):
+            order = server.orders.get(url.path.rsplit('/', 1)[1])
+            if order:
+                return self.send_json(200, order)
+        self.send_json(404, {'error': {'code': 'BAD_REQUEST_ERROR', 'description': 'The id provided does not exist'}})
+
+
+def start(port=0, **options):
+    """Run a FakeRazorpay on a background thread; call ``shutdown()`` when done"""
+    server = FakeRazorpay(('127.0.0.1', port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=int(os.getenv('FAKE_RAZORPAY_PORT', '9000')))
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every call')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of order creations answered with 503')
+    args = parser.parse_args()
+
+    server = FakeRazorpay(('127.0.0.1', args.port), latency=args.latency, fail_rate=args.fail_rate)
+    print(f"Fake Razorpay on {server.url} (key id {KEY_ID}, secret {KEY_SECRET})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
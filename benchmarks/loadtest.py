@@ -0,0 +1,367 @@
+"""Mixed-workload load test of the HTTP API with per-endpoint latency percentiles.
+
+Run from the repository root:
+
+    python benchmarks/loadtest.py [--scale 10k] [--clients 16] [--seconds 30] [--save baseline.json]
+    python benchmarks/loadtest.py --compare baseline.json [--tolerance 0.25]
+
+Starts the app in a separate process on a local threaded WSGI server,
+seeded by ``seed.py`` with ``--scale`` products and orders, and a fake
+Razorpay (``fake_razorpay.py``) in a third process so checkouts go all the
+way through payment verification. ``--clients`` virtual users log in and
+then pick actions by the ``--mix`` weights:
+
+    browse    a product page, a filtered listing page or the collections
+    search    a typeahead query
+    cart      add to cart, change a quantity, read the summary
+    checkout  cart, order, gateway order and a signed payment verification
+    account   the user's order history
+    admin     a page of the admin order list
+
+Throughput, p50/p95/p99 and errors are reported per endpoint. ``--save``
+writes them to a JSON baseline; ``--compare`` checks a run against one and
+exits with status 1 if any endpoint's p95 (or the overall throughput) is
+worse by more than ``--tolerance``. Storage settings such as
+``STORAGE_BACKEND`` are passed through to the server process.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import fake_razorpay  # noqa: E402
+from seed import ADMIN_EMAIL, CATEGORIES, HOT_PRODUCTS, MATERIALS, PASSWORD, SIZES, parse_scale, user_email  # noqa: E402
+
+DEFAULT_MIX = 'browse=45,search=15,cart=20,checkout=8,account=7,admin=5'
+SEARCH_TERMS = MATERIALS + ['cash', 'mer', 'sweat', 'card', 'tailored coat', 'relaxed linen', 'silk dress']
+# Only differences bigger than this are treated as regressions; sub-millisecond
+# percentiles are mostly scheduler noise
+MIN_REGRESSION_MS = 1.0
+MIN_SAMPLES = 20
+
+
+# ---------- server process ----------
+def serve(args):
+    """Seed the app and serve it; prints ``READY <port> <users>`` once listening"""
+    import logging
+
+    from werkzeug.serving import make_server
+
+    import app as shop
+    from seed import seed
+
+    shop.app.config['SESSION_COOKIE_SECURE'] = False  # plain HTTP on localhost
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    users = seed(shop, args.scale, log=lambda line: print(f"  seeded {line}", flush=True))
+    server = make_server('127.0.0.1', 0, shop.app, threaded=True)
+    print(f"READY {server.server_port} {users}", flush=True)
+    server.serve_forever()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_processes(args):
+    """Start the fake gateway and the seeded app; returns ``(processes, base_url, users)``"""
+    gateway_port = free_port()
+    gateway = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, 'fake_razorpay.py'), '--port', str(gateway_port),
+         '--latency', str(args.gateway_latency)],
+        stdout=subprocess.DEVNULL)
+    env = dict(
+        os.environ,
+        RAZORPAY_KEY_ID=fake_razorpay.KEY_ID,
+        RAZORPAY_KEY_SECRET=fake_razorpay.KEY_SECRET,
+        RAZORPAY_API_URL=f"http://127.0.0.1:{gateway_port}/v1",
+        # Every virtual user logs in from 127.0.0.1; measure the API, not the throttle
+        LOGIN_LIMIT_PER_IP='1000000000',
+        LOGIN_LIMIT_PER_EMAIL='1000000000',
+    )
+    server = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), 'serve', '--scale', str(args.scale)],
+        stdout=subprocess.PIPE, text=True, env=env)
+    for line in server.stdout:
+        if line.startswith('READY'):
+            _, port, users = line.split()
+            return [server, gateway], f"http://127.0.0.1:{port}", int(users)
+        print(line, end='')
+    gateway.terminate()
+    raise SystemExit(f"server exited with status {server.wait()} before it was ready")
+
+
+# ---------- virtual users ----------
+class VirtualUser:
+    def __init__(self, base_url, users, scale, record, rng):
+        self.base_url = base_url
+        self.scale = scale
+        self.record = record
+        self.rng = rng
+        self.email = user_email(rng.randrange(users))
+        self.session = requests.Session()
+        self.admin = None
+
+    def call(self, label, method, path, session=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = (session or self.session).request(method, self.base_url + path, timeout=30, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        self.record(label, time.perf_counter() - start, status)
+        return response if status and status < 400 else None
+
+    def login(self, session, email):
+        self.call('POST /api/auth/login', 'POST', '/api/auth/login', session,
+                  json={'email': email, 'password': PASSWORD})
+
+    def product(self, hot=False):
+        product_id = self.rng.randint(1, min(self.scale, HOT_PRODUCTS) if hot else self.scale)
+        return {'id': str(product_id), 'size': self.rng.choice(SIZES), 'quantity': self.rng.randint(1, 2)}
+
+    def browse(self):
+        choice = self.rng.random()
+        if choice < 0.5:
+            self.call('GET /api/products/<id>', 'GET', f"/api/products/{self.product()['id']}")
+        elif choice < 0.9:
+            params = {'limit': 24, 'category': self.rng.choice(CATEGORIES),
+                      'sort': self.rng.choice(['default', 'price', 'name'])}
+            self.call('GET /api/products?query', 'GET', '/api/products', params=params)
+        else:
+            self.call('GET /api/collections', 'GET', '/api/collections')
+
+    def search(self):
+        self.call('GET /api/products/search', 'GET', '/api/products/search',
+                  params={'q': self.rng.choice(SEARCH_TERMS), 'limit': 20})
+
+    def cart(self):
+        item = self.product()
+        self.call('POST /api/cart', 'POST', '/api/cart', json=item)
+        self.call('PUT /api/cart/update', 'PUT', '/api/cart/update', json=dict(item, quantity=item['quantity'] + 1))
+        self.call('GET /api/cart/summary', 'GET', '/api/cart/summary')
+
+    def checkout(self):
+        self.call('POST /api/cart', 'POST', '/api/cart', json=self.product(hot=True))
+        response = self.call('POST /api/orders', 'POST', '/api/orders', json={'shippingAddress': {'city': 'Pune'}})
+        if response is None:
+            return
+        order_id = response.json()['id']
+        response = self.call('POST /api/payment/create-order', 'POST', '/api/payment/create-order',
+                             json={'orderId': order_id})
+        if response is None:
+            return
+        razorpay_order_id = response.json()['id']
+        payment_id = 'pay_' + uuid.uuid4().hex[:14]
+        signature = hmac.new(fake_razorpay.KEY_SECRET.encode(), f"{razorpay_order_id}|{payment_id}".encode(),
+                             hashlib.sha256).hexdigest()
+        self.call('POST /api/payment/verify', 'POST', '/api/payment/verify', json={
+            'orderId': order_id,
+            'razorpay_order_id': razorpay_order_id,
+            'razorpay_payment_id': payment_id,
+            'razorpay_signature': signature,
+        })
+
+    def account(self):
+        self.call('GET /api/orders', 'GET', '/api/orders', params={'limit': 20})
+
+    def admin_orders(self):
+        if self.admin is None:
+            self.admin = requests.Session()
+            self.login(self.admin, ADMIN_EMAIL)
+        self.call('GET /api/admin/orders', 'GET', '/api/admin/orders', self.admin, params={'limit': 50})
+
+
+ACTIONS = {
+    'browse': VirtualUser.browse,
+    'search': VirtualUser.search,
+    'cart': VirtualUser.cart,
+    'checkout': VirtualUser.checkout,
+    'account': VirtualUser.account,
+    'admin': VirtualUser.admin_orders,
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r}; choose from {', '.join(ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_load(base_url, users, args):
+    """Drive the workload; returns ``{label: [(seconds, status), ...]}`` and the measured duration"""
+    samples = {}
+    lock = threading.Lock()
+    measure_from = time.monotonic() + args.warmup
+    stop = measure_from + args.seconds
+    names = list(args.mix)
+    weights = [args.mix[name] for name in names]
+
+    def record(label, elapsed, status):
+        if time.monotonic() >= measure_from:
+            with lock:
+                samples.setdefault(label, []).append((elapsed, status))
+
+    def client(n):
+        rng = random.Random(args.seed * 1000 + n)
+        user = VirtualUser(base_url, users, args.scale, record, rng)
+        user.login(user.session, user.email)
+        while time.monotonic() < stop:
+            ACTIONS[rng.choices(names, weights)[0]](user)
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.monotonic() - measure_from
+
+
+# ---------- reporting ----------
+def percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def summarize(samples, duration):
+    endpoints = {}
+    for label, results in sorted(samples.items()):
+        latencies = sorted(elapsed * 1000 for elapsed, _ in results)
+        endpoints[label] = {
+            'count': len(results),
+            'errors': sum(1 for _, status in results if not 200 <= status < 400),
+            'rps': round(len(results) / duration, 2),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+        }
+    total = sum(e['count'] for e in endpoints.values())
+    return {
+        'total': {'count': total, 'errors': sum(e['errors'] for e in endpoints.values()),
+                  'rps': round(total / duration, 2)},
+        'endpoints': endpoints,
+    }
+
+
+def print_report(summary, baseline=None):
+    header = f"{'endpoint':32s} {'count':>7s} {'req/s':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s} {'errors':>6s}"
+    print(header + ('  p95 vs baseline' if baseline else ''))
+    for label, e in summary['endpoints'].items():
+        line = (f"{label:32s} {e['count']:7d} {e['rps']:8.1f} {e['p50_ms']:8.2f} {e['p95_ms']:8.2f}"
+                f" {e['p99_ms']:8.2f} {e['errors']:6d}")
+        base = (baseline or {}).get('endpoints', {}).get(label)
+        if base:
+            line += f"  {base['p95_ms']:8.2f} ({e['p95_ms'] / max(base['p95_ms'], 0.001):4.2f}x)"
+        print(line)
+    total = summary['total']
+    print(f"{'total':32s} {total['count']:7d} {total['rps']:8.1f} {'':8s} {'':8s} {'':8s} {total['errors']:6d}")
+
+
+def regressions(summary, baseline, tolerance):
+    """Human-readable list of endpoints (and the total) that got slower than ``tolerance`` allows"""
+    found = []
+    for label, e in summary['endpoints'].items():
+        base = baseline['endpoints'].get(label)
+        if not base or min(e['count'], base['count']) < MIN_SAMPLES:
+            continue
+        limit = max(base['p95_ms'] * (1 + tolerance), base['p95_ms'] + MIN_REGRESSION_MS)
+        if e['p95_ms'] > limit:
+            found.append(f"{label}: p95 {e['p95_ms']:.2f} ms, baseline {base['p95_ms']:.2f} ms")
+    if summary['total']['rps'] < baseline['total']['rps'] * (1 - tolerance):
+        found.append(f"throughput {summary['total']['rps']:.1f} req/s, baseline {baseline['total']['rps']:.1f} req/s")
+    return found
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=BENCH_DIR).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('mode', nargs='?', choices=['run', 'serve'], default='run', help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=parse_scale, default=parse_scale('10k'),
+                        help='products and orders to seed, e.g. 1k, 100k, 1m')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--seconds', type=float, default=30, help='measured duration')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of load before measuring')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"default {DEFAULT_MIX}")
+    parser.add_argument('--gateway-latency', type=float, default=0.0, help='seconds the fake Razorpay adds per call')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='PATH', help='write the results as a JSON baseline')
+    parser.add_argument('--compare', metavar='PATH', help='compare with a saved baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown for --compare')
+    args = parser.parse_args()
+
+    if args.mode == 'serve':
+        return serve(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    processes, base_url, users = start_processes(args)
+    try:
+        print(f"{args.clients} clients for {args.seconds:g}s against {base_url} ({args.scale:,} products)")
+        samples, duration = run_load(base_url, users, args)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    summary = summarize(samples, duration)
+    summary['meta'] = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'storage': os.getenv('STORAGE_BACKEND', 'memory'),
+        'scale': args.scale,
+        'clients': args.clients,
+        'seconds': args.seconds,
+        'mix': args.mix,
+    }
+    print_report(summary, baseline)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"baseline saved to {args.save}")
+    if baseline:
+        for key in ('storage', 'scale', 'clients', 'mix', 'cpus'):
+            if baseline['meta'].get(key) != summary['meta'][key]:
+                print(f"warning: baseline {key} was {baseline['meta'].get(key)!r}, this run {summary['meta'][key]!r}")
+        found = regressions(summary, baseline, args.tolerance)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%} (baseline {baseline['meta'].get('revision')})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Seed a synthetic catalog, users and order history for load tests.
+
+Run from the repository root:
+
+    STORAGE_BACKEND=sqlite DATABASE_PATH=bench.db python benchmarks/seed.py [--scale 100k]
+
+``--scale`` sets the number of products and orders (``1k`` .. ``1m``); one
+user is created per ten products, all with the password ``loadtest``, plus
+the admin account ``admin@example.com``. With the memory backend the data
+only lives as long as the process, so ``loadtest.py`` seeds its own server
+through ``seed()``.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = 'loadtest'
+ADMIN_EMAIL = 'admin@example.com'
+
+MATERIALS = ['cashmere', 'wool', 'merino', 'linen', 'silk', 'cotton', 'leather', 'alpaca', 'mohair', 'denim']
+GARMENTS = ['sweater', 'cardigan', 'trousers', 'shirt', 'tee', 'tote', 'scarf', 'coat', 'jacket', 'dress']
+STYLES = ['tailored', 'relaxed', 'minimal', 'oversized', 'cropped', 'classic', 'essential', 'organic']
+CATEGORIES = ['Knitwear', 'Trousers', 'Basics', 'Shirts', 'Accessories']
+SIZES = ['S', 'M', 'L']
+# Stock is tracked for the first HOT_PRODUCTS only (the ones checkouts buy);
+# untracked products are never short, and seeding stays quick at 1m
+HOT_PRODUCTS = 1000
+STOCK_PER_SIZE = 1_000_000
+
+
+def parse_scale(value):
+    """``10k`` -> 10000, ``1m`` -> 1000000"""
+    value = value.strip().lower()
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(value[-1:], 1)
+    return int(float(value.rstrip('km')) * multiplier)
+
+
+def user_email(i):
+    return f"loadtest{i}@example.com"
+
+
+def make_products(n, rng):
+    products = []
+    for i in range(n):
+        style, material, garment = rng.choice(STYLES), rng.choice(MATERIALS), rng.choice(GARMENTS)
+        products.append({
+            'id': str(i + 1),
+            'name': f"{style.title()} {material.title()} {garment.title()} {i + 1}",
+            'price': 50 + (i % 400),
+            'description': f"A {style} {garment} in {material}.",
+            'category': CATEGORIES[i % len(CATEGORIES)],
+            'sizes': SIZES,
+            'images': [],
+            'inStock': True,
+            'featured': i % 50 == 0,
+            'bestseller': i % 100 == 0,
+            'newArrival': i % 25 == 0,
+        })
+    return products
+
+
+def make_orders(n, products, users, order_ids, rng, first=0, total=None, days=365):
+    """Orders ``first`` .. ``first + n`` of ``total``, spread over the last ``days`` days, oldest first"""
+    start = datetime.now() - timedelta(days=days)
+    step = timedelta(days=days) / max(total or n, 1)
+    orders = []
+    for i in range(first, first + n):
+        product = products[rng.randrange(len(products))]
+        quantity = rng.randint(1, 3)
+        subtotal = product['price'] * quantity
+        email = user_email(rng.randrange(users))
+        orders.append({
+            'id': order_ids.next_id(),
+            'customerId': email,
+            'customerEmail': email,
+            'date': (start + step * i).isoformat(),
+            'status': 'confirmed',
+            'paymentStatus': 'paid',
+            'paymentMethod': 'razorpay',
+            'razorpayOrderId': None,
+            'razorpayPaymentId': None,
+            'items': [{'id': product['id'], 'name': product['name'], 'price': product['price'],
+                       'size': rng.choice(SIZES), 'quantity': quantity, 'lineTotal': subtotal}],
+            'subtotal': subtotal,
+            'shipping': 0,
+            'total': subtotal,
+            'shippingAddress': {},
+        })
+    return orders
+
+
+def seed(shop, scale, seed_value=0, log=print):
+    """Load ``scale`` products and orders and ``scale // 10`` users into the imported app module"""
+    rng = random.Random(seed_value)
+    users = max(1, scale // 10)
+
+    started = time.perf_counter()
+    products = make_products(scale, rng)
+    shop.repository.save_products(products)
+    shop.catalog.replace_all(products)
+    # Already loaded; don't let the first request reload it from shared storage
+    shop._catalog_sync['version'] = shop.repository.products_version()
+    for product in products[:HOT_PRODUCTS]:
+        for size in SIZES:
+            shop.inventory.set_stock(product['id'], size, STOCK_PER_SIZE)
+    log(f"{len(products):,} products in {time.perf_counter() - started:.1f}s")
+
+    # Hashing is deliberately slow; every seeded user shares one hash
+    started = time.perf_counter()
+    password_hash = shop.password_hasher.hash(PASSWORD)
+    for email in [ADMIN_EMAIL] + [user_email(i) for i in range(users)]:
+        if not shop.repository.create_user(email, password_hash):
+            shop.repository.set_password_hash(email, password_hash)
+    log(f"{users:,} users in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    batch = 10_000
+    for offset in range(0, scale, batch):
+        shop.repository.add_orders(make_orders(min(batch, scale - offset), products, users, shop.order_ids, rng,
+                                               first=offset, total=scale))
+    log(f"{scale:,} orders in {time.perf_counter() - started:.1f}s")
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=parse_scale, default=parse_scale('10k'), help='products and orders, e.g. 1k, 100k, 1m')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    import app as shop
+
+    seed(shop, args.scale, args.seed)
+
+
+if __name__ == '__main__':
+    main()
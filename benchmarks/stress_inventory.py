@@ -0,0 +1,132 @@
+"""Concurrent checkouts against limited stock must never oversell.
+
+Run from the repository root:
+
+    python benchmarks/stress_inventory.py [--threads 32] [--stock 200]
+
+Many threads race to reserve one or two units of a few hot SKUs and then
+either commit (pay) or release (abandon) the hold. At the end every unit is
+accounted for: sold + available == initial stock and nothing went negative.
+The SQLite backend is also hammered from several processes at once, as
+gunicorn workers would. Finally a short-TTL reservation is checked to be
+released by the sweeper.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inventory import InsufficientStock, MemoryInventory, SQLiteInventory
+
+SKUS = [('1', 'S'), ('1', 'M'), ('2', 'M'), ('3', 'L')]
+
+
+def hammer(inventory, threads, attempts, seed=0):
+    """Run checkout threads; returns ``(sold_per_sku, rejected, elapsed)``"""
+    sold = {sku: 0 for sku in SKUS}
+    rejected = [0]
+    lock = threading.Lock()
+
+    def checkout(t):
+        rng = random.Random(seed * 1000 + t)
+        for _ in range(attempts):
+            lines = [(*sku, rng.randint(1, 2)) for sku in rng.sample(SKUS, rng.randint(1, 2))]
+            try:
+                reservation_id = inventory.reserve(lines)
+            except InsufficientStock:
+                with lock:
+                    rejected[0] += 1
+                continue
+            if rng.random() < 0.8:
+                assert inventory.commit(reservation_id)
+                with lock:
+                    for product_id, size, quantity in lines:
+                        sold[(product_id, size)] += quantity
+            else:
+                assert inventory.release(reservation_id)
+
+    pool = [threading.Thread(target=checkout, args=(t,)) for t in range(threads)]
+    start = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sold, rejected[0], time.perf_counter() - start
+
+
+def check(inventory, sold, stock):
+    for sku in SKUS:
+        available = inventory.available(*sku)
+        assert available >= 0, f"{sku} went negative: {available}"
+        assert sold[sku] + available == stock, f"{sku}: sold {sold[sku]} + available {available} != {stock}"
+
+
+def report(name, sold, rejected, elapsed, attempts):
+    print(f"{name:22s} {attempts / elapsed:8.0f} checkouts/s  sold {sum(sold.values()):5d}"
+          f"  rejected {rejected:5d}  ok")
+
+
+def sqlite_worker(path, worker, threads, attempts, results):
+    inventory = SQLiteInventory(path)
+    sold, rejected, elapsed = hammer(inventory, threads, attempts, seed=worker + 1)
+    inventory.close()
+    results.put((sold, rejected, elapsed))
+
+
+def check_expiry(inventory):
+    inventory.set_stock('ttl', 'M', 1)
+    inventory.reserve([('ttl', 'M', 1)], ttl=0.05)
+    assert inventory.available('ttl', 'M') == 0
+    time.sleep(0.1)
+    assert inventory.release_expired() == 1
+    assert inventory.available('ttl', 'M') == 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--attempts', type=int, default=200, help='checkouts per thread')
+    parser.add_argument('--stock', type=int, default=200, help='units per SKU')
+    args = parser.parse_args()
+
+    inventory = MemoryInventory()
+    for sku in SKUS:
+        inventory.set_stock(*sku, args.stock)
+    sold, rejected, elapsed = hammer(inventory, args.threads, args.attempts)
+    check(inventory, sold, args.stock)
+    check_expiry(inventory)
+    report(f"memory ({args.threads} threads)", sold, rejected, elapsed, args.threads * args.attempts)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'stress.db')
+        inventory = SQLiteInventory(path)
+        for sku in SKUS:
+            inventory.set_stock(*sku, args.stock)
+        threads = max(1, args.threads // args.workers)
+        results = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=sqlite_worker,
+                                         args=(path, w, threads, args.attempts, results))
+                 for w in range(args.workers)]
+        for proc in procs:
+            proc.start()
+        outcomes = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+        sold = {sku: sum(o[0][sku] for o in outcomes) for sku in SKUS}
+        check(inventory, sold, args.stock)
+        check_expiry(inventory)
+        inventory.close()
+    report(f"sqlite ({args.workers}x{threads} threads)", sold, sum(o[1] for o in outcomes),
+           max(o[2] for o in outcomes), args.workers * threads * args.attempts)
+
+
+if __name__ == '__main__':
+    main()
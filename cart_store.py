@@ -0,0 +1,268 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from storage import SQLitePool
+
+
+class MemoryCartStore:
+    """Server-side carts held in process memory.
+
+    Carts are keyed by an opaque cart id kept in the session cookie, and each
+    cart maps ``(product_id, size)`` to its line item, so every mutation is a
+    dict operation. Carts idle for longer than ``ttl`` seconds expire, and the
+    least recently used carts are evicted once there are more than
+    ``max_carts``. Every mutation stamps the cart with a new ``version`` from
+    a store-wide counter, so derived data (prices) can be cached per version.
+    """
+
+    def __init__(self, ttl=86400, max_carts=100_000):
+        self.ttl = ttl
+        self.max_carts = max_carts
+        self._carts = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def _cart(self, cart_id, create=False):
+        """Return the live ``[expires_at, items, version]`` entry (caller holds the lock)"""
+        now = time.monotonic()
+        entry = self._carts.get(cart_id)
+        if entry is not None and entry[0] < now:
+            del self._carts[cart_id]
+            entry = None
+        if entry is None:
+            if not create:
+                return None
+            self._version += 1
+            entry = [now + self.ttl, {}, self._version]
+            self._carts[cart_id] = entry
+            self._evict(now)
+            return entry
+        entry[0] = now + self.ttl
+        self._carts.move_to_end(cart_id)
+        return entry
+
+    def _evict(self, now):
+        while self._carts:
+            oldest_id, (expires_at, _, _) = next(iter(self._carts.items()))
+            if len(self._carts) <= self.max_carts and expires_at >= now:
+                break
+            del self._carts[oldest_id]
+
+    @staticmethod
+    def _items(items):
+        return [dict(item) for item in items.values()] if items else []
+
+    def get(self, cart_id):
+        with self._lock:
+            entry = self._cart(cart_id)
+            return self._items(entry[1]) if entry else []
+
+    def snapshot(self, cart_id):
+        """Return ``(version, items)``; version is None for a missing cart"""
+        with self._lock:
+            entry = self._cart(cart_id)
+            return (entry[2], self._items(entry[1])) if entry else (None, [])
+
+    def add(self, cart_id, item):
+        """Add ``item``, merging quantities with an existing line of the same product and size"""
+        return self.apply(cart_id, [('add', item)])
+
+    def update_quantity(self, cart_id, product_id, size, quantity):
+        """Set a line's quantity; zero or less removes the line"""
+        return self.apply(cart_id, [('update', product_id, size, quantity)])
+
+    def remove(self, cart_id, product_id, size=None):
+        """Remove one size of a product, or every size when ``size`` is None"""
+        return self.apply(cart_id, [('remove', product_id, size)])
+
+    def apply(self, cart_id, operations):
+        """Apply ``('add', item)``, ``('update', id, size, qty)`` and
+        ``('remove', id, size)`` operations in order, atomically.
+
+        Returns the resulting cart.
+        """
+        with self._lock:
+            entry = self._cart(cart_id, create=any(op[0] == 'add' for op in operations))
+            if entry is None:
+                return []
+            for op in operations:
+                self._apply_one(entry[1], op)
+            self._version += 1
+            entry[2] = self._version
+            return self._items(entry[1])
+
+    @staticmethod
+    def _apply_one(items, op):
+        if op[0] == 'add':
+            item = op[1]
+            key = (item['id'], item['size'])
+            existing = items.get(key)
+            if existing:
+                existing['quantity'] += item['quantity']
+            else:
+                items[key] = dict(item)
+        elif op[0] == 'update':
+            _, product_id, size, quantity = op
+            if (product_id, size) in items:
+                if quantity <= 0:
+                    del items[(product_id, size)]
+                else:
+                    items[(product_id, size)]['quantity'] = quantity
+        elif op[0] == 'remove':
+            _, product_id, size = op
+            if size is not None:
+                items.pop((product_id, size), None)
+            else:
+                for key in [k for k in items if k[0] == product_id]:
+                    del items[key]
+        else:
+            raise ValueError(f"Unknown cart operation: {op[0]}")
+
+    def clear(self, cart_id):
+        with self._lock:
+            self._carts.pop(cart_id, None)
+
+    def close(self):
+        pass
+
+
+class SQLiteCartStore:
+    """Server-side carts in SQLite, shared by every worker process.
+
+    One row per ``(cart_id, product_id, size)``; the primary key makes each
+    mutation a single indexed upsert or delete. Each write also gives the
+    cart's row in ``carts`` a new ``version`` from an AUTOINCREMENT key, so
+    versions only ever grow, even for a cart that expired and came back.
+    Expired carts are purged every ``purge_every`` writes.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cart_items (
+        cart_id TEXT NOT NULL,
+        product_id TEXT NOT NULL,
+        size TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (cart_id, product_id, size)
+    );
+    CREATE INDEX IF NOT EXISTS idx_cart_items_updated ON cart_items (updated_at);
+    CREATE TABLE IF NOT EXISTS carts (
+        version INTEGER PRIMARY KEY AUTOINCREMENT,
+        cart_id TEXT NOT NULL UNIQUE,
+        updated_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_carts_updated ON carts (updated_at);
+    """
+
+    def __init__(self, path, ttl=86400, purge_every=1000):
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self.pool = SQLitePool(path)
+        self.pool.connection().executescript(self.SCHEMA)
+        self._writes = 0
+
+    @staticmethod
+    def _size(size):
+        # The key column is NOT NULL; items without a size are stored under ''
+        return size if size is not None else ''
+
+    def _expire(self, conn, cart_id, now):
+        conn.execute('DELETE FROM cart_items WHERE cart_id = ? AND updated_at < ?', (cart_id, now - self.ttl))
+
+    def _touch(self, conn, cart_id, now):
+        conn.execute('UPDATE cart_items SET updated_at = ? WHERE cart_id = ?', (now, cart_id))
+        # REPLACE deletes the old row and inserts a new one, taking the next version
+        conn.execute('INSERT OR REPLACE INTO carts (cart_id, updated_at) VALUES (?, ?)', (cart_id, now))
+
+    def _after_write(self):
+        self._writes += 1
+        if self._writes % self.purge_every == 0:
+            cutoff = time.time() - self.ttl
+            self.pool.write(('DELETE FROM cart_items WHERE updated_at < ?', (cutoff,)),
+                            ('DELETE FROM carts WHERE updated_at < ?', (cutoff,)))
+
+    def _read(self, conn, cart_id):
+        rows = conn.execute(
+            'SELECT data, quantity FROM cart_items WHERE cart_id = ? AND updated_at >= ? ORDER BY rowid',
+            (cart_id, time.time() - self.ttl))
+        return [dict(json.loads(data), quantity=quantity) for data, quantity in rows]
+
+    def get(self, cart_id):
+        return self._read(self.pool.connection(), cart_id)
+
+    def snapshot(self, cart_id):
+        """Return ``(version, items)``; version is None for a missing or empty cart"""
+        # One statement, so the version always matches the items read with it
+        rows = self.pool.connection().execute(
+            'SELECT i.data, i.quantity, c.version FROM cart_items i LEFT JOIN carts c ON c.cart_id = i.cart_id '
+            'WHERE i.cart_id = ? AND i.updated_at >= ? ORDER BY i.rowid',
+            (cart_id, time.time() - self.ttl)).fetchall()
+        version = rows[0][2] if rows else None
+        return version, [dict(json.loads(data), quantity=quantity) for data, quantity, _ in rows]
+
+    def add(self, cart_id, item):
+        return self.apply(cart_id, [('add', item)])
+
+    def update_quantity(self, cart_id, product_id, size, quantity):
+        return self.apply(cart_id, [('update', product_id, size, quantity)])
+
+    def remove(self, cart_id, product_id, size=None):
+        return self.apply(cart_id, [('remove', product_id, size)])
+
+    def apply(self, cart_id, operations):
+        """Apply cart operations in one transaction (see MemoryCartStore.apply)"""
+        now = time.time()
+        with self.pool.transaction() as conn:
+            self._expire(conn, cart_id, now)
+            for op in operations:
+                self._apply_one(conn, cart_id, op, now)
+            self._touch(conn, cart_id, now)
+            items = self._read(conn, cart_id)
+        self._after_write()
+        return items
+
+    def _apply_one(self, conn, cart_id, op, now):
+        if op[0] == 'add':
+            item = op[1]
+            data = json.dumps({k: v for k, v in item.items() if k != 'quantity'})
+            conn.execute(
+                'INSERT INTO cart_items (cart_id, product_id, size, quantity, data, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(cart_id, product_id, size) DO UPDATE SET quantity = quantity + excluded.quantity',
+                (cart_id, item['id'], self._size(item['size']), item['quantity'], data, now))
+        elif op[0] == 'update':
+            _, product_id, size, quantity = op
+            if quantity <= 0:
+                conn.execute('DELETE FROM cart_items WHERE cart_id = ? AND product_id = ? AND size = ?',
+                             (cart_id, product_id, self._size(size)))
+            else:
+                conn.execute('UPDATE cart_items SET quantity = ? WHERE cart_id = ? AND product_id = ? AND size = ?',
+                             (quantity, cart_id, product_id, self._size(size)))
+        elif op[0] == 'remove':
+            _, product_id, size = op
+            if size is not None:
+                conn.execute('DELETE FROM cart_items WHERE cart_id = ? AND product_id = ? AND size = ?',
+                             (cart_id, product_id, self._size(size)))
+            else:
+                conn.execute('DELETE FROM cart_items WHERE cart_id = ? AND product_id = ?', (cart_id, product_id))
+        else:
+            raise ValueError(f"Unknown cart operation: {op[0]}")
+
+    def clear(self, cart_id):
+        self.pool.write(('DELETE FROM cart_items WHERE cart_id = ?', (cart_id,)),
+                        ('DELETE FROM carts WHERE cart_id = ?', (cart_id,)))
+
+    def close(self):
+        self.pool.close()
+
+
+def create_cart_store(backend, database_path=None, ttl=86400, max_carts=100_000):
+    """Build the cart store named by ``backend`` ('memory' or 'sqlite')"""
+    if backend == 'memory':
+        return MemoryCartStore(ttl=ttl, max_carts=max_carts)
+    if backend == 'sqlite':
+        return SQLiteCartStore(database_path or 'ecommerce.db', ttl=ttl)
+    raise ValueError(f"Unknown cart backend: {backend}")
@@ -0,0 +1,337 @@
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+
+class CatalogStore:
+    """In-memory product catalog with a primary id index and secondary indexes.
+
+    Products are kept in a dict keyed by id (insertion order is preserved, so
+    listings come back in the same order they were added). Secondary indexes
+    map a category or a boolean flag to an ordered ``{id: product}`` dict, which
+    gives O(1) lookups, inserts and removals.
+
+    For listing queries the store also keeps one sorted ``[(key, id), ...]``
+    list per sort order, maintained with ``bisect`` on every write, so a page of
+    results is read straight off the index instead of sorting per request.
+
+    ``version`` is bumped on every write so callers can cheaply tell whether
+    anything derived from the catalog (cached responses, etc.) is stale.
+    Listeners registered with ``subscribe`` are called as
+    ``listener(product_id, product)`` after each write, with ``product=None``
+    for deletes, so derived indexes can be kept in step incrementally.
+    """
+
+    INDEXED_FLAGS = ('inStock', 'featured', 'bestseller', 'newArrival')
+    SORT_FIELDS = ('default', 'price', 'name', 'createdAt')
+
+    # Sort a small candidate set (e.g. one category) directly instead of
+    # walking the full sorted index when it is this many times smaller.
+    CANDIDATE_RATIO = 8
+    _MAX_ID = '\U0010ffff'
+
+    def __init__(self, products=None):
+        self._lock = threading.RLock()
+        self._by_id = {}
+        self._by_category = {}
+        self._by_flag = {flag: {} for flag in self.INDEXED_FLAGS}
+        self._sorted = {field: [] for field in self.SORT_FIELDS}
+        self._seq = {}
+        self._next_seq = 0
+        self._listeners = []
+        self.version = 0
+        if products:
+            self.upsert_many(products)
+
+    STATE_FIELDS = ('_by_id', '_by_category', '_by_flag', '_sorted', '_seq', '_next_seq')
+
+    def export_state(self, dumps, *derived):
+        """Serialize the catalog's products and indexes for a startup snapshot.
+
+        ``dumps((state, [derived states]))`` runs under the catalog lock, with
+        the ``export_state()`` of each ``derived`` index kept in step by a
+        listener, so everything describes the same catalog and nothing changes
+        mid-serialization. Reads and writes wait for it. Returns
+        ``(version, data)``.
+        """
+        with self._lock:
+            state = {field: getattr(self, field) for field in self.STATE_FIELDS}
+            return self.version, dumps((state, [index.export_state() for index in derived]))
+
+    @classmethod
+    def from_state(cls, state):
+        """A catalog restored from ``export_state()`` without re-indexing every product"""
+        catalog = cls()
+        for field in cls.STATE_FIELDS:
+            setattr(catalog, field, state[field])
+        return catalog
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, product_id):
+        return product_id in self._by_id
+
+    # ---------- reads ----------
+    def all(self):
+        return list(self._by_id.values())
+
+    def get(self, product_id):
+        return self._by_id.get(product_id)
+
+    def by_category(self, category):
+        return list(self._by_category.get(category, {}).values())
+
+    def with_flag(self, flag):
+        """Return products where ``flag`` is truthy (e.g. ``featured``)."""
+        if flag not in self._by_flag:
+            raise KeyError(f"Flag is not indexed: {flag}")
+        return list(self._by_flag[flag].values())
+
+    def categories(self):
+        return list(self._by_category)
+
+    def query(self, category=None, min_price=None, max_price=None, size=None,
+              flags=None, sort='default', descending=False, after=None,
+              offset=0, limit=24):
+        """Return one page of products matching the filters.
+
+        ``flags`` maps indexed flag names to the wanted boolean. ``after`` is the
+        sort key of the last item on the previous page (cursor pagination);
+        ``offset`` skips that many matches (offset pagination).
+
+        Returns ``(products, next_after)`` where ``next_after`` is None on the
+        last page.
+        """
+        if sort not in self._sorted:
+            raise ValueError(f"Unknown sort field: {sort}")
+        flags = flags or {}
+        for flag in flags:
+            if flag not in self._by_flag:
+                raise ValueError(f"Flag is not indexed: {flag}")
+
+        def matches(product):
+            if category is not None and product.get('category') != category:
+                return False
+            if min_price is not None or max_price is not None:
+                price = float(product.get('price') or 0)
+                if min_price is not None and price < min_price:
+                    return False
+                if max_price is not None and price > max_price:
+                    return False
+            if size is not None and size not in (product.get('sizes') or []):
+                return False
+            for flag, wanted in flags.items():
+                if bool(product.get(flag)) != wanted:
+                    return False
+            return True
+
+        with self._lock:
+            index = self._sorted[sort]
+            candidates = self._smallest_candidate_set(category, flags)
+            if candidates is not None and len(candidates) * self.CANDIDATE_RATIO < len(index):
+                index = sorted((self._sort_key(sort, p), pid) for pid, p in candidates.items())
+
+            lo, hi = 0, len(index)
+            if sort == 'price':
+                if min_price is not None:
+                    lo = bisect_left(index, (float(min_price),))
+                if max_price is not None:
+                    hi = bisect_right(index, (float(max_price), self._MAX_ID))
+            if after is not None:
+                if descending:
+                    hi = min(hi, bisect_left(index, after))
+                else:
+                    lo = max(lo, bisect_right(index, after))
+
+            positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+            page = []
+            skipped = 0
+            for i in positions:
+                entry = index[i]
+                product = self._by_id[entry[1]]
+                if not matches(product):
+                    continue
+                if skipped < offset:
+                    skipped += 1
+                    continue
+                page.append((entry, product))
+                if len(page) > limit:
+                    break
+
+        next_after = page[limit - 1][0] if len(page) > limit and limit > 0 else None
+        return [product for _, product in page[:limit]], next_after
+
+    def _smallest_candidate_set(self, category, flags):
+        sets = [self._by_flag[flag] for flag, wanted in flags.items() if wanted]
+        if category is not None:
+            sets.append(self._by_category.get(category, {}))
+        return min(sets, key=len) if sets else None
+
+    def _sort_key(self, field, product):
+        if field == 'default':
+            return self._seq[product['id']]
+        if field == 'price':
+            return float(product.get('price') or 0)
+        if field == 'name':
+            return str(product.get('name') or '').casefold()
+        return str(product.get(field) or '')
+
+    # ---------- writes ----------
+    def subscribe(self, listener, replay=True):
+        """Register ``listener(product_id, product)`` and replay the current catalog to it.
+
+        Pass ``replay=False`` when the listener's state already matches the
+        catalog (e.g. both were restored from one snapshot).
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            if replay:
+                for product_id, product in self._by_id.items():
+                    listener(product_id, product)
+
+    def _notify(self, product_id, product):
+        for listener in self._listeners:
+            listener(product_id, product)
+
+    def replace_all(self, products):
+        """Swap in a whole new catalog at once.
+
+        The new indexes are built off to the side, so readers see either the
+        old catalog or the new one, never a half-loaded mix.
+        """
+        fresh = CatalogStore(products)
+        with self._lock:
+            removed = self._by_id.keys() - fresh._by_id.keys()
+            self._by_id = fresh._by_id
+            self._by_category = fresh._by_category
+            self._by_flag = fresh._by_flag
+            self._sorted = fresh._sorted
+            self._seq = fresh._seq
+            self._next_seq = fresh._next_seq
+            self.version += 1
+            for product_id in removed:
+                self._notify(product_id, None)
+            for product_id, product in self._by_id.items():
+                self._notify(product_id, product)
+
+    def upsert_many(self, products):
+        """Add or replace many products as one change.
+
+        Copies of the indexes are updated off to the side, with each sorted
+        index re-sorted once instead of bisected per product, then swapped
+        in together, so readers never see a partly applied import.
+        Replaced products keep their place in the default order.
+        """
+        products = {product['id']: product for product in products}
+        if not products:
+            return
+        with self._lock:
+            by_id = dict(self._by_id)
+            seq = dict(self._seq)
+            next_seq = self._next_seq
+            replaced = {pid: by_id[pid] for pid in products if pid in by_id}
+            for pid, product in products.items():
+                if pid not in seq:
+                    seq[pid] = next_seq
+                    next_seq += 1
+                by_id[pid] = product
+
+            by_category = {category: dict(members) for category, members in self._by_category.items()}
+            by_flag = {flag: dict(members) for flag, members in self._by_flag.items()}
+            for pid, old in replaced.items():
+                members = by_category.get(old.get('category'))
+                if members is not None:
+                    members.pop(pid, None)
+                    if not members:
+                        del by_category[old.get('category')]
+                for members in by_flag.values():
+                    members.pop(pid, None)
+            for pid, product in products.items():
+                by_category.setdefault(product.get('category'), {})[pid] = product
+                for flag, members in by_flag.items():
+                    if product.get(flag):
+                        members[pid] = product
+
+            def sort_key(field, product):
+                return seq[product['id']] if field == 'default' else self._sort_key(field, product)
+
+            sorted_indexes = {}
+            for field, index in self._sorted.items():
+                stale = {(sort_key(field, old), pid) for pid, old in replaced.items()}
+                entries = [entry for entry in index if entry not in stale] if stale else list(index)
+                entries.extend((sort_key(field, product), pid) for pid, product in products.items())
+                entries.sort()
+                sorted_indexes[field] = entries
+
+            self._by_id = by_id
+            self._by_category = by_category
+            self._by_flag = by_flag
+            self._sorted = sorted_indexes
+            self._seq = seq
+            self._next_seq = next_seq
+            self.version += 1
+            for pid, product in products.items():
+                self._notify(pid, product)
+
+    def add(self, product):
+        with self._lock:
+            existing = self._by_id.get(product['id'])
+            if existing is not None:
+                self._unindex(existing)
+            else:
+                self._seq[product['id']] = self._next_seq
+                self._next_seq += 1
+            self._by_id[product['id']] = product
+            self._index(product)
+            self.version += 1
+            self._notify(product['id'], product)
+            return product
+
+    def update(self, product_id, changes):
+        """Apply ``changes`` to a product and re-index it. Returns the product or None."""
+        with self._lock:
+            product = self._by_id.get(product_id)
+            if product is None:
+                return None
+            self._unindex(product)
+            product.update(changes)
+            self._index(product)
+            self.version += 1
+            self._notify(product_id, product)
+            return product
+
+    def remove(self, product_id):
+        """Remove a product. Returns the removed product or None."""
+        with self._lock:
+            product = self._by_id.pop(product_id, None)
+            if product is not None:
+                self._unindex(product)
+                del self._seq[product_id]
+                self.version += 1
+                self._notify(product_id, None)
+            return product
+
+    # ---------- index maintenance ----------
+    def _index(self, product):
+        pid = product['id']
+        self._by_category.setdefault(product.get('category'), {})[pid] = product
+        for flag, members in self._by_flag.items():
+            if product.get(flag):
+                members[pid] = product
+        for field, index in self._sorted.items():
+            insort(index, (self._sort_key(field, product), pid))
+
+    def _unindex(self, product):
+        pid = product['id']
+        members = self._by_category.get(product.get('category'))
+        if members is not None:
+            members.pop(pid, None)
+            if not members:
+                del self._by_category[product.get('category')]
+        for members in self._by_flag.values():
+            members.pop(pid, None)
+        for field, index in self._sorted.items():
+            entry = (self._sort_key(field, product), pid)
+            i = bisect_left(index, entry)
+            if i < len(index) and index[i] == entry:
+                del index[i]
@@ -0,0 +1,96 @@
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = frozenset((
+    'application/json', 'application/x-ndjson', 'application/javascript',
+    'text/html', 'text/csv', 'text/plain', 'text/css', 'image/svg+xml',
+))
+
+
+class ResponseCompressor:
+    """Negotiated gzip/brotli compression of buffered responses.
+
+    Bodies below ``min_bytes``, streamed responses (exports), files sent with
+    ``send_file`` (static assets are precompressed) and responses that already
+    carry a Content-Encoding are left alone. A strong ETag names exactly one
+    body, so compressed bodies of responses that have one (the cached catalog
+    endpoints) are kept in a byte-bounded LRU and each version of a large
+    payload is only compressed once per encoding. The ETag becomes weak on
+    compressed responses; If-None-Match uses weak comparison, so revalidation
+    still ends in a 304.
+    """
+
+    def __init__(self, min_bytes=1024, gzip_level=6, brotli_quality=4, cache_bytes=32 * 1024 * 1024):
+        self.min_bytes = min_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # Server preference when the client accepts both equally
+        self.encodings = ('br', 'gzip') if brotli is not None else ('gzip',)
+        self._cache_bytes = cache_bytes
+        self._cached = OrderedDict()
+        self._cached_size = 0
+        self._lock = threading.Lock()
+
+    def choose(self, accept_encodings):
+        """The accepted encoding with the highest quality, or None"""
+        best, best_quality = None, 0
+        for encoding in self.encodings:
+            quality = accept_encodings[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.brotli_quality)
+        return gzip.compress(data, compresslevel=self.gzip_level, mtime=0)
+
+    def _compress_cached(self, data, encoding, etag):
+        key = (etag, encoding)
+        with self._lock:
+            body = self._cached.get(key)
+            if body is not None:
+                self._cached.move_to_end(key)
+                return body
+
+        body = self.compress(data, encoding)
+        if len(body) <= self._cache_bytes // 4:
+            with self._lock:
+                if key not in self._cached:
+                    self._cached[key] = body
+                    self._cached_size += len(body)
+                while self._cached_size > self._cache_bytes:
+                    _, evicted = self._cached.popitem(last=False)
+                    self._cached_size -= len(evicted)
+        return body
+
+    def apply(self, response, accept_encodings):
+        """Compress ``response`` in place when it is worth it and the client accepts it"""
+        if (response.direct_passthrough or response.is_streamed
+                or not 200 <= response.status_code < 300 or response.status_code in (204, 206)
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+        data = response.get_data()
+        if len(data) < self.min_bytes:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.choose(accept_encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            body = self._compress_cached(data, encoding, etag)
+            response.set_etag(etag, weak=True)
+        else:
+            body = self.compress(data, encoding)
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        return response
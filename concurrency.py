@@ -0,0 +1,95 @@
+import fnmatch
+import threading
+import time
+
+
+class Overloaded(Exception):
+    """A route is at its concurrency limit and its wait queue is full (or the wait timed out)"""
+
+
+class _Gate:
+    def __init__(self, limit, max_waiting):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.active = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+
+class ConcurrencyLimiter:
+    """Caps how many requests to a group of routes run at once.
+
+    ``limits`` maps URL rule patterns (``fnmatch`` syntax, e.g.
+    ``/api/payment/*``) to the number of requests allowed in flight for all
+    routes matching that pattern; the first matching pattern applies and
+    unmatched routes are not limited. A request over the limit waits up to
+    ``timeout`` seconds for a slot, with at most ``max_waiting`` requests
+    queued per pattern. Anything beyond that raises Overloaded at once, so a
+    slow dependency (the payment gateway) ties up a bounded number of server
+    threads instead of all of them.
+    """
+
+    def __init__(self, limits, max_waiting=32, timeout=5.0):
+        self.timeout = timeout
+        self._patterns = [(pattern, _Gate(limit, max_waiting)) for pattern, limit in limits]
+        self._routes = {}
+        self.rejected = 0
+
+    def _gate(self, route):
+        try:
+            return self._routes[route]
+        except KeyError:
+            gate = next((g for pattern, g in self._patterns if fnmatch.fnmatchcase(route, pattern)), None)
+            self._routes[route] = gate
+            return gate
+
+    def acquire(self, route):
+        """Take a slot for ``route``; returns a token for ``release`` (None if the route is unlimited)"""
+        gate = self._gate(route)
+        if gate is None:
+            return None
+        with gate.condition:
+            if gate.active < gate.limit:
+                gate.active += 1
+                return gate
+            if gate.waiting >= gate.max_waiting:
+                self.rejected += 1
+                raise Overloaded(route)
+            gate.waiting += 1
+            deadline = time.monotonic() + self.timeout
+            try:
+                while gate.active >= gate.limit:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise Overloaded(route)
+                    gate.condition.wait(remaining)
+            finally:
+                gate.waiting -= 1
+            gate.active += 1
+            return gate
+
+    def release(self, token):
+        if token is None:
+            return
+        with token.condition:
+            token.active -= 1
+            token.condition.notify()
+
+    def stats(self):
+        """``{pattern: (active, waiting, limit)}``"""
+        return {pattern: (g.active, g.waiting, g.limit) for pattern, g in self._patterns}
+
+
+def parse_limits(value):
+    """``'/api/payment/*=8,/api/admin/orders/export=2'`` -> ``[('/api/payment/*', 8), ...]``"""
+    limits = []
+    for part in value.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        pattern, _, limit = part.rpartition('=')
+        if not pattern or not limit.strip().isdigit():
+            raise ValueError(f"Invalid route concurrency limit: {part!r}")
+        limits.append((pattern.strip(), int(limit)))
+    return limits
@@ -0,0 +1,69 @@
+import itertools
+import threading
+from collections import OrderedDict
+
+
+class FragmentCache:
+    """LRU cache of rendered HTML fragments.
+
+    Fragments about one product (a card, a detail panel) are keyed by
+    ``(name, product_id, revision)``, where the product's revision moves on
+    whenever the catalog reports a write to that product (register ``sync``
+    with ``CatalogStore.subscribe``). An admin edit therefore only orphans
+    that product's fragments; everything else stays cached. A render that
+    raced with an edit is stored under the old revision and never served.
+
+    Fragments that depend on the catalog as a whole (a listing page) use
+    ``get(key, render, version)`` with the catalog version instead.
+    """
+
+    def __init__(self, max_entries=10_000):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._revisions = {}
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def sync(self, product_id, product):
+        """CatalogStore listener: retire the product's cached fragments"""
+        # Revisions never repeat, so a deleted and re-added id can't revive old fragments
+        with self._lock:
+            self._revisions[product_id] = next(self._counter)
+
+    def revision(self, product_id):
+        return self._revisions.get(product_id, 0)
+
+    def get(self, key, render, version=None):
+        """Return the fragment for ``(key, version)``, rendering it with ``render()`` on a miss"""
+        full_key = (key, version)
+        with self._lock:
+            html = self._entries.get(full_key)
+            if html is not None:
+                self._entries.move_to_end(full_key)
+                self.hits += 1
+                return html
+            self.misses += 1
+
+        html = render()
+        with self._lock:
+            self._entries[full_key] = html
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def product(self, name, product_id, render):
+        """A fragment about one product, valid until that product changes.
+
+        The revision is read before ``render()`` runs, so ``render`` should
+        look the product up itself rather than close over an earlier copy.
+        """
+        return self.get((name, product_id), render, self.revision(product_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
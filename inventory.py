@@ -0,0 +1,264 @@
+import heapq
+import json
+import threading
+import time
+import uuid
+
+from storage import SQLitePool
+
+
+class InsufficientStock(Exception):
+    """Raised by ``reserve`` when a line cannot be covered; ``shortages`` lists them"""
+
+    def __init__(self, shortages):
+        super().__init__("Insufficient stock")
+        self.shortages = shortages
+
+
+class MemoryInventory:
+    """Per-``(product_id, size)`` stock counts with reservations, in process memory.
+
+    A SKU has ``on_hand`` units of which ``reserved`` are held by pending
+    checkouts. ``reserve`` holds stock for a whole order atomically,
+    ``commit`` turns the hold into a sale and ``release`` gives it back.
+    Reservations not committed within ``ttl`` seconds are released
+    automatically.
+
+    SKUs are spread over striped locks so checkouts of different products do
+    not contend; a multi-line reservation takes its stripes in index order to
+    avoid deadlocks. SKUs with no stock record are untracked (unlimited).
+    """
+
+    def __init__(self, ttl=900, stripes=64, sweep_interval=1.0):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._stripes = [threading.Lock() for _ in range(stripes)]
+        self._stock = {}
+        self._reservations = {}
+        self._expiry_heap = []
+        self._reservations_lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def _stripe(self, key):
+        return hash(key) % len(self._stripes)
+
+    # ---------- stock levels ----------
+    def set_stock(self, product_id, size, on_hand):
+        """Set the on-hand count for a SKU; units already reserved stay reserved"""
+        key = (product_id, size)
+        with self._stripes[self._stripe(key)]:
+            counts = self._stock.get(key)
+            if counts is None:
+                self._stock[key] = [on_hand, 0]
+            else:
+                counts[0] = on_hand
+
+    def available(self, product_id, size):
+        """Units that can still be reserved, or None for an untracked SKU"""
+        counts = self._stock.get((product_id, size))
+        if counts is None:
+            return None
+        return counts[0] - counts[1]
+
+    def stock_levels(self, product_id, sizes):
+        return {size: self.available(product_id, size) for size in sizes}
+
+    # ---------- reservations ----------
+    def reserve(self, lines, ttl=None):
+        """Hold ``[(product_id, size, quantity), ...]`` and return a reservation id.
+
+        Either every line is reserved or none is; raises InsufficientStock
+        with the short lines otherwise.
+        """
+        self._maybe_sweep()
+        merged = {}
+        for product_id, size, quantity in lines:
+            merged[(product_id, size)] = merged.get((product_id, size), 0) + quantity
+        tracked = [key for key in merged if key in self._stock]
+        locks = [self._stripes[i] for i in sorted({self._stripe(key) for key in tracked})]
+
+        for lock in locks:
+            lock.acquire()
+        try:
+            shortages = []
+            for key in tracked:
+                on_hand, reserved = self._stock[key]
+                if on_hand - reserved < merged[key]:
+                    shortages.append({"id": key[0], "size": key[1],
+                                      "requested": merged[key], "available": on_hand - reserved})
+            if shortages:
+                raise InsufficientStock(shortages)
+            for key in tracked:
+                self._stock[key][1] += merged[key]
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+        reservation_id = uuid.uuid4().hex
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._reservations_lock:
+            self._reservations[reservation_id] = {key: merged[key] for key in tracked}
+            heapq.heappush(self._expiry_heap, (expires_at, reservation_id))
+        return reservation_id
+
+    def commit(self, reservation_id):
+        """Turn a reservation into a sale. Returns False if it expired or is unknown."""
+        return self._finish(reservation_id, sold=True)
+
+    def release(self, reservation_id):
+        """Give reserved stock back. Returns False if it expired or is unknown."""
+        return self._finish(reservation_id, sold=False)
+
+    def _finish(self, reservation_id, sold):
+        with self._reservations_lock:
+            held = self._reservations.pop(reservation_id, None)
+        if held is None:
+            return False
+        for key, quantity in held.items():
+            with self._stripes[self._stripe(key)]:
+                counts = self._stock[key]
+                counts[1] -= quantity
+                if sold:
+                    counts[0] -= quantity
+        return True
+
+    def release_expired(self):
+        """Release every reservation past its TTL; returns how many were released"""
+        now = time.monotonic()
+        expired = []
+        with self._reservations_lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= now:
+                _, reservation_id = heapq.heappop(self._expiry_heap)
+                if reservation_id in self._reservations:
+                    expired.append(reservation_id)
+        return sum(1 for reservation_id in expired if self.release(reservation_id))
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.release_expired()
+
+    def close(self):
+        pass
+
+
+class SQLiteInventory:
+    """Per-SKU stock counts and reservations in SQLite, shared across workers.
+
+    Each reservation line is a conditional ``UPDATE ... WHERE on_hand -
+    reserved >= ?``, so the check and the hold are one atomic statement and
+    no worker can oversell. See MemoryInventory for the API.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS inventory (
+        product_id TEXT NOT NULL,
+        size TEXT NOT NULL,
+        on_hand INTEGER NOT NULL,
+        reserved INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (product_id, size)
+    );
+
+    CREATE TABLE IF NOT EXISTS reservations (
+        id TEXT PRIMARY KEY,
+        lines TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_reservations_expires ON reservations (expires_at);
+    """
+
+    def __init__(self, path, ttl=900, sweep_interval=1.0):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.pool = SQLitePool(path)
+        self.pool.connection().executescript(self.SCHEMA)
+        self._last_sweep = 0.0
+
+    def set_stock(self, product_id, size, on_hand):
+        self.pool.write((
+            'INSERT INTO inventory (product_id, size, on_hand) VALUES (?, ?, ?) '
+            'ON CONFLICT(product_id, size) DO UPDATE SET on_hand = excluded.on_hand',
+            (product_id, size, on_hand)))
+
+    def available(self, product_id, size):
+        row = self.pool.connection().execute(
+            'SELECT on_hand - reserved FROM inventory WHERE product_id = ? AND size = ?',
+            (product_id, size)).fetchone()
+        return row[0] if row else None
+
+    def stock_levels(self, product_id, sizes):
+        rows = self.pool.connection().execute(
+            'SELECT size, on_hand - reserved FROM inventory WHERE product_id = ?', (product_id,))
+        levels = dict(rows.fetchall())
+        return {size: levels.get(size) for size in sizes}
+
+    def reserve(self, lines, ttl=None):
+        self._maybe_sweep()
+        merged = {}
+        for product_id, size, quantity in lines:
+            merged[(product_id, size)] = merged.get((product_id, size), 0) + quantity
+
+        reservation_id = uuid.uuid4().hex
+        held = []
+        shortages = []
+        with self.pool.transaction() as conn:
+            for (product_id, size), quantity in merged.items():
+                cursor = conn.execute(
+                    'UPDATE inventory SET reserved = reserved + ? '
+                    'WHERE product_id = ? AND size = ? AND on_hand - reserved >= ?',
+                    (quantity, product_id, size, quantity))
+                if cursor.rowcount:
+                    held.append([product_id, size, quantity])
+                    continue
+                available = self.available(product_id, size)
+                if available is not None:
+                    shortages.append({"id": product_id, "size": size,
+                                      "requested": quantity, "available": available})
+            if shortages:
+                raise InsufficientStock(shortages)
+            conn.execute('INSERT INTO reservations (id, lines, expires_at) VALUES (?, ?, ?)',
+                         (reservation_id, json.dumps(held), time.time() + (self.ttl if ttl is None else ttl)))
+        return reservation_id
+
+    def commit(self, reservation_id):
+        return self._finish(reservation_id, sold=True)
+
+    def release(self, reservation_id):
+        return self._finish(reservation_id, sold=False)
+
+    def _finish(self, reservation_id, sold):
+        with self.pool.transaction() as conn:
+            row = conn.execute('SELECT lines FROM reservations WHERE id = ?', (reservation_id,)).fetchone()
+            if row is None:
+                return False
+            conn.execute('DELETE FROM reservations WHERE id = ?', (reservation_id,))
+            for product_id, size, quantity in json.loads(row[0]):
+                conn.execute(
+                    'UPDATE inventory SET reserved = reserved - ?, on_hand = on_hand - ? '
+                    'WHERE product_id = ? AND size = ?',
+                    (quantity, quantity if sold else 0, product_id, size))
+        return True
+
+    def release_expired(self):
+        rows = self.pool.connection().execute(
+            'SELECT id FROM reservations WHERE expires_at <= ?', (time.time(),)).fetchall()
+        return sum(1 for (reservation_id,) in rows if self.release(reservation_id))
+
+    def _maybe_sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.release_expired()
+
+    def close(self):
+        self.pool.close()
+
+
+def create_inventory(backend, database_path=None, ttl=900):
+    """Build the inventory store named by ``backend`` ('memory' or 'sqlite')"""
+    if backend == 'memory':
+        return MemoryInventory(ttl=ttl)
+    if backend == 'sqlite':
+        return SQLiteInventory(database_path or 'ecommerce.db', ttl=ttl)
+    raise ValueError(f"Unknown inventory backend: {backend}")
@@ -0,0 +1,29 @@
+import threading
+
+
+class Lazy:
+    """A value built by ``factory()`` on first use.
+
+    Concurrent first callers wait for one build rather than each running the
+    factory. If the factory raises, nothing is stored and the next ``get``
+    tries again. Build after fork: a value created in a parent process (a
+    connection pool, a thread) is not shared safely with its children.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._value = None
+
+    def get(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._value = self._factory()
+                    self._loaded = True
+        return self._value
+
+    @property
+    def loaded(self):
+        return self._loaded
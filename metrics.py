@@ -0,0 +1,203 @@
+import cProfile
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds; suits everything from a cached JSON response to a slow gateway call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic total per label combination; labels are a tuple in declaration order"""
+
+    kind = 'counter'
+
+    def inc(self, labels=(), value=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """A value that goes up and down, e.g. requests in flight"""
+
+    kind = 'gauge'
+
+    def dec(self, labels=(), value=1):
+        self.inc(labels, -value)
+
+    def set(self, labels=(), value=0):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Bucketed observations; counts are per bucket and made cumulative on export"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, labels=()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, labels)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {total!r}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named metrics of one process, rendered in the Prometheus text format.
+
+    Every worker process keeps its own registry, so with several workers
+    each scrape sees the worker that served it; scrape workers individually
+    or aggregate by instance.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+class SlowRequestProfiler:
+    """Profile a random sample of requests and keep the slow ones.
+
+    Each request is profiled with probability ``sample_rate`` (one at a
+    time, since only one profiler can be active per process); if it took
+    longer than ``threshold`` seconds its cProfile stats are written to
+    ``directory`` as ``<unix ms>-<route>.prof`` for ``python -m pstats`` or
+    snakeviz. At most ``max_files`` captures are kept.
+    """
+
+    def __init__(self, directory, sample_rate=0.01, threshold=0.5, max_files=100):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.threshold = threshold
+        self.max_files = max_files
+        self._busy = threading.Lock()
+
+    def start(self):
+        """Return an enabled profiler if this request is sampled, else None"""
+        if random.random() >= self.sample_rate or not self._busy.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool is active (e.g. a debugger)
+            self._busy.release()
+            return None
+        return profiler
+
+    def stop(self, profiler, elapsed, route):
+        """Disable ``profiler``; returns the capture's path if it was slow enough to keep"""
+        profiler.disable()
+        self._busy.release()
+        if elapsed < self.threshold:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root'
+        path = os.path.join(self.directory, f"{int(time.time() * 1000)}-{name}.prof")
+        profiler.dump_stats(path)
+        self._prune()
+        return path
+
+    def _prune(self):
+        captures = sorted(f for f in os.listdir(self.directory) if f.endswith('.prof'))
+        for stale in captures[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.directory, stale))
+            except OSError:
+                pass
@@ -0,0 +1,96 @@
+import os
+import threading
+import time
+
+# Milliseconds since 2024-01-01T00:00:00Z; 41 bits last until 2093
+EPOCH_MS = 1704067200000
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+TIMESTAMP_SHIFT = WORKER_BITS + SEQUENCE_BITS
+
+
+class OrderIdGenerator:
+    """Snowflake-style order ids: ``<prefix><16 hex digits>``.
+
+    The 63-bit value packs a millisecond timestamp, a worker id and a
+    per-millisecond sequence, so ids from generators with distinct worker
+    ids never collide and sort by creation time (fixed-width hex sorts the
+    same as the number). When a millisecond's 4096 sequence numbers run out, or
+    the clock steps backwards, the generator borrows the next millisecond
+    instead of waiting, so ids stay strictly increasing per worker.
+
+    Each process writing to the same storage needs its own worker id.
+    Without an explicit one it is derived from the pid (and re-derived after
+    ``fork``), which is only safe for a single process: pids that are equal
+    modulo 1024 share a worker id. serve.py gives each of its workers a
+    distinct one; with more than one host, give each host its own range.
+    """
+
+    def __init__(self, prefix='ORD-', worker_id=None):
+        self.prefix = prefix
+        self._explicit_worker_id = worker_id
+        self._reset()
+        if worker_id is None and hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        worker_id = self._explicit_worker_id
+        if worker_id is None:
+            worker_id = os.getpid() & MAX_WORKER_ID
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self._worker_bits = worker_id << SEQUENCE_BITS
+        self._last_ms = -1
+        self._sequence = 0
+        # A fresh lock, in case another thread held the old one at fork time
+        self._lock = threading.Lock()
+
+    def _advance(self, now):
+        """Step to the next (millisecond, sequence) slot (caller holds the lock)"""
+        if now > self._last_ms:
+            self._last_ms = now
+            self._sequence = 0
+        elif self._sequence < MAX_SEQUENCE:
+            self._sequence += 1
+        else:
+            self._last_ms += 1
+            self._sequence = 0
+        return (self._last_ms << TIMESTAMP_SHIFT) | self._worker_bits | self._sequence
+
+    def next_value(self):
+        """Return the next id as an integer"""
+        now = time.time_ns() // 1_000_000 - EPOCH_MS
+        with self._lock:
+            return self._advance(now)
+
+    def next_id(self):
+        now = time.time_ns() // 1_000_000 - EPOCH_MS
+        with self._lock:
+            value = self._advance(now)
+        return f"{self.prefix}{value:016X}"
+
+    __call__ = next_id
+
+    def next_ids(self, count):
+        """Return ``count`` consecutive ids, taking the lock once.
+
+        Whole runs of sequence numbers are claimed at a time, so bulk callers
+        (imports, benchmarks) skip the per-id locking.
+        """
+        now = time.time_ns() // 1_000_000 - EPOCH_MS
+        values = []
+        with self._lock:
+            while len(values) < count:
+                first = self._advance(now)
+                take = min(count - len(values), MAX_SEQUENCE - self._sequence + 1)
+                values.extend(range(first, first + take))
+                self._sequence += take - 1
+        return list(map((self.prefix.replace('%', '%%') + '%016X').__mod__, values))
+
+    def timestamp(self, order_id):
+        """Creation time (Unix seconds) encoded in an id from this generator"""
+        value = int(order_id[len(self.prefix):], 16)
+        return ((value >> TIMESTAMP_SHIFT) + EPOCH_MS) / 1000
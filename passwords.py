@@ -0,0 +1,91 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Full parameter lists for werkzeug's short method names, so stored hashes
+# can be compared with the configured method to decide on a rehash
+DEFAULT_PARAMETERS = {
+    'scrypt': 'scrypt:32768:8:1',
+    'pbkdf2': 'pbkdf2:sha256:600000',
+    'pbkdf2:sha256': 'pbkdf2:sha256:600000',
+}
+
+
+def normalize_method(method):
+    return DEFAULT_PARAMETERS.get(method, method)
+
+
+class HasherBusy(Exception):
+    """Too many password hashes are already queued; retry shortly"""
+
+
+class PasswordHasher:
+    """Runs password hashing on a small dedicated thread pool.
+
+    scrypt and PBKDF2 are deliberately expensive, and hashlib releases the
+    GIL while computing them, so hashing on a few worker threads keeps a
+    login burst from starving the request threads serving everything else.
+    At most ``max_pending`` hashes may be queued or running; beyond that
+    calls raise HasherBusy at once rather than piling up behind the pool.
+    ``workers=0`` hashes inline on the caller's thread.
+
+    ``method`` is any werkzeug method string (``scrypt:32768:8:1``,
+    ``pbkdf2:sha256:600000``...). ``verify`` also returns a new hash when
+    the stored one was made with different parameters, so hashes move to
+    the configured cost as users log in.
+    """
+
+    def __init__(self, method='scrypt', workers=2, max_pending=32):
+        self.method = normalize_method(method)
+        self.workers = workers
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    def _pool(self):
+        # Worker threads do not survive a fork; each process gets its own pool
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='password-hash')
+                    self._slots = threading.BoundedSemaphore(self.max_pending)
+                    self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        pool = self._pool()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return pool.submit(fn, *args).result()
+        finally:
+            slots.release()
+
+    def needs_rehash(self, password_hash):
+        return normalize_method(password_hash.split('$', 1)[0]) != self.method
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Return ``(matches, new_hash)``; ``new_hash`` is None unless an upgrade is due"""
+        return self._run(self._verify, password_hash, password)
+
+    def _verify(self, password_hash, password):
+        if not check_password_hash(password_hash, password):
+            return False, None
+        if self.needs_rehash(password_hash):
+            return True, generate_password_hash(password, self.method)
+        return True, None
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown()
+        self._pid = None
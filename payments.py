@@ -0,0 +1,223 @@
+import hashlib
+import hmac
+import random
+import threading
+import time
+
+RAZORPAY_API_URL = 'https://api.razorpay.com/v1'
+
+# Worth another attempt: rate limited or the gateway is briefly unhealthy
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class PaymentError(Exception):
+    """The gateway rejected a request; ``status`` is its HTTP status, if any"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class GatewayUnavailable(PaymentError):
+    """The gateway could not be reached or kept failing after every retry"""
+
+
+class SignatureVerificationError(PaymentError):
+    """A payment or webhook signature did not match"""
+
+
+def verify_webhook_signature(body, signature, secret):
+    """Check a webhook's ``X-Razorpay-Signature`` against the raw request body"""
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    # Compared as bytes: compare_digest raises TypeError on a non-ASCII str
+    if not signature or not hmac.compare_digest(expected.encode(), signature.encode()):
+        raise SignatureVerificationError("Invalid webhook signature")
+
+
+class RazorpayGateway:
+    """Razorpay REST client with pooled connections, timeouts and retries.
+
+    One ``requests.Session`` keeps up to ``pool_size`` keep-alive connections
+    to the gateway, so a checkout does not pay for a TCP and TLS handshake.
+    Every call has a connect and a read timeout, so a slow gateway costs a
+    web worker at most ``max_retries + 1`` timeouts rather than hanging it.
+    Failed calls (connection errors, timeouts, 429 and 5xx) are retried with
+    exponentially growing, fully jittered delays, honouring ``Retry-After``.
+
+    Creating an order is not idempotent on the gateway side, so
+    ``create_order`` takes an idempotency key (our order id, also sent as
+    the Razorpay ``receipt``): concurrent and repeated calls with the same
+    key share one gateway order, and before retrying a call whose outcome
+    is unknown the gateway is asked for an order with that receipt.
+    """
+
+    def __init__(self, key_id, key_secret, base_url=RAZORPAY_API_URL, connect_timeout=3.05,
+                 read_timeout=10.0, max_retries=2, backoff=0.2, max_backoff=2.0, pool_size=32,
+                 idempotency_ttl=3600, idempotency_max_keys=10_000):
+        self.key_secret = key_secret
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.idempotency_ttl = idempotency_ttl
+        self.idempotency_max_keys = idempotency_max_keys
+
+        # Imported here rather than at module load: requests is slow to import
+        # and only needed once a payment is actually taken
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self._connect_timeout = requests.ConnectTimeout
+        self._request_error = requests.RequestException
+        self.session = requests.Session()
+        self.session.auth = (key_id, key_secret)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._lock = threading.Lock()
+        self._idempotent = {}
+
+    # ---------- HTTP ----------
+    def _delay(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_backoff)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _request(self, method, path, params=None, payload=None, recover=None):
+        """Send one API call with retries and return the decoded JSON body.
+
+        ``recover`` is called before retrying a call that may already have
+        taken effect (read timeout, dropped connection or 5xx); if it returns
+        a result, that is used instead of sending the call again.
+        """
+        url = self.base_url + path
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.session.request(method, url, params=params, json=payload, timeout=self.timeout)
+            except self._connect_timeout as e:
+                # The request never reached the gateway, so it is safe to resend
+                if last_attempt:
+                    raise GatewayUnavailable(f"Payment gateway unreachable: {e}") from e
+                time.sleep(self._delay(attempt))
+                continue
+            except self._request_error as e:
+                if last_attempt:
+                    raise GatewayUnavailable(f"Payment gateway request failed: {e}") from e
+                time.sleep(self._delay(attempt))
+                if recover is not None:
+                    recovered = recover()
+                    if recovered is not None:
+                        return recovered
+                continue
+
+            if response.status_code in RETRY_STATUSES:
+                if last_attempt:
+                    raise GatewayUnavailable(f"Payment gateway returned {response.status_code}", response.status_code)
+                time.sleep(self._delay(attempt, response))
+                if recover is not None and response.status_code != 429:
+                    recovered = recover()
+                    if recovered is not None:
+                        return recovered
+                continue
+            if response.status_code >= 400:
+                raise PaymentError(self._error_message(response), response.status_code)
+            return response.json()
+
+    @staticmethod
+    def _error_message(response):
+        try:
+            return response.json()['error']['description']
+        except (ValueError, KeyError, TypeError):
+            return f"Payment gateway returned {response.status_code}"
+
+    # ---------- orders ----------
+    def create_order(self, amount, currency='INR', receipt=None, notes=None, idempotency_key=None):
+        """Create a gateway order for ``amount`` in the smallest currency unit.
+
+        Calls sharing an ``idempotency_key`` (defaults to ``receipt``) within
+        ``idempotency_ttl`` seconds return the same gateway order.
+        """
+        payload = {'amount': amount, 'currency': currency, 'payment_capture': 1}
+        if receipt is not None:
+            payload['receipt'] = receipt
+        if notes:
+            payload['notes'] = notes
+        key = idempotency_key or receipt
+        if key is None:
+            return self._request('POST', '/orders', payload=payload)
+
+        recover = (lambda: self.find_order(receipt, amount)) if receipt is not None else None
+        return self._once(key, lambda: self._request('POST', '/orders', payload=payload, recover=recover))
+
+    def find_order(self, receipt, amount=None):
+        """The most recent gateway order with this receipt (and amount), or None"""
+        try:
+            result = self._request('GET', '/orders', params={'receipt': receipt})
+        except PaymentError:
+            return None
+        for order in result.get('items', []):
+            if amount is None or order.get('amount') == amount:
+                return order
+        return None
+
+    def fetch_order(self, order_id):
+        return self._request('GET', f'/orders/{order_id}')
+
+    def _once(self, key, call):
+        """Run ``call`` once per key; concurrent callers wait for the first one"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._idempotent.get(key)
+            if entry is not None and entry['expires_at'] < now:
+                entry = None
+            owner = entry is None
+            if owner:
+                if len(self._idempotent) >= self.idempotency_max_keys:
+                    self._purge(now)
+                entry = {'done': threading.Event(), 'result': None, 'error': None,
+                         'expires_at': now + self.idempotency_ttl}
+                self._idempotent[key] = entry
+
+        if not owner:
+            entry['done'].wait()
+            if entry['error'] is not None:
+                raise entry['error']
+            return entry['result']
+
+        try:
+            entry['result'] = call()
+            return entry['result']
+        except Exception as e:
+            # Failures are not remembered: the next attempt may succeed
+            entry['error'] = e
+            with self._lock:
+                if self._idempotent.get(key) is entry:
+                    del self._idempotent[key]
+            raise
+        finally:
+            entry['done'].set()
+
+    def _purge(self, now):
+        """Drop expired keys, then the oldest, until under the cap (caller holds the lock)"""
+        for key in [k for k, e in self._idempotent.items() if e['expires_at'] < now]:
+            del self._idempotent[key]
+        while len(self._idempotent) >= self.idempotency_max_keys:
+            del self._idempotent[next(iter(self._idempotent))]
+
+    # ---------- signatures ----------
+    def verify_payment_signature(self, order_id, payment_id, signature):
+        """Check the checkout handler's signature; raises SignatureVerificationError"""
+        message = f"{order_id}|{payment_id}".encode()
+        expected = hmac.new(self.key_secret.encode(), message, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected.encode(), str(signature).encode()):
+            raise SignatureVerificationError("Invalid payment signature")
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+
+
+# Most units of one product and size in a cart line or order item
+MAX_QUANTITY = 999
+
+
+def to_cents(amount):
+    return int(round(float(amount) * 100))
+
+
+def item_error(product, size, quantity):
+    """Why ``quantity`` of ``product`` in ``size`` can't be bought, or None"""
+    if product is None:
+        return "Product not found"
+    if not 1 <= quantity <= MAX_QUANTITY:
+        return "Invalid quantity"
+    if not product.get('inStock', True):
+        return "Product is out of stock"
+    if product.get('sizes') and size not in product['sizes']:
+        return "Invalid size for this product"
+    return None
+
+
+class PricingEngine:
+    """Prices carts and order items from the catalog, never from client data.
+
+    ``quote`` makes one pass over the items, looking each product up by id,
+    and works in integer cents so totals do not drift. Quotes for a cart are
+    cached under ``(cart_id, cart_version, catalog.version)``, so repeated
+    cart views cost a dict lookup until the cart or the catalog changes.
+    Cached quotes are shared and must not be mutated.
+    """
+
+    def __init__(self, catalog, shipping=0, cache_size=10_000):
+        self.catalog = catalog
+        self.shipping_cents = to_cents(shipping)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def quote_cart(self, cart_id, version, items):
+        """Quote a stored cart, reusing the cached quote for this cart version"""
+        if version is None:
+            return self.quote(items)
+        key = (cart_id, version, self.catalog.version)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        quote = self.quote(items)
+        with self._lock:
+            self._cache[key] = quote
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return quote
+
+    def quote(self, items):
+        """Price ``items`` (dicts with id, size and quantity).
+
+        Returns a dict with priced ``lines``, ``subtotal``, ``shipping``,
+        ``total`` and ``itemCount``. Items that cannot be bought (malformed,
+        unknown product, out of stock, bad size or quantity) are reported in
+        ``errors`` and left out of the totals; ``valid`` is False if any
+        were found.
+        """
+        lines, errors = [], []
+        subtotal_cents = 0
+        item_count = 0
+        for index, item in enumerate(items):
+            # Items may come straight from a request body
+            if not isinstance(item, dict):
+                errors.append({"index": index, "error": "Invalid item"})
+                continue
+            product_id = item.get('id')
+            size = item.get('size')
+            if not isinstance(product_id, str) or not (size is None or isinstance(size, str)):
+                errors.append({"index": index, "error": "Invalid item"})
+                continue
+            product = self.catalog.get(product_id)
+            try:
+                quantity = int(item.get('quantity', 1))
+            except (ValueError, TypeError):
+                quantity = 0
+
+            error = item_error(product, size, quantity)
+            if error:
+                errors.append({"index": index, "id": product_id, "size": size, "error": error})
+                continue
+
+            unit_cents = to_cents(product['price'])
+            line_cents = unit_cents * quantity
+            subtotal_cents += line_cents
+            item_count += quantity
+            lines.append({
+                'id': product_id,
+                'name': product['name'],
+                'size': size,
+                'quantity': quantity,
+                'price': unit_cents / 100,
+                'lineTotal': line_cents / 100,
+                'image': (product.get('images') or [None])[0],
+            })
+
+        shipping_cents = self.shipping_cents if lines else 0
+        return {
+            'lines': lines,
+            'errors': errors,
+            'valid': not errors,
+            'itemCount': item_count,
+            'subtotal': subtotal_cents / 100,
+            'shipping': shipping_cents / 100,
+            'total': (subtotal_cents + shipping_cents) / 100,
+        }
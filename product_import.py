@@ -0,0 +1,163 @@
+import csv
+import json
+
+FORMATS = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-seq': 'ndjson',
+    'text/csv': 'csv',
+}
+LIST_SEPARATOR = '|'
+BOOLEAN_FIELDS = ('inStock', 'featured', 'bestseller', 'newArrival')
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no', '')
+
+
+class RowError(ValueError):
+    """A row that can't be read; reported against its line and skipped"""
+
+
+def detect_format(content_type, requested=None):
+    """'ndjson' or 'csv' from an explicit ``format`` parameter or the Content-Type; None if unknown"""
+    if requested:
+        return requested if requested in ('ndjson', 'csv') else None
+    mimetype = (content_type or '').split(';', 1)[0].strip().lower()
+    return FORMATS.get(mimetype)
+
+
+def iter_lines(stream, max_line_bytes):
+    """Decoded lines of a binary stream, read one at a time.
+
+    A line longer than ``max_line_bytes`` is yielded as a RowError (the rest
+    of it is skipped), so one bad line can't make us buffer the whole body.
+    """
+    while True:
+        line = stream.readline(max_line_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_line_bytes and not line.endswith(b'\n'):
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(max_line_bytes)
+            yield RowError(f"Line longer than {max_line_bytes} bytes")
+            continue
+        try:
+            yield line.decode('utf-8')
+        except UnicodeDecodeError:
+            yield RowError("Line is not valid UTF-8")
+
+
+def read_ndjson(lines):
+    """Yield ``(line_number, row)``; ``row`` is a dict or a RowError"""
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, RowError):
+            yield number, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, RowError("Invalid JSON")
+            continue
+        yield number, row if isinstance(row, dict) else RowError("Each line must be a JSON object")
+
+
+def _csv_bool(value):
+    value = value.strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise RowError(f"Invalid boolean: {value}")
+
+
+def _csv_list(value):
+    return [part.strip() for part in value.split(LIST_SEPARATOR) if part.strip()]
+
+
+def _csv_stock(value):
+    """``S:10|M:4`` -> ``{'S': 10, 'M': 4}``"""
+    stock = {}
+    for part in _csv_list(value):
+        size, _, count = part.rpartition(':')
+        try:
+            stock[size.strip()] = int(count)
+        except ValueError:
+            raise RowError(f"Invalid stock entry: {part}")
+    return stock
+
+
+def parse_csv_row(raw):
+    """Turn a CSV record into the same shape as a JSON row"""
+    if None in raw:
+        raise RowError("More values than columns")
+    row = {}
+    for field, value in raw.items():
+        if value is None or field is None:
+            continue
+        field = field.strip()
+        if field in BOOLEAN_FIELDS:
+            row[field] = _csv_bool(value)
+        elif field in ('sizes', 'images'):
+            row[field] = _csv_list(value)
+        elif field == 'stock':
+            if value.strip():
+                row[field] = _csv_stock(value)
+        else:
+            row[field] = value
+    return row
+
+
+def read_csv(lines):
+    """Yield ``(line_number, row)`` from CSV with a header row.
+
+    ``sizes`` and ``images`` are ``|``-separated, ``stock`` is ``S:10|M:4``
+    and boolean columns take true/false, 1/0 or yes/no.
+    """
+    bad = []
+
+    def text():
+        # Unreadable lines become blank ones (which DictReader skips) and are reported separately
+        for number, line in enumerate(lines, 1):
+            if isinstance(line, RowError):
+                bad.append((number, line))
+                yield '\n'
+            else:
+                yield line
+
+    reader = csv.DictReader(text())
+    while True:
+        try:
+            raw = next(reader)
+        except StopIteration:
+            raw = None
+        except csv.Error as e:
+            raw = RowError(f"Invalid CSV: {e}")
+        while bad:
+            yield bad.pop(0)
+        if raw is None:
+            return
+        if isinstance(raw, RowError):
+            yield reader.line_num, raw
+            continue
+        try:
+            yield reader.line_num, parse_csv_row(raw)
+        except RowError as e:
+            yield reader.line_num, e
+
+
+def read_rows(stream, fmt, max_line_bytes=65536):
+    lines = iter_lines(stream, max_line_bytes)
+    return read_csv(lines) if fmt == 'csv' else read_ndjson(lines)
+
+
+def batched(rows, size):
+    """Group an iterator into lists of at most ``size`` items"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
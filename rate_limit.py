@@ -0,0 +1,93 @@
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Counters are unsigned 32-bit; a bucket saturates rather than wraps
+MAX_BUCKET_COUNT = 0xFFFFFFFF
+
+
+class SlidingWindowLimiter:
+    """In-process sliding-window rate limiter.
+
+    Allows ``limit`` hits per key in any ``window`` seconds. The window is
+    split into ``buckets`` slots kept as a ring buffer of counters in one
+    flat ``array`` per key (element 0 is the key's latest slot), so a key
+    costs a few dozen bytes of payload and a hit is O(buckets) at worst.
+    At most ``max_keys`` keys are tracked; the least recently used are
+    evicted first, which keeps memory flat under millions of distinct
+    IPs or emails (an evicted key simply starts from zero).
+
+    Any backend (e.g. a shared store for several hosts) only has to provide
+    ``hit(key, cost=1)``, returning 0 when the hit is allowed and otherwise
+    the seconds until it would be.
+    """
+
+    def __init__(self, limit, window, buckets=10, max_keys=100_000, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.buckets = buckets
+        self.bucket_seconds = window / buckets
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+        self._empty = array('I', [0]) * (buckets + 1)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def hit(self, key, cost=1):
+        """Record a hit unless over the limit; returns seconds to wait (0 = allowed)"""
+        now = self._clock()
+        slot = int(now // self.bucket_seconds)
+        with self._lock:
+            entry = self._keys.get(key)
+            if entry is None:
+                entry = self._keys[key] = array('I', self._empty)
+                entry[0] = slot
+                if len(self._keys) > self.max_keys:
+                    self._keys.popitem(last=False)
+            else:
+                self._keys.move_to_end(key)
+                self._advance(entry, slot)
+
+            if sum(entry) - entry[0] + cost > self.limit:
+                return self._retry_after(entry, slot, now)
+            i = slot % self.buckets + 1
+            entry[i] = min(MAX_BUCKET_COUNT, entry[i] + cost)
+            return 0
+
+    def _advance(self, entry, slot):
+        """Zero the buckets that fell out of the window since the key's last hit"""
+        last = entry[0]
+        if slot - last >= self.buckets:
+            entry[:] = self._empty
+        else:
+            for s in range(last + 1, slot + 1):
+                entry[s % self.buckets + 1] = 0
+        entry[0] = max(last, slot)
+
+    def _retry_after(self, entry, slot, now):
+        # The oldest non-empty bucket is the first to leave the window
+        for age in range(self.buckets - 1, -1, -1):
+            if entry[(slot - age) % self.buckets + 1]:
+                expires = (slot - age + self.buckets) * self.bucket_seconds
+                return max(expires - now, 0.001)
+        return self.bucket_seconds
+
+    def reset(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+
+def create_rate_limiter(backend, limit, window, max_keys=100_000):
+    """Build the rate limiter named by ``backend`` (only 'memory' for now)"""
+    if backend == 'memory':
+        return SlidingWindowLimiter(limit, window, max_keys=max_keys)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
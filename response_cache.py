@@ -0,0 +1,50 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Cache of serialized JSON bodies tied to a data version.
+
+    Each entry stores the encoded body and a strong ETag for one endpoint/key.
+    Entries are only served while ``version_fn()`` still returns the version
+    they were built against, so a catalog write invalidates everything at once
+    without having to track which keys it touched. The cache is LRU-bounded
+    because some keys (categories, collection ids) come from the URL.
+    """
+
+    def __init__(self, version_fn, max_entries=1024):
+        self._version_fn = version_fn
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build, dumps):
+        """Return ``(body, etag)`` for ``key``, building it with ``build()`` if stale.
+
+        ``dumps`` serializes the built value to bytes. If ``build()``
+        returns None nothing is cached and ``(None, None)`` is returned.
+        """
+        version = self._version_fn()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1], entry[2]
+
+        data = build()
+        if data is None:
+            return None, None
+        body = dumps(data)
+        etag = hashlib.sha1(body).hexdigest()
+
+        with self._lock:
+            self._entries[key] = (version, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,146 @@
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from html import unescape
+
+# Letters and digits in any script (\w without the underscore), so "café" and "плащ" stay whole words
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+
+def tokenize(text):
+    """Casefolded word tokens; stored product text is HTML-escaped, so unescape first"""
+    if not text:
+        return []
+    return TOKEN_RE.findall(unescape(str(text)).casefold())
+
+
+class SearchIndex:
+    """In-process inverted index over product name, description and category.
+
+    Each document is the weighted bag of words from its fields (a name match
+    counts more than a description match). Postings map ``term -> {id: tf}``
+    and are updated per product, so catalog writes never trigger a rebuild.
+    A sorted vocabulary supports prefix expansion of the last query term for
+    typeahead. Results are ranked with BM25.
+    """
+
+    FIELD_WEIGHTS = {'name': 3, 'category': 2, 'description': 1}
+    K1 = 1.2
+    B = 0.75
+    MAX_PREFIX_TERMS = 50
+
+    def __init__(self, products=None):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_len = {}
+        self._total_len = 0
+        self._vocab = []
+        for product in products or []:
+            self.add(product)
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    STATE_FIELDS = ('_postings', '_doc_terms', '_doc_len', '_total_len', '_vocab')
+
+    def export_state(self):
+        with self._lock:
+            return {field: getattr(self, field) for field in self.STATE_FIELDS}
+
+    @classmethod
+    def from_state(cls, state):
+        index = cls()
+        for field in cls.STATE_FIELDS:
+            setattr(index, field, state[field])
+        return index
+
+    # ---------- writes ----------
+    def add(self, product):
+        """Index ``product``, replacing any earlier version with the same id"""
+        terms = {}
+        for field, weight in self.FIELD_WEIGHTS.items():
+            for token in tokenize(product.get(field)):
+                terms[token] = terms.get(token, 0) + weight
+
+        with self._lock:
+            self._remove(product['id'])
+            for term, tf in terms.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    insort(self._vocab, term)
+                postings[product['id']] = tf
+            length = sum(terms.values())
+            self._doc_terms[product['id']] = terms
+            self._doc_len[product['id']] = length
+            self._total_len += length
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove(product_id)
+
+    def sync(self, product_id, product):
+        """CatalogStore listener: re-index on add/update, drop on delete"""
+        if product is None:
+            self.remove(product_id)
+        else:
+            self.add(product)
+
+    def _remove(self, product_id):
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        self._total_len -= self._doc_len.pop(product_id)
+        for term in terms:
+            postings = self._postings[term]
+            del postings[product_id]
+            if not postings:
+                del self._postings[term]
+                del self._vocab[bisect_left(self._vocab, term)]
+
+    # ---------- reads ----------
+    def search(self, query, limit=20, prefix=True):
+        """Return ``[(product_id, score), ...]`` best first.
+
+        With ``prefix`` the last query token also matches any indexed term that
+        starts with it, so "cash" finds "cashmere" while the user is typing.
+        """
+        tokens = tokenize(query)
+        if not tokens or limit < 1:
+            return []
+
+        with self._lock:
+            n_docs = len(self._doc_terms)
+            if not n_docs:
+                return []
+            k1, doc_len = self.K1, self._doc_len
+            # Hoist the BM25 length normalisation constants out of the posting loop.
+            # Products with no indexable text have length 0, so the average can be too.
+            len_scale = k1 * self.B / max(self._total_len / n_docs, 1)
+            len_base = k1 * (1 - self.B)
+            scores = {}
+            for i, token in enumerate(tokens):
+                if prefix and i == len(tokens) - 1:
+                    terms = self._expand_prefix(token)
+                else:
+                    terms = [token] if token in self._postings else []
+                for term in terms:
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    boost = idf * (k1 + 1)
+                    for product_id, tf in postings.items():
+                        score = boost * tf / (tf + len_base + len_scale * doc_len[product_id])
+                        scores[product_id] = scores.get(product_id, 0.0) + score
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def _expand_prefix(self, prefix):
+        terms = []
+        i = bisect_left(self._vocab, prefix)
+        while i < len(self._vocab) and self._vocab[i].startswith(prefix) and len(terms) < self.MAX_PREFIX_TERMS:
+            terms.append(self._vocab[i])
+            i += 1
+        return terms
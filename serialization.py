@@ -0,0 +1,51 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class StdlibSerializer:
+    """The standard library encoder, configured like Flask's default provider"""
+
+    name = 'json'
+
+    def __init__(self, default, sort_keys=True):
+        self._encoder = json.JSONEncoder(default=default, sort_keys=sort_keys, separators=(',', ':'))
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj).encode('utf-8')
+
+
+class OrjsonSerializer:
+    """orjson: several times faster than the stdlib encoder and returns bytes directly.
+
+    Output differs only cosmetically: non-ASCII text is sent as UTF-8 rather
+    than ``\\u`` escapes. Datetimes are passed to ``default`` so they keep
+    Flask's HTTP-date format.
+    """
+
+    name = 'orjson'
+
+    def __init__(self, default, sort_keys=True):
+        self._default = default
+        self._option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if sort_keys:
+            self._option |= orjson.OPT_SORT_KEYS
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=self._default, option=self._option)
+
+
+def create_serializer(name, default, sort_keys=True):
+    """Build the serializer named by ``name``: 'orjson', 'json' (stdlib), or 'auto' (orjson when installed)"""
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name == 'orjson':
+        if orjson is None:
+            raise ValueError("JSON serializer 'orjson' is not installed")
+        return OrjsonSerializer(default, sort_keys)
+    if name == 'json':
+        return StdlibSerializer(default, sort_keys)
+    raise ValueError(f"Unknown JSON serializer: {name}")
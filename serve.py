@@ -0,0 +1,292 @@
+"""Production server: pre-forked worker processes, each serving the app on a fixed thread pool.
+
+Run from the repository root:
+
+    python serve.py [--host 0.0.0.0] [--port 8000] [--workers 4] [--threads 16]
+
+The supervisor binds the port once and forks ``--workers`` processes that
+all accept on it, restarting any that die. Each worker
+imports the app after the fork (its background threads would not survive
+one) and hands connections to ``--threads`` threads; up to ``--max-queue``
+more wait for a thread, and connections beyond that get an immediate 503
+with Retry-After rather than queueing without bound. Per-route limits
+(ROUTE_CONCURRENCY_LIMITS in app.py) apply on top of this.
+
+On SIGTERM or SIGINT the supervisor closes the listening socket and signals
+the workers. Each stops accepting, lets in-flight requests finish for up to
+``--drain-timeout`` seconds, then calls ``app.shutdown()`` so queued webhook
+events are applied and connections closed before it exits.
+
+Worker slots get consecutive ORDER_ID_WORKER_ID values from the configured
+base (default 0), kept across restarts, so order and product ids from
+different workers never collide.
+
+More than one worker needs shared state in SQLite (STORAGE_BACKEND,
+CART_BACKEND and INVENTORY_BACKEND set to sqlite): the memory backends are
+per process, so carts, orders and stock would differ between workers. The
+default is one worker per CPU when those are shared and a single worker
+otherwise; asking for more with a memory backend is refused. Rate limits and
+response caches stay per process either way. If workers keep
+dying while booting (a configuration error) the supervisor gives up and
+exits with status 1. Without ``os.fork`` (Windows) the server runs a single
+worker in-process.
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+from order_ids import MAX_WORKER_ID
+
+logger = logging.getLogger('serve')
+
+BUSY_BODY = b'{"error":"Server busy, please retry"}\n'
+BUSY_RESPONSE = (
+    b'HTTP/1.0 503 Service Unavailable\r\n'
+    b'Content-Type: application/json\r\n'
+    b'Retry-After: 1\r\n'
+    b'Connection: close\r\n'
+    b'Content-Length: %d\r\n'
+    b'\r\n' % len(BUSY_BODY)
+) + BUSY_BODY
+# A worker that dies within BOOT_SECONDS of starting counts as a boot failure;
+# after MAX_BOOT_FAILURES in a row the supervisor stops
+BOOT_SECONDS = 5.0
+MAX_BOOT_FAILURES = 5
+RESTART_BACKOFF = 1.0
+
+
+class RequestHandler(WSGIRequestHandler):
+    # One request per connection, so an idle keep-alive client never holds a pool thread
+    protocol_version = 'HTTP/1.0'
+
+    def log_request(self, code='-', size='-'):
+        if self.server.access_log:
+            super().log_request(code, size)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """werkzeug's WSGI server, handling connections on a bounded thread pool"""
+
+    multithread = True
+
+    def __init__(self, host, port, app, threads=16, max_queue=64, fd=None, access_log=False):
+        super().__init__(host, port, app, handler=RequestHandler, fd=fd)
+        self.access_log = access_log
+        self._pool = ThreadPoolExecutor(threads, thread_name_prefix='http')
+        self._capacity = threads + max_queue
+        self._pending = 0
+        self._idle = threading.Condition()
+        self.shed = 0
+
+    def process_request(self, request, client_address):
+        with self._idle:
+            if self._pending >= self._capacity:
+                self.shed += 1
+                busy = True
+            else:
+                self._pending += 1
+                busy = False
+        if busy:
+            self._reject(request)
+            return
+        self._pool.submit(self._handle, request, client_address)
+
+    def _reject(self, request):
+        try:
+            request.settimeout(1)
+            request.sendall(BUSY_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+
+    def drain(self, timeout):
+        """Wait for accepted connections to finish; returns how many were still open"""
+        deadline = time.monotonic() + timeout
+        with self._idle:
+            while self._pending and time.monotonic() < deadline:
+                self._idle.wait(deadline - time.monotonic())
+            remaining = self._pending
+        self._pool.shutdown(wait=not remaining)
+        return remaining
+
+
+def run_worker(sock, args):
+    import app as shop
+
+    server = PooledWSGIServer(args.host, args.port, shop.app, args.threads, args.max_queue,
+                              fd=sock.fileno(), access_log=args.access_log)
+    sock.close()  # the server holds its own descriptor for the socket
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever() to return, so it can't run on this (the serving) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    logger.info("Worker %d serving on %s:%d with %d threads", os.getpid(), args.host, args.port, args.threads)
+    server.serve_forever()  # closes the listening socket on return
+
+    remaining = server.drain(args.drain_timeout)
+    if remaining:
+        logger.warning("Worker %d: %d connections still open after %.0fs drain", os.getpid(), remaining,
+                       args.drain_timeout)
+    shop.shutdown(args.drain_timeout)
+    logger.info("Worker %d stopped (%d connections shed)", os.getpid(), server.shed)
+
+
+class Supervisor:
+    """Forks the workers, restarts ones that die, and stops them all on SIGTERM/SIGINT"""
+
+    def __init__(self, sock, args):
+        self.sock = sock
+        self.args = args
+        self.workers = {}
+        self.slots = {}
+        self.stopping = False
+        self.boot_failures = 0
+        self.exit_code = 0
+
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            # Read by app.py on import: pid-derived ids could collide between workers
+            os.environ['ORDER_ID_WORKER_ID'] = str(self.args.worker_id_base + slot)
+            code = 0
+            try:
+                run_worker(self.sock, self.args)
+            except BaseException:
+                logger.exception("Worker %d crashed", os.getpid())
+                code = 1
+            finally:
+                logging.shutdown()
+                os._exit(code)
+        self.workers[pid] = time.monotonic()
+        self.slots[pid] = slot
+
+    def stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        # New connections are refused at once so a load balancer moves on to other hosts
+        self.sock.close()
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.args.workers):
+            self.spawn(slot)
+        logger.info("Supervisor %d started %d workers on %s:%d", os.getpid(), self.args.workers,
+                    self.args.host, self.args.port)
+        while self.workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            started = self.workers.pop(pid, None)
+            slot = self.slots.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning("Worker %d exited with status %d", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < BOOT_SECONDS:
+                self.boot_failures += 1
+                if self.boot_failures >= MAX_BOOT_FAILURES:
+                    logger.error("Workers keep failing to boot; shutting down")
+                    self.exit_code = 1
+                    self.stop(None, None)
+                    continue
+                time.sleep(RESTART_BACKOFF)
+            else:
+                self.boot_failures = 0
+            if not self.stopping:
+                self.spawn(slot)
+        logger.info("Supervisor %d stopped", os.getpid())
+        return self.exit_code
+
+
+def memory_backends():
+    """The app's backends that keep data per process, read from the same variables app.py uses"""
+    storage = os.getenv('STORAGE_BACKEND', 'memory')
+    backends = {
+        'STORAGE_BACKEND': storage,
+        'CART_BACKEND': os.getenv('CART_BACKEND', storage),
+        'INVENTORY_BACKEND': os.getenv('INVENTORY_BACKEND', storage),
+    }
+    return [name for name, backend in backends.items() if backend == 'memory']
+
+
+def listen(host, port, backlog):
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default=os.getenv('SERVER_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('SERVER_PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('SERVER_WORKERS', '0')),
+                        help='worker processes (default: one per CPU, or one while any backend is memory)')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('SERVER_THREADS', '16')),
+                        help='request threads per worker')
+    parser.add_argument('--max-queue', type=int, default=int(os.getenv('SERVER_MAX_QUEUE', '64')),
+                        help='connections per worker waiting for a thread before new ones get 503')
+    parser.add_argument('--backlog', type=int, default=int(os.getenv('SERVER_BACKLOG', '1024')))
+    parser.add_argument('--drain-timeout', type=float, default=float(os.getenv('SERVER_DRAIN_TIMEOUT', '30')))
+    parser.add_argument('--access-log', action='store_true')
+    args = parser.parse_args()
+    unshared = memory_backends()
+    if not args.workers:
+        args.workers = 1 if unshared else os.cpu_count() or 1
+    elif args.workers > 1 and unshared:
+        parser.error(f"{', '.join(unshared)} = memory keeps data per worker process; "
+                     f"set them to sqlite to run {args.workers} workers")
+    args.worker_id_base = int(os.getenv('ORDER_ID_WORKER_ID') or 0)
+    if not 0 <= args.worker_id_base <= MAX_WORKER_ID - args.workers + 1:
+        parser.error(f"ORDER_ID_WORKER_ID={args.worker_id_base} leaves no room for {args.workers} workers "
+                     f"(worker ids go up to {MAX_WORKER_ID})")
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(process)d %(levelname)s %(message)s')
+    sock = listen(args.host, args.port, args.backlog)
+    args.port = sock.getsockname()[1]
+    if args.workers == 1 or not hasattr(os, 'fork'):
+        run_worker(sock, args)
+    else:
+        return Supervisor(sock, args).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Startup snapshots: the catalog and search indexes plus seed-user hashes, saved so a worker can boot without rebuilding them.
+
+A snapshot records where its data came from (storage backend, database and
+product version). It is only used when that still matches, so any product
+write since it was taken makes the next boot rebuild from storage (and write
+a fresh one). The file is a pickle: point STARTUP_SNAPSHOT at a path only
+this app can write.
+"""
+import gc
+import logging
+import os
+import pickle
+
+logger = logging.getLogger(__name__)
+
+# Bump when the pickled layout or what goes into it (such as search tokens) changes
+FORMAT = 2
+
+
+def dumps(obj):
+    return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def write_snapshot(path, source, seed_users, index_data):
+    """Atomically write a snapshot; ``index_data`` is ``CatalogStore.export_state(dumps, ...)`` output"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        # The small header comes first, so a stale snapshot is rejected without loading the indexes
+        pickle.dump({'format': FORMAT, 'source': source, 'seedUsers': seed_users}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+        f.write(index_data)
+    os.replace(tmp, path)
+
+
+def read_snapshot(path, source):
+    """``(seed_users, catalog_state, derived_states)`` if ``path`` holds a snapshot of ``source``, else None"""
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+            if header.get('format') != FORMAT or header.get('source') != source:
+                return None
+            # Millions of small containers: collecting while they are created only slows the load
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                state, derived = pickle.load(f)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+    except FileNotFoundError:
+        return None
+    except Exception:
+        logger.warning("Ignoring unreadable startup snapshot %s", path, exc_info=True)
+        return None
+    return header['seedUsers'], state, derived
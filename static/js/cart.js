@@ -14,13 +14,11 @@ const CartModule = {
     },
 
     async addToCart(product) {
+        // Name, price and image come from the catalog on the server
         const item = {
             id: product.id,
-            name: product.name,
-            price: product.price,
             size: product.size || 'One Size',
-            quantity: product.quantity || 1,
-            image: product.image || product.images?.[0] || 'placeholder.svg'
+            quantity: product.quantity || 1
         };
 
         try {
@@ -30,17 +28,20 @@ const CartModule = {
                 body: JSON.stringify(item)
             });
             const data = await res.json();
-            this.items = data.cart || [];
-            this.updateCartUI();
+            if (res.ok) {
+                this.items = data.cart || [];
+                this.updateCartUI();
+            }
             return data;
         } catch (error) {
             console.log("[v0] Error adding to cart:", error);
         }
     },
 
-    async removeFromCart(itemId) {
+    async removeFromCart(itemId, size) {
         try {
-            const res = await fetch(`/api/cart/${itemId}`, { method: 'DELETE' });
+            const query = size ? `?size=${encodeURIComponent(size)}` : '';
+            const res = await fetch(`/api/cart/${itemId}${query}`, { method: 'DELETE' });
             const data = await res.json();
             this.items = data.cart || [];
             this.updateCartUI();
@@ -57,8 +58,10 @@ const CartModule = {
                 body: JSON.stringify({ id: itemId, size, quantity })
             });
             const data = await res.json();
-            this.items = data.cart || [];
-            this.updateCartUI();
+            if (res.ok) {
+                this.items = data.cart || [];
+                this.updateCartUI();
+            }
         } catch (error) {
             console.log("[v0] Error updating quantity:", error);
         }
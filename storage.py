@@ -0,0 +1,613 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+
+from analytics import TABLES as SALES_TABLES, SalesAggregates, additions, changes as sales_changes, summarize
+
+
+_MAX_KEY = '\U0010ffff'
+
+
+def order_matches(order, status=None, payment_status=None):
+    if status is not None and order.get('status') != status:
+        return False
+    if payment_status is not None and order.get('paymentStatus') != payment_status:
+        return False
+    return True
+
+
+class MemoryRepository:
+    """Process-local storage for products, users and orders.
+
+    This is the original behaviour (module-level dicts and lists): fast, but
+    data is lost on restart and not shared between worker processes.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._products = {}
+        self._users = {}
+        self._orders = {}
+        self._orders_by_customer = {}
+        self._orders_by_date = []
+        self._orders_by_razorpay_id = {}
+        self._events = OrderedDict()
+        self._products_version = 0
+        self._sales = SalesAggregates()
+
+    # ---------- products ----------
+    def load_products(self):
+        with self._lock:
+            return list(self._products.values())
+
+    def has_products(self):
+        return bool(self._products)
+
+    def save_product(self, product):
+        """Insert or replace a product; returns the new products version"""
+        with self._lock:
+            self._products[product['id']] = product
+            self._products_version += 1
+            return self._products_version
+
+    def save_products(self, products):
+        """Insert or replace many products as one catalog change; returns the new products version"""
+        with self._lock:
+            for product in products:
+                self._products[product['id']] = product
+            self._products_version += 1
+            return self._products_version
+
+    def delete_product(self, product_id):
+        """Returns the products version after the delete"""
+        with self._lock:
+            if self._products.pop(product_id, None) is not None:
+                self._products_version += 1
+            return self._products_version
+
+    def products_version(self):
+        return self._products_version
+
+    # ---------- users ----------
+    def get_password_hash(self, email):
+        return self._users.get(email)
+
+    def create_user(self, email, password_hash):
+        """Store a new user. Returns False if the email is already registered."""
+        with self._lock:
+            if email in self._users:
+                return False
+            self._users[email] = password_hash
+            return True
+
+    def set_password_hash(self, email, password_hash):
+        with self._lock:
+            if email in self._users:
+                self._users[email] = password_hash
+
+    # ---------- orders ----------
+    def add_order(self, order):
+        with self._lock:
+            self._orders[order['id']] = order
+            index = self._orders_by_customer.setdefault(order['customerId'], [])
+            insort(index, (order['date'], order['id']))
+            insort(self._orders_by_date, (order['date'], order['id']))
+            if order.get('razorpayOrderId'):
+                self._orders_by_razorpay_id[order['razorpayOrderId']] = order['id']
+            self._sales.apply(None, order)
+
+    def add_orders(self, orders):
+        """Bulk insert (imports, seeding); indexes are re-sorted once at the end"""
+        orders = list(orders)
+        with self._lock:
+            for order in orders:
+                self._orders[order['id']] = order
+                self._orders_by_customer.setdefault(order['customerId'], []).append((order['date'], order['id']))
+                self._orders_by_date.append((order['date'], order['id']))
+                if order.get('razorpayOrderId'):
+                    self._orders_by_razorpay_id[order['razorpayOrderId']] = order['id']
+            for index in self._orders_by_customer.values():
+                index.sort()
+            self._orders_by_date.sort()
+            self._sales.apply_changes(additions(orders))
+
+    def get_order(self, order_id):
+        return self._orders.get(order_id)
+
+    def get_order_by_razorpay_id(self, razorpay_order_id):
+        order_id = self._orders_by_razorpay_id.get(razorpay_order_id)
+        return self._orders.get(order_id) if order_id else None
+
+    def update_order(self, order_id, changes):
+        with self._lock:
+            order = self._orders.get(order_id)
+            if order is not None:
+                before = dict(order)
+                order.update(changes)
+                if order.get('razorpayOrderId'):
+                    self._orders_by_razorpay_id[order['razorpayOrderId']] = order_id
+                self._sales.apply(before, order)
+            return order
+
+    def orders_for_customer(self, customer_id, status=None, before=None, limit=None):
+        """A customer's orders, newest first.
+
+        ``before`` is the ``(date, id)`` of the last order already seen
+        (cursor pagination); ``limit`` caps the number returned.
+        """
+        with self._lock:
+            index = self._orders_by_customer.get(customer_id, [])
+            i = bisect_left(index, before) if before is not None else len(index)
+            result = []
+            while i > 0 and (limit is None or len(result) < limit):
+                i -= 1
+                order = self._orders[index[i][1]]
+                if status is None or order['status'] == status:
+                    result.append(order)
+            return result
+
+    def all_orders(self):
+        with self._lock:
+            return list(self._orders.values())
+
+    def iter_orders(self, since=None, until=None, status=None, payment_status=None,
+                    after=None, descending=False, batch_size=500):
+        """Yield orders in date order, filtered, without materialising them all.
+
+        ``since``/``until`` are inclusive ISO date bounds, ``after`` is the
+        ``(date, id)`` of the last order already seen. The date index is read
+        one batch at a time so concurrent inserts are safe and memory stays flat.
+        """
+        cursor = after
+        while True:
+            with self._lock:
+                index = self._orders_by_date
+                if descending:
+                    end = bisect_right(index, (until, _MAX_KEY)) if until else len(index)
+                    if cursor is not None:
+                        end = min(end, bisect_left(index, cursor))
+                    keys = index[max(0, end - batch_size):end][::-1]
+                else:
+                    start = bisect_left(index, (since,)) if since else 0
+                    if cursor is not None:
+                        start = max(start, bisect_right(index, cursor))
+                    keys = index[start:start + batch_size]
+                batch = [self._orders[order_id] for _, order_id in keys]
+            if not batch:
+                return
+            for order in batch:
+                if descending and since and order['date'] < since:
+                    return
+                if not descending and until and order['date'] > until:
+                    return
+                if order_matches(order, status, payment_status):
+                    yield order
+            cursor = keys[-1]
+
+    # ---------- analytics ----------
+    def sales_summary(self, days=30, top=10):
+        """Dashboard aggregates, maintained on every order write (see analytics.SalesAggregates)"""
+        with self._lock:
+            return summarize(self._sales, days, top)
+
+    # ---------- webhook events ----------
+    MAX_EVENTS = 100_000
+
+    def record_event(self, event_id):
+        """Remember a processed event id. Returns False if it was already seen."""
+        with self._lock:
+            if event_id in self._events:
+                return False
+            self._events[event_id] = True
+            if len(self._events) > self.MAX_EVENTS:
+                self._events.popitem(last=False)
+            return True
+
+    def forget_event(self, event_id):
+        """Drop a recorded event id, so a redelivery of a failed event is applied"""
+        with self._lock:
+            self._events.pop(event_id, None)
+
+    def close(self):
+        pass
+
+
+class SQLitePool:
+    """Thread-local pool of SQLite connections to one database file.
+
+    The database runs in WAL mode so readers never block the single writer.
+    Each thread gets its own connection (sqlite3 connections must not be
+    shared across threads); the pool remembers them so they can be closed.
+    """
+
+    def __init__(self, path, timeout=5.0, cached_statements=256):
+        self.path = path
+        self._timeout = timeout
+        self._cached_statements = cached_statements
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self._timeout,
+                isolation_level=None,
+                check_same_thread=False,
+                cached_statements=self._cached_statements,
+            )
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """IMMEDIATE transaction on this thread's connection"""
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def write(self, *statements):
+        """Run ``(sql, params)`` pairs in one transaction; returns their cursors"""
+        with self.transaction() as conn:
+            return [conn.execute(sql, params) for sql, params in statements]
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class _SQLiteSales:
+    """The read side of SalesAggregates over the sales_aggregates table"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def counters(self, table, key):
+        row = self.conn.execute(
+            'SELECT c0, c1, c2 FROM sales_aggregates WHERE tbl = ? AND key = ?', (table, key)).fetchone()
+        return list(row or (0, 0, 0))[:len(SALES_TABLES[table])]
+
+    def by_key(self, table):
+        rows = self.conn.execute('SELECT key, c0, c1, c2 FROM sales_aggregates WHERE tbl = ?', (table,))
+        return {key: list(counters)[:len(SALES_TABLES[table])] for key, *counters in rows}
+
+    def top(self, table, limit):
+        # The ranked tables keep revenue in c1, so this walks idx_sales_ranked backwards
+        rows = self.conn.execute(
+            'SELECT key, c0, c1 FROM sales_aggregates WHERE tbl = ? ORDER BY c1 DESC, key DESC LIMIT ?', (table, limit))
+        return [(key, [c0, c1]) for key, c0, c1 in rows]
+
+
+class SQLiteRepository:
+    """SQLite storage shared by every worker process on the host.
+
+    Every statement is parameterized so each pooled connection's statement
+    cache reuses prepared statements. Rows keep the full JSON document plus
+    the columns we query on.
+    """
+
+    shared = True
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS products (
+        id TEXT PRIMARY KEY,
+        category TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_products_category ON products (category);
+
+    CREATE TABLE IF NOT EXISTS users (
+        email TEXT PRIMARY KEY,
+        password_hash TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS orders (
+        id TEXT PRIMARY KEY,
+        customer_id TEXT NOT NULL,
+        date TEXT NOT NULL,
+        status TEXT,
+        payment_status TEXT,
+        razorpay_order_id TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders (customer_id, date);
+    CREATE INDEX IF NOT EXISTS idx_orders_date ON orders (date, id);
+
+    CREATE TABLE IF NOT EXISTS webhook_events (
+        id TEXT PRIMARY KEY,
+        received_at REAL NOT NULL
+    );
+
+    -- Running sales totals (see analytics.py); c0..c2 are the table's counters
+    CREATE TABLE IF NOT EXISTS sales_aggregates (
+        tbl TEXT NOT NULL,
+        key TEXT NOT NULL,
+        c0 INTEGER NOT NULL DEFAULT 0,
+        c1 INTEGER NOT NULL DEFAULT 0,
+        c2 INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (tbl, key)
+    );
+    CREATE INDEX IF NOT EXISTS idx_sales_ranked ON sales_aggregates (tbl, c1, key);
+
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    INSERT OR IGNORE INTO meta (key, value) VALUES ('products_version', 0);
+
+    -- The products_version of each product's last write or delete, so workers
+    -- can pull only what changed since the version they hold
+    CREATE TABLE IF NOT EXISTS product_changes (
+        id TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_product_changes_version ON product_changes (version);
+    """
+
+    def __init__(self, path, timeout=5.0, cached_statements=256):
+        self.path = path
+        self.pool = SQLitePool(path, timeout, cached_statements)
+        conn = self.pool.connection()
+        conn.executescript(self.SCHEMA)
+        # Added after the first release; older databases get the column here
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(orders)')}
+        if 'razorpay_order_id' not in columns:
+            try:
+                conn.execute('ALTER TABLE orders ADD COLUMN razorpay_order_id TEXT')
+            except sqlite3.OperationalError:
+                pass  # another worker added it first
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_orders_razorpay ON orders (razorpay_order_id)')
+        self._build_sales_aggregates()
+        self._events_recorded = 0
+
+    # ---------- products ----------
+    def load_products(self):
+        rows = self.pool.connection().execute('SELECT data FROM products ORDER BY rowid')
+        return [json.loads(data) for (data,) in rows]
+
+    def has_products(self):
+        return self.pool.connection().execute('SELECT 1 FROM products LIMIT 1').fetchone() is not None
+
+    def save_product(self, product):
+        """Insert or replace a product; returns the new products version"""
+        return self.save_products([product])
+
+    def save_products(self, products):
+        """Insert or replace many products in one transaction; returns the new products version"""
+        products = list(products)
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO products (id, category, data) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET category = excluded.category, data = excluded.data',
+                ((p['id'], p.get('category'), json.dumps(p)) for p in products))
+            return self._products_changed(conn, [p['id'] for p in products])
+
+    def delete_product(self, product_id):
+        """Returns the products version after the delete"""
+        with self.pool.transaction() as conn:
+            conn.execute('DELETE FROM products WHERE id = ?', (product_id,))
+            return self._products_changed(conn, [product_id])
+
+    def _products_changed(self, conn, product_ids):
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'products_version'")
+        (version,) = conn.execute("SELECT value FROM meta WHERE key = 'products_version'").fetchone()
+        conn.executemany(
+            'INSERT INTO product_changes (id, version) VALUES (?, ?) '
+            'ON CONFLICT(id) DO UPDATE SET version = excluded.version',
+            ((product_id, version) for product_id in product_ids))
+        return version
+
+    def products_version(self):
+        row = self.pool.connection().execute("SELECT value FROM meta WHERE key = 'products_version'").fetchone()
+        return row[0]
+
+    def product_changes_since(self, version):
+        """``(current version, changed products, deleted ids)`` for writes after ``version``.
+
+        A product written again meanwhile comes back with its newer data;
+        applying it twice is harmless.
+        """
+        current = self.products_version()
+        conn = self.pool.connection()
+        rows = conn.execute(
+            'SELECT c.id, p.data FROM product_changes c LEFT JOIN products p ON p.id = c.id '
+            'WHERE c.version > ?', (version,))
+        changed, deleted = [], []
+        for product_id, data in rows:
+            if data is None:
+                deleted.append(product_id)
+            else:
+                changed.append(json.loads(data))
+        return current, changed, deleted
+
+    # ---------- users ----------
+    def get_password_hash(self, email):
+        row = self.pool.connection().execute('SELECT password_hash FROM users WHERE email = ?', (email,)).fetchone()
+        return row[0] if row else None
+
+    def create_user(self, email, password_hash):
+        """Store a new user. Returns False if the email is already registered."""
+        (cursor,) = self.pool.write(
+            ('INSERT OR IGNORE INTO users (email, password_hash) VALUES (?, ?)', (email, password_hash)),
+        )
+        return cursor.rowcount == 1
+
+    def set_password_hash(self, email, password_hash):
+        self.pool.write(('UPDATE users SET password_hash = ? WHERE email = ?', (password_hash, email)))
+
+    # ---------- orders ----------
+    def add_order(self, order):
+        with self.pool.transaction() as conn:
+            conn.execute(
+                'INSERT INTO orders (id, customer_id, date, status, payment_status, razorpay_order_id, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (order['id'], order['customerId'], order['date'], order.get('status'),
+                 order.get('paymentStatus'), order.get('razorpayOrderId'), json.dumps(order)))
+            self._apply_sales(conn, sales_changes(None, order))
+
+    def add_orders(self, orders):
+        """Bulk insert (imports, seeding) in one transaction"""
+        orders = list(orders)
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO orders (id, customer_id, date, status, payment_status, razorpay_order_id, data) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                ((o['id'], o['customerId'], o['date'], o.get('status'), o.get('paymentStatus'),
+                  o.get('razorpayOrderId'), json.dumps(o)) for o in orders))
+            self._apply_sales(conn, additions(orders))
+
+    def get_order(self, order_id):
+        row = self.pool.connection().execute('SELECT data FROM orders WHERE id = ?', (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_order_by_razorpay_id(self, razorpay_order_id):
+        row = self.pool.connection().execute(
+            'SELECT data FROM orders WHERE razorpay_order_id = ?', (razorpay_order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_order(self, order_id, changes):
+        with self.pool.transaction() as conn:
+            row = conn.execute('SELECT data FROM orders WHERE id = ?', (order_id,)).fetchone()
+            if row is None:
+                return None
+            before = json.loads(row[0])
+            order = dict(before, **changes)
+            conn.execute('UPDATE orders SET status = ?, payment_status = ?, razorpay_order_id = ?, data = ? '
+                         'WHERE id = ?',
+                         (order.get('status'), order.get('paymentStatus'), order.get('razorpayOrderId'),
+                          json.dumps(order), order_id))
+            # Same transaction as the order row, so concurrent payment updates can't double count
+            self._apply_sales(conn, sales_changes(before, order))
+        return order
+
+    def orders_for_customer(self, customer_id, status=None, before=None, limit=None):
+        """A customer's orders, newest first (see MemoryRepository.orders_for_customer)"""
+        sql = 'SELECT data FROM orders WHERE customer_id = ?'
+        params = [customer_id]
+        if status is not None:
+            sql += ' AND status = ?'
+            params.append(status)
+        if before is not None:
+            sql += ' AND (date, id) < (?, ?)'
+            params.extend(before)
+        sql += ' ORDER BY date DESC, id DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        rows = self.pool.connection().execute(sql, params)
+        return [json.loads(data) for (data,) in rows]
+
+    def all_orders(self):
+        rows = self.pool.connection().execute('SELECT data FROM orders ORDER BY date, id')
+        return [json.loads(data) for (data,) in rows]
+
+    def iter_orders(self, since=None, until=None, status=None, payment_status=None,
+                    after=None, descending=False, batch_size=500):
+        """Yield orders in date order (see MemoryRepository.iter_orders)"""
+        clauses, params = [], []
+        for clause, value in (('date >= ?', since), ('date <= ?', until),
+                              ('status = ?', status), ('payment_status = ?', payment_status)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if after is not None:
+            clauses.append('(date, id) < (?, ?)' if descending else '(date, id) > (?, ?)')
+            params.extend(after)
+        sql = 'SELECT data FROM orders'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY date DESC, id DESC' if descending else ' ORDER BY date, id'
+
+        cursor = self.pool.connection().execute(sql, params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                for (data,) in rows:
+                    yield json.loads(data)
+        finally:
+            cursor.close()
+
+    # ---------- analytics ----------
+    def _apply_sales(self, conn, deltas):
+        """Add ``{(table, key): deltas}`` to the sales aggregates (caller holds the transaction)"""
+        if not deltas:
+            return
+        rows = [(table, key, *(list(delta) + [0, 0])[:3]) for (table, key), delta in deltas.items()]
+        conn.executemany(
+            'INSERT INTO sales_aggregates (tbl, key, c0, c1, c2) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT(tbl, key) DO UPDATE SET c0 = c0 + excluded.c0, c1 = c1 + excluded.c1, c2 = c2 + excluded.c2',
+            rows)
+        conn.executemany(
+            'DELETE FROM sales_aggregates WHERE tbl = ? AND key = ? AND c0 = 0 AND c1 = 0 AND c2 = 0',
+            [row[:2] for row in rows])
+
+    def _build_sales_aggregates(self):
+        """One-off backfill for databases created before sales aggregates existed"""
+        with self.pool.transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'sales_aggregates'").fetchone():
+                return
+            orders = (json.loads(data) for (data,) in conn.execute('SELECT data FROM orders'))
+            self._apply_sales(conn, additions(orders))
+            conn.execute("INSERT INTO meta (key, value) VALUES ('sales_aggregates', 1)")
+
+    def sales_summary(self, days=30, top=10):
+        """Dashboard aggregates, updated in the same transaction as every order write"""
+        conn = self.pool.connection()
+        conn.execute('BEGIN')  # one consistent snapshot for all the reads
+        try:
+            return summarize(_SQLiteSales(conn), days, top)
+        finally:
+            conn.execute('COMMIT')
+
+    # ---------- webhook events ----------
+    # Razorpay retries a webhook for about a day; ids are kept well past that
+    EVENT_RETENTION = 7 * 24 * 60 * 60
+
+    def record_event(self, event_id):
+        """Remember a processed event id. Returns False if it was already seen."""
+        now = time.time()
+        (cursor,) = self.pool.write(
+            ('INSERT OR IGNORE INTO webhook_events (id, received_at) VALUES (?, ?)', (event_id, now)),
+        )
+        self._events_recorded += 1
+        if self._events_recorded % 1000 == 0:
+            self.pool.write(('DELETE FROM webhook_events WHERE received_at < ?', (now - self.EVENT_RETENTION,)))
+        return cursor.rowcount == 1
+
+    def forget_event(self, event_id):
+        """Drop a recorded event id, so a redelivery of a failed event is applied"""
+        self.pool.write(('DELETE FROM webhook_events WHERE id = ?', (event_id,)))
+
+    def close(self):
+        self.pool.close()
+
+
+def create_repository(backend, database_path=None):
+    """Build the repository named by ``backend`` ('memory' or 'sqlite')"""
+    if backend == 'memory':
+        return MemoryRepository()
+    if backend == 'sqlite':
+        return SQLiteRepository(database_path or 'ecommerce.db')
+    raise ValueError(f"Unknown storage backend: {backend}")
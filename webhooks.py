@@ -0,0 +1,149 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """The webhook backlog is at capacity; the sender should retry later"""
+
+
+class WebhookProcessor:
+    """Bounded work queue drained by a pool of background threads.
+
+    The web request only verifies and enqueues an event, so webhook bursts
+    cost web workers a few milliseconds each. Workers skip events whose id
+    ``record_event`` has already seen (gateways redeliver until they get a
+    2xx, and may deliver twice anyway) and pass the rest to ``handler``.
+
+    The sender already has its 2xx, so a failing event is not dropped: it is
+    retried with backoff up to ``attempts`` times, then its id is handed back
+    through ``forget_event`` (a redelivery is applied, not skipped as a
+    duplicate) and it is parked. Parked events are retried every
+    ``park_interval`` seconds; at most ``max_queue`` are kept.
+
+    Threads start on the first ``submit`` and again after a fork, so the
+    processor can be created at import time by a preloading server.
+    """
+
+    def __init__(self, handler, record_event, forget_event, workers=4, max_queue=10_000,
+                 attempts=3, retry_delay=0.5, park_interval=60.0):
+        self.handler = handler
+        self.record_event = record_event
+        self.forget_event = forget_event
+        self.workers = workers
+        self.max_queue = max_queue
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self.park_interval = park_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        self._threads = []
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._parked = deque(maxlen=max_queue)
+        self._next_park_retry = 0.0
+        self.stats = {'received': 0, 'processed': 0, 'duplicates': 0, 'retried': 0, 'failed': 0}
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # After a fork the parent's threads are gone and its queue may hold
+            # events this process will never see; start over with our own
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._threads = [threading.Thread(target=self._run, name=f"webhook-worker-{i}", daemon=True)
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def submit(self, event_id, event):
+        """Queue an event for processing; raises QueueFull when the backlog is full"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((event_id, event))
+        except queue.Full:
+            raise QueueFull() from None
+        self._count('received')
+
+    def backlog(self):
+        return self._queue.qsize()
+
+    def parked(self):
+        return len(self._parked)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _run(self):
+        work = self._queue
+        while True:
+            try:
+                item = work.get(timeout=self.park_interval)
+            except queue.Empty:
+                item = ()
+            try:
+                if item is None:
+                    return
+                if item:
+                    self._process(*item)
+                self._retry_parked()
+            finally:
+                if item != ():
+                    work.task_done()
+
+    def _process(self, event_id, event):
+        if event_id and not self.record_event(event_id):
+            self._count('duplicates')
+            return
+        for attempt in range(self.attempts):
+            try:
+                self.handler(event)
+            except Exception:
+                logger.exception("Webhook event %s failed (attempt %d of %d)", event_id, attempt + 1, self.attempts)
+                if attempt + 1 < self.attempts:
+                    self._count('retried')
+                    time.sleep(self.retry_delay * 2 ** attempt)
+            else:
+                self._count('processed')
+                return
+        if event_id:
+            self.forget_event(event_id)
+        with self._lock:
+            if not self._parked:
+                self._next_park_retry = time.monotonic() + self.park_interval
+            self._parked.append((event_id, event))
+            self.stats['failed'] += 1
+
+    def _retry_parked(self):
+        with self._lock:
+            if not self._parked or time.monotonic() < self._next_park_retry:
+                return
+            self._next_park_retry = time.monotonic() + self.park_interval
+            parked = list(self._parked)
+            self._parked.clear()
+        for event_id, event in parked:
+            self._process(event_id, event)
+
+    def join(self):
+        """Block until every queued event has been handled"""
+        self._queue.join()
+
+    def close(self, timeout=None):
+        """Finish the queued events, then stop the workers"""
+        if self._pid != os.getpid():
+            return
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        if self._parked:
+            logger.warning("%d failed webhook events still parked at shutdown", len(self._parked))
+        self._pid = None